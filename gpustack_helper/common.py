@@ -1,4 +1,5 @@
-from PySide6.QtWidgets import QMenu, QMessageBox, QWidget
+from typing import Union
+from PySide6.QtWidgets import QAbstractButton, QMenu, QMessageBox, QWidget
 from PySide6.QtGui import QAction
 
 
@@ -19,3 +20,16 @@ def show_warning(parent: QWidget, title: str, message: str):
         parent=parent,
         buttons=QMessageBox.StandardButton.Ok,
     ).exec()
+
+
+def update_text(widget: Union[QAction, QAbstractButton], text: str) -> None:
+    """
+    Only set the text if it differs, setText always repaints the menu.
+    """
+    if widget.text() != text:
+        widget.setText(text)
+
+
+def update_enabled(widget: Union[QAction, QWidget], enabled: bool) -> None:
+    if widget.isEnabled() != enabled:
+        widget.setEnabled(enabled)
@@ -2,18 +2,30 @@ import os
 import sys
 import argparse
 import logging
-from typing import Optional, List, Dict, get_origin, get_args
+from typing import (
+    Any,
+    Iterator,
+    Optional,
+    List,
+    Dict,
+    Set,
+    Tuple,
+    Union,
+)
 from types import SimpleNamespace
-from functools import partial
+from functools import partial, lru_cache
+from contextlib import ExitStack, contextmanager
+from pydantic import TypeAdapter
 from gpustack_helper.config.gpustack_config import (
-    Config,
     set_common_options,
     set_server_options,
     set_worker_options,
     load_config_from_yaml,
 )
 from gpustack_helper.config.config import HelperConfig, GPUStackConfig
-from gpustack_helper.config.backends import FileConfigModel, PlistEncoder
+from gpustack_helper.config.schema import model_schema, cli_flags
+from gpustack_helper.config.backends import FileConfigModel, ModelBackend, PlistEncoder
+from gpustack_helper.config.model_plan import set_nested_data
 from gpustack_helper.defaults import (
     global_data_dir,
     data_dir as default_data_dir,
@@ -44,6 +56,11 @@ __all__ = [
     "ensure_data_dir",
     "is_first_boot",
     "migrate_config",
+    "all_config_sync",
+    "unsynced_fields",
+    "classify_unsynced_fields",
+    "reload_configs",
+    "config_transaction",
 ]
 
 logger = logging.getLogger(__name__)
@@ -53,123 +70,16 @@ _active_helper_config: HelperConfig = None
 _user_gpustack_config: GPUStackConfig = None
 _active_gpustack_config: GPUStackConfig = None
 
-# Cache for list type fields from Config class
-_config_list_fields: Optional[Dict[str, type]] = None
-
-
-def _get_fallback_config_fields() -> Dict[str, type]:
-    """Get fallback list fields configuration."""
-    return {
-        'ray_args': str,
-        'allow_origins': str,
-        'allow_methods': str,
-        'allow_headers': str,
-        'rpc_server_args': str,
-    }
-
-
-def _evaluate_string_annotation(field_type: str) -> Optional[type]:
-    """Safely evaluate string type annotations."""
-    try:
-        return eval(field_type, Config.__module__.__dict__)
-    except Exception:
-        return None
-
-
-def _detect_union_type(field_type) -> bool:
-    """Detect if a type is a Union type across Python versions."""
-    origin = get_origin(field_type)
-    if origin is None:
-        return False
-
-    try:
-        # Check for typing.Union
-        from typing import Union
-
-        if origin is Union:
-            return True
-    except Exception:
-        pass
-
-    try:
-        # Python 3.10+ union syntax (X | Y)
-        if isinstance(origin, type(int | None).__class__):
-            return True
-    except Exception:
-        pass
-
-    # Fallback to string checking
-    type_str = str(field_type)
-    return any(keyword in type_str for keyword in ['Union', 'Optional', '|'])
-
-
-def _extract_list_type_from_union(args) -> Optional[type]:
-    """Extract list element type from Union arguments."""
-    for arg in args:
-        arg_origin = get_origin(arg)
-        if arg_origin is list:
-            list_args = get_args(arg)
-            if list_args:
-                return list_args[0]
-    return None
-
-
-def _process_field_type(field_name: str, field_type) -> Optional[type]:
-    """Process a single field type and extract list element type if applicable."""
-    # Convert string annotations to actual types if needed
-    if isinstance(field_type, str):
-        field_type = _evaluate_string_annotation(field_type)
-        if field_type is None:
-            return None
-
-    origin = get_origin(field_type)
-    args = get_args(field_type)
-
-    # Direct List[T] case
-    if origin is list and args:
-        return args[0]
-
-    # Optional[List[T]] case - check Union types
-    if _detect_union_type(field_type) and args:
-        return _extract_list_type_from_union(args)
-
-    return None
-
 
 def _get_config_list_fields() -> Dict[str, type]:
     """
-    Extract all List type fields from gpustack.config.Config class.
-    Returns a dictionary mapping field names to their List element types.
+    Map the List type fields of the gpustack config to their element types.
     """
-    global _config_list_fields
-    if _config_list_fields is not None:
-        return _config_list_fields
-
-    _config_list_fields = {}
-
-    try:
-        annotations = getattr(Config, '__annotations__', {})
-
-        for field_name, field_type in annotations.items():
-            element_type = _process_field_type(field_name, field_type)
-            if element_type is not None:
-                _config_list_fields[field_name] = element_type
-
-        # Use fallback if no fields detected
-        if not _config_list_fields:
-            _config_list_fields = _get_fallback_config_fields()
-            logger.info("Using manual fallback for Config list fields detection")
-
-        logger.debug(
-            f"Detected list fields in Config: {list(_config_list_fields.keys())}"
-        )
-
-    except Exception as e:
-        logger.warning(f"Failed to extract list fields from Config class: {e}")
-        _config_list_fields = _get_fallback_config_fields()
-        logger.info("Using fallback Config list fields due to detection error")
-
-    return _config_list_fields
+    return {
+        name: field.element_python_type or str
+        for name, field in model_schema(GPUStackConfig).items()
+        if field.is_list
+    }
 
 
 def init_config(args: argparse.Namespace) -> None:
@@ -210,7 +120,7 @@ def init_config(args: argparse.Namespace) -> None:
 
     active_helper_path = (
         os.path.join(active_data_dir, helper_config_file_name)
-        if sys.platform == "darwin"
+        if sys.platform != "win32"
         else None
     )
     p_model_func = (
@@ -232,7 +142,7 @@ def init_config(args: argparse.Namespace) -> None:
         **config_vars,
     )
 
-    if sys.platform == "darwin":
+    if sys.platform != "win32":
         _user_helper_config_path = os.path.join(user_data_dir, helper_config_file_name)
         _user_helper_config = HelperConfig(
             backend=lambda x: FileConfigModel(
@@ -258,13 +168,30 @@ def active_helper_config() -> HelperConfig:
     return _active_helper_config
 
 
-def user_gpustack_config() -> GPUStackConfig:
+def user_gpustack_config(create: bool = True) -> GPUStackConfig:
+    """
+    The config edited by the user, its file is written if missing unless
+    create is unset.
+    """
     global _user_gpustack_config
-    if not os.path.exists(_user_gpustack_config.config_path):
+    if create and not os.path.exists(_user_gpustack_config.config_path):
         _user_gpustack_config.update_with_lock()
     return _user_gpustack_config
 
 
+def reload_configs() -> None:
+    """
+    Reload the configs compared by the status probe. Unlike the accessors it
+    never writes a missing file, it runs in the thread pool.
+    """
+    for config in (
+        _user_gpustack_config,
+        _active_gpustack_config,
+        _active_helper_config,
+    ):
+        config.reload()
+
+
 def active_gpustack_config() -> GPUStackConfig:
     global _active_gpustack_config
     return _active_gpustack_config
@@ -279,7 +206,7 @@ def ensure_data_dir() -> None:
         except Exception as e:
             logger.error(f"Failed to create user data directory {user_data_dir}: {e}")
             raise
-    if sys.platform != "darwin" or user_data_dir == active_data_dir:
+    if sys.platform == "win32" or user_data_dir == active_data_dir:
         return
 
     link_target = os.path.join(user_data_dir, "data-dir")
@@ -297,11 +224,122 @@ def ensure_data_dir() -> None:
 
 
 def all_config_sync() -> bool:
-    helper_user = _user_helper_config.model_dump(exclude_defaults=True)
-    helper_active = _active_helper_config.model_dump(exclude_defaults=True)
-    gpustack_user = _user_gpustack_config.model_dump(exclude_defaults=True)
-    gpustack_active = _active_gpustack_config.model_dump(exclude_defaults=True)
-    return helper_user == helper_active and gpustack_user == gpustack_active
+    return (
+        _user_helper_config.digest() == _active_helper_config.digest()
+        and _user_gpustack_config.digest() == _active_gpustack_config.digest()
+    )
+
+
+def unsynced_fields() -> Dict[str, Tuple[Any, Any]]:
+    """
+    Return the fields which differ between the user and active configs, mapped
+    to (user value, active value).
+    """
+    return {
+        **_user_helper_config.diff(_active_helper_config),
+        **_user_gpustack_config.diff(_active_gpustack_config),
+    }
+
+
+# helper config fields the running service picks up without a restart, e.g.
+# RunAtLoad only changes how the service is registered
+sync_only_fields = frozenset({"RunAtLoad"})
+
+
+def classify_unsynced_fields() -> Tuple[Set[str], Set[str]]:
+    """
+    Split the unsynced fields into (restart required, sync only).
+    """
+    helper_changes = _user_helper_config.diff(_active_helper_config).keys()
+    gpustack_changes = _user_gpustack_config.diff(_active_gpustack_config).keys()
+    sync_only = {key for key in helper_changes if key in sync_only_fields}
+    restart_required = set(gpustack_changes) | (set(helper_changes) - sync_only)
+    return restart_required, sync_only
+
+
+AnyConfig = Union[HelperConfig, GPUStackConfig]
+
+
+class ConfigTransaction:
+    """
+    Mutations applied inside config_transaction(), saved together on exit.
+    """
+
+    configs: Tuple[AnyConfig, ...]
+
+    def __init__(self, configs: Tuple[AnyConfig, ...]):
+        self.configs = configs
+
+    def update(self, config: AnyConfig, **kwargs) -> None:
+        if not any(config is c for c in self.configs):
+            raise ValueError("The config is not part of the transaction")
+        if config._backend is not None:
+            # e.g. the registry backend creates the service on the first save
+            kwargs = config._backend.prepare_update(kwargs)
+        set_nested_data(config, kwargs)
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(model: type, name: str) -> TypeAdapter:
+    return TypeAdapter(model.model_fields[name].annotation)
+
+
+def validate_fields(config: AnyConfig) -> None:
+    """
+    Validate the current field values against their annotations, as mutations
+    are assigned without validation. Fields holding their defaults are skipped.
+    Raises pydantic.ValidationError.
+    """
+    model = type(config)
+    schema = model_schema(model)
+    for name in model.model_fields:
+        value = getattr(config, name)
+        if not schema[name].is_default(value):
+            _field_adapter(model, name).validate_python(value)
+
+
+def _lock_backends(stack: ExitStack, backends: List[ModelBackend]) -> None:
+    # lock in a stable order so concurrent transactions can't deadlock, and
+    # backends of the same file share one file lock
+    locked_paths = set()
+    for backend in sorted(backends, key=lambda b: b.lock_path or ""):
+        stack.enter_context(
+            backend.locked(file_lock=backend.lock_path not in locked_paths)
+        )
+        locked_paths.add(backend.lock_path)
+
+
+@contextmanager
+def config_transaction(*configs: AnyConfig) -> Iterator[ConfigTransaction]:
+    """
+    Lock and reload every config once, then validate and save all of them when
+    the block exits. If the block, the validation or any save fails, every
+    config is restored to its content before the transaction and the error is
+    raised. Raises LockFileError without touching any config if one of them
+    can't be locked.
+    """
+    configs = tuple({id(c): c for c in configs}.values())
+    backends = list(
+        {id(c._backend): c._backend for c in configs if c._backend is not None}.values()
+    )
+    with ExitStack() as stack:
+        _lock_backends(stack, backends)
+        for config in configs:
+            config.reload()
+        snapshots = [backend.snapshot() for backend in backends]
+        try:
+            yield ConfigTransaction(configs)
+            for config in configs:
+                validate_fields(config)
+            for config in configs:
+                config.save(strict=True)
+        except BaseException:
+            for backend, snapshot in zip(backends, snapshots):
+                try:
+                    backend.restore(snapshot)
+                except Exception as e:
+                    logger.error(f"Failed to roll back configuration: {e}")
+            raise
 
 
 def _handle_key_value_arg(
@@ -358,6 +396,10 @@ def _handle_boolean_flag(args: SimpleNamespace, attr_name: str) -> None:
         setattr(args, attr_name, True)
 
 
+def _option_name(flag: str) -> str:
+    return cli_flags(GPUStackConfig).get(flag, flag[2:].replace('-', '_'))
+
+
 def _process_option_arg(
     args: SimpleNamespace, args_list: List[str], i: int, list_fields: Dict[str, type]
 ) -> int:
@@ -366,18 +408,18 @@ def _process_option_arg(
 
     if '=' in arg:
         key, value = arg.split('=', 1)
-        attr_name = key[2:].replace('-', '_')
+        attr_name = _option_name(key)
         _handle_key_value_arg(args, attr_name, value, list_fields)
         return i
     else:
         # Check if next arg is a value (not another option)
         if i + 1 < len(args_list) and not args_list[i + 1].startswith('--'):
-            attr_name = arg[2:].replace('-', '_')
+            attr_name = _option_name(arg)
             value = args_list[i + 1]
             _handle_flag_with_value(args, attr_name, value, list_fields)
             return i + 1
         else:
-            attr_name = arg[2:].replace('-', '_')
+            attr_name = _option_name(arg)
             _handle_boolean_flag(args, attr_name)
             return i
 
@@ -427,7 +469,7 @@ def legacy_gpustack_config() -> Optional[GPUStackConfig]:
 
 
 def is_first_boot() -> bool:
-    if sys.platform == "darwin":
+    if sys.platform != "win32":
         return not os.path.exists(_active_helper_config.config_path)
     exists, _ = service_exists()
     return not exists
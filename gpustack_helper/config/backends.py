@@ -1,35 +1,200 @@
+import io
+import sys
+import copy
+import stat
+import hashlib
+import tempfile
 import threading
+from collections import OrderedDict
 import yaml
 import logging
 import os
-from typing import Dict, Any, BinaryIO, Type
+from typing import Dict, Any, BinaryIO, Iterator, NamedTuple, Type, Tuple, Optional
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from pydantic import BaseModel
-from gpustack_helper.databinder import set_nested_data
+from gpustack_helper.config.model_plan import set_nested_data, model_plan
+from gpustack_helper.config.filelock import FileLock, lock_path_of
 
 logger = logging.getLogger(__name__)
 
+# prefer the libyaml bindings, they produce the same output as the pure python ones
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+# (st_mtime_ns, st_size, st_ino)
+Fingerprint = Tuple[int, int, int]
+
+
+def stat_fingerprint(st: os.stat_result) -> Fingerprint:
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def file_fingerprint(path: Optional[str]) -> Optional[Fingerprint]:
+    """
+    Return the stat fingerprint of the file, None if it doesn't exist.
+    """
+    if path is None:
+        return None
+    try:
+        return stat_fingerprint(os.stat(path))
+    except OSError:
+        return None
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """
+    Write the data to a temp file in the same directory, fsync it and rename it
+    over the target, so readers never see a truncated file.
+    """
+    path = os.path.realpath(path)
+    config_dir = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=config_dir
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if sys.platform != "win32":
+        # persist the rename itself
+        dir_fd = os.open(config_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
 
 class ModelBackend(ABC):
     model: BaseModel
-    _lock: threading.Lock
+    _lock: threading.RLock
+    _version: int = 0
+    _changed: bool = False
+    # thread holding the exclusive lock of the storage
+    _lock_owner: Optional[int] = None
+    lock_timeout: float = 10
 
     def __init__(self, model: BaseModel):
         self.model = model
-        self._lock = threading.Lock()
+        self._version = 0
+        self._changed = False
+        self._lock_owner = None
+        # reentrant as reload is called inside update_with_lock, and status probes
+        # reload the configs from the thread pool
+        self._lock = threading.RLock()
 
-    def update_with_lock(self, **kwargs):
+    @property
+    def lock_path(self) -> Optional[str]:
+        """
+        The file used to lock the storage across processes, None if the storage
+        doesn't need it.
+        """
+        return None
+
+    def holds_lock(self) -> bool:
+        return self._lock_owner == threading.get_ident()
+
+    @contextmanager
+    def locked(self, file_lock: bool = True) -> Iterator[None]:
+        """
+        Hold the exclusive lock of the storage within and across processes for
+        a read-modify-write cycle. Reentrant for the owning thread.
+        file_lock can be unset when the caller already holds the file lock
+        through another backend of the same file.
+        """
         with self._lock:
+            if self.holds_lock():
+                yield
+                return
+            file_lock = (
+                FileLock(self.lock_path, timeout=self.lock_timeout)
+                if file_lock and self.lock_path is not None
+                else None
+            )
+            if file_lock is not None:
+                file_lock.acquire()
+            self._lock_owner = threading.get_ident()
+            try:
+                yield
+            finally:
+                self._lock_owner = None
+                if file_lock is not None:
+                    file_lock.release()
+
+    def prepare_update(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Called with the lock held before kwargs are set on the model, e.g. to
+        create the storage. Returns the kwargs left for the model.
+        """
+        return kwargs
+
+    def update_with_lock(self, **kwargs):
+        with self.locked():
             self.reload()
-            set_nested_data(self.model, kwargs)
+            set_nested_data(self.model, self.prepare_update(kwargs))
             self.save()
 
+    @property
+    def version(self) -> int:
+        """
+        Increased every time the model is reloaded from the storage.
+        """
+        return self._version
+
+    @property
+    def changed(self) -> bool:
+        """
+        Whether the latest reload actually loaded new content.
+        """
+        return self._changed
+
+    def _mark_reloaded(self, changed: bool) -> None:
+        self._changed = changed
+        if changed:
+            self._version += 1
+
     @abstractmethod
     def reload(self):
         pass
 
     @abstractmethod
-    def save(self):
+    def save(self, strict: bool = False):
+        pass
+
+    def needs_save(self) -> bool:
+        """
+        Whether save() would write the storage. Storages which can't tell it
+        cheaply always write.
+        """
+        return True
+
+    @abstractmethod
+    def snapshot(self) -> Any:
+        """
+        Capture the current content of the storage for restore().
+        """
+        pass
+
+    @abstractmethod
+    def restore(self, snapshot: Any) -> None:
+        """
+        Write back a snapshot and reload the model from it.
+        """
         pass
 
 
@@ -55,12 +220,12 @@ class YamlEncoder(ModelEncoder):
     @classmethod
     def encode_to_data(cls, model: BaseModel) -> bytes:
         data = model.model_dump(exclude_defaults=True)
-        return yaml.safe_dump(data, stream=None).encode("utf-8")
+        return yaml.dump(data, stream=None, Dumper=YamlDumper).encode("utf-8")
 
     @classmethod
     def decode_from_data(cls, f: BinaryIO) -> Dict[str, Any]:
         data = f.read().decode("utf-8")
-        return yaml.safe_load(data)
+        return yaml.load(data, Loader=YamlLoader)
 
 
 class PlistEncoder(ModelEncoder):
@@ -78,44 +243,187 @@ class PlistEncoder(ModelEncoder):
         return plistlib.load(f)
 
 
+class CachedDocument(NamedTuple):
+    fingerprint: Fingerprint
+    # sha256 of the raw bytes
+    digest: bytes
+    content: Any
+
+
+class DocumentCache:
+    """
+    Process wide LRU cache of decoded config documents. Entries are keyed by
+    the real path and encoder, and only served while the stat fingerprint of
+    the file matches, so config instances sharing a file parse it once.
+    """
+
+    _maxsize: int
+    _entries: "OrderedDict[Tuple[str, Type[ModelEncoder]], CachedDocument]"
+    _lock: threading.Lock
+
+    def __init__(self, maxsize: int = 16):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, path: str, encoder: Type["ModelEncoder"]) -> CachedDocument:
+        """
+        Return the decoded document of the file, the content is a private copy
+        which can be mutated by the caller.
+        Raises FileNotFoundError if the file doesn't exist.
+        """
+        key = (os.path.realpath(path), encoder)
+        fingerprint = stat_fingerprint(os.stat(key[0]))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.fingerprint == fingerprint:
+                self._entries.move_to_end(key)
+                return entry._replace(content=copy.deepcopy(entry.content))
+        with open(key[0], "rb") as f:
+            fingerprint = stat_fingerprint(os.fstat(f.fileno()))
+            data = f.read()
+        entry = CachedDocument(
+            fingerprint,
+            hashlib.sha256(data).digest(),
+            encoder.decode_from_data(io.BytesIO(data)),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return entry._replace(content=copy.deepcopy(entry.content))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+document_cache = DocumentCache()
+
+
 class FileConfigModel(ModelBackend):
     _filepath: str = None
     _encoder: Type[ModelEncoder] = None
+    _fingerprint: Optional[Fingerprint] = None
+    # sha256 of the bytes last read from or written to the file
+    _disk_digest: Optional[bytes] = None
 
     @property
     def filepath(self) -> str:
         return self._filepath
 
+    @property
+    def lock_path(self) -> Optional[str]:
+        return lock_path_of(self.filepath)
+
     def __init__(self, model: BaseModel, filepath: str, encoder=YamlEncoder):
         self._filepath = filepath
         self._encoder = encoder
+        self._fingerprint = None
+        self._disk_digest = None
         super().__init__(model)
 
-    def reload(self):
+    def reload(self, force: bool = False) -> bool:
         """
         Reload the configuration from the file.
+        The file is only parsed when its stat fingerprint differs from the one
+        of the latest reload or save. Returns whether the model changed.
         """
-        if not os.path.exists(self.filepath):
+        fingerprint = file_fingerprint(self.filepath)
+        if fingerprint is None:
             logger.debug(
                 f"Configuration file not found, skipping loading: {self.filepath}"
             )
-            return
+            self._mark_reloaded(False)
+            return False
+        if not force and fingerprint == self._fingerprint:
+            self._mark_reloaded(False)
+            return False
         try:
-            with open(self.filepath, "rb") as f:
-                content = self._encoder.decode_from_data(f)
-                set_nested_data(self.model, content, reset_default=True)
+            if self.holds_lock():
+                document = document_cache.load(self.filepath, self._encoder)
+            else:
+                # shared lock, concurrent readers don't wait for each other
+                with FileLock(self.lock_path, shared=True, timeout=self.lock_timeout):
+                    document = document_cache.load(self.filepath, self._encoder)
         except Exception as e:
             logger.error(f"Failed to reload configuration: {e}")
+            self._mark_reloaded(False)
+            return False
+        with self._lock:
+            if not force and document.fingerprint == self._fingerprint:
+                # another thread has applied the same content
+                self._mark_reloaded(False)
+                return False
+            try:
+                changed = model_plan(type(self.model)).apply(
+                    self.model, document.content, reset_default=True
+                )
+            except Exception as e:
+                logger.error(f"Failed to reload configuration: {e}")
+                self._mark_reloaded(False)
+                return False
+            self._fingerprint = document.fingerprint
+            self._disk_digest = document.digest
+            # a rewrite with the same content keeps the model and its digest
+            self._mark_reloaded(bool(changed))
+            return bool(changed)
+
+    def snapshot(self) -> Optional[bytes]:
+        try:
+            with open(self.filepath, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def restore(self, snapshot: Optional[bytes]) -> None:
+        with self.locked():
+            if snapshot is None:
+                try:
+                    os.remove(self.filepath)
+                except FileNotFoundError:
+                    pass
+                self._fingerprint = None
+                self._disk_digest = None
+                set_nested_data(self.model, {}, reset_default=True)
+                return
+            if self.snapshot() != snapshot:
+                atomic_write(self.filepath, snapshot)
+            self.reload(force=True)
+
+    def _is_saved(self, digest: bytes) -> bool:
+        fingerprint = file_fingerprint(self.filepath)
+        return (
+            fingerprint is not None
+            and fingerprint == self._fingerprint
+            and digest == self._disk_digest
+        )
+
+    def needs_save(self) -> bool:
+        data = self._encoder.encode_to_data(self.model)
+        return not self._is_saved(hashlib.sha256(data).digest())
 
-    def save(self):
+    def save(self, strict: bool = False):
         """
         Save the configuration to the specified path.
+        The write is skipped when the encoded content matches the file.
         """
         try:
-            config_dir = os.path.dirname(self.filepath)
-            os.makedirs(config_dir, exist_ok=True)
-            with open(self.filepath, "wb") as f:
-                f.write(self._encoder.encode_to_data(self.model))
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            with self.locked():
+                data = self._encoder.encode_to_data(self.model)
+                digest = hashlib.sha256(data).digest()
+                if self._is_saved(digest):
+                    logger.debug(
+                        f"Configuration unchanged, skip saving: {self.filepath}"
+                    )
+                    return
+                atomic_write(self.filepath, data)
+                # the model is what has been written, no need to parse it again
+                self._fingerprint = file_fingerprint(self.filepath)
+                self._disk_digest = digest
         except Exception as e:
-            logger.error(f"Failed to create config directory {config_dir}: {e}")
-            return
+            logger.error(f"Failed to save configuration {self.filepath}: {e}")
+            if strict:
+                raise
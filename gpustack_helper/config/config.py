@@ -1,11 +1,12 @@
 import os
+import json
+import hashlib
 import logging
 import sys
-import socket
+from contextlib import nullcontext
 from pydantic import BaseModel, Field, PrivateAttr
-from typing import List, Dict, Optional, Callable, TypeVar, Tuple
-from PySide6.QtWidgets import QWidget
-from PySide6.QtGui import QGuiApplication
+from typing import TYPE_CHECKING, Any, List, Dict, Optional, Callable, TypeVar, Tuple
+from PySide6.QtCore import QCoreApplication
 from gpustack_helper.config.gpustack_config import Config
 from gpustack_helper.defaults import (
     log_file_path,
@@ -16,15 +17,86 @@ from gpustack_helper.defaults import (
     runtime_plist_path,
 )
 from gpustack_helper.config.backends import ModelBackend, FileConfigModel, PlistEncoder
-from gpustack_helper.databinder import DataBinder
+from gpustack_helper.config.ports import preflight_ports
+
+if TYPE_CHECKING:
+    # the widgets are only needed by the tray, not by the headless mode
+    from PySide6.QtWidgets import QWidget
+    from gpustack_helper.databinder import DataBinder
 
 logger = logging.getLogger(__name__)
 
 ModelBackend_Type = TypeVar("ModelBackend_Type", bound="ModelBackend")
 
 
-class HelperConfig(BaseModel):
+class DigestMixin:
+    """
+    Cache the canonical form of the model and its digest, so comparing two
+    configs doesn't dump the models again until one of them is mutated or
+    reloaded. The model class must declare the _backend, _canonical,
+    _canonical_version and _digest private attributes.
+    """
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self.invalidate_digest()
+
+    def invalidate_digest(self) -> None:
+        """
+        Must be called after mutating a field in place, e.g. a dict value.
+        """
+        self._canonical = None
+        self._digest = None
+
+    def _model_lock(self):
+        # the status probe reloads the model in place from the thread pool,
+        # the backend applies the new content while holding this lock
+        if self._backend is None:
+            return nullcontext()
+        return self._backend.locked(file_lock=False)
+
+    def canonical(self) -> Dict[str, Any]:
+        with self._model_lock():
+            # read before the dump, a reload bumps it after changing the model
+            version = self.version
+            if self._canonical is None or self._canonical_version != version:
+                self._canonical = self.model_dump(exclude_defaults=True, mode="json")
+                self._canonical_version = version
+                self._digest = None
+            return self._canonical
+
+    def digest(self) -> str:
+        with self._model_lock():
+            canonical = self.canonical()
+            if self._digest is None:
+                self._digest = hashlib.sha256(
+                    json.dumps(
+                        canonical, sort_keys=True, separators=(",", ":")
+                    ).encode()
+                ).hexdigest()
+            return self._digest
+
+    def diff(self, other: "DigestMixin") -> Dict[str, Tuple[Any, Any]]:
+        """
+        Return the top level keys whose values differ, mapped to
+        (value in self, value in other). Missing keys hold the default value.
+        """
+        if self.digest() == other.digest():
+            return {}
+        mine, theirs = self.canonical(), other.canonical()
+        return {
+            key: (mine.get(key), theirs.get(key))
+            for key in sorted(mine.keys() | theirs.keys())
+            if mine.get(key) != theirs.get(key)
+        }
+
+
+class HelperConfig(DigestMixin, BaseModel):
     _backend: Optional[ModelBackend] = PrivateAttr(default=None)
+    _canonical: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    _canonical_version: int = PrivateAttr(default=0)
+    _digest: Optional[str] = PrivateAttr(default=None)
     _data_dir: Optional[str] = PrivateAttr(default=None)
     _binary_path: Optional[str] = PrivateAttr(
         default=None,
@@ -36,6 +108,10 @@ class HelperConfig(BaseModel):
         default=None,
     )
     _debug: Optional[bool] = PrivateAttr(default=False)
+    # status poll intervals in milliseconds, see gpustack_helper.watcher
+    _poll_fast_interval: int = PrivateAttr(default=250)
+    _poll_visible_interval: int = PrivateAttr(default=2000)
+    _poll_max_interval: int = PrivateAttr(default=60000)
     Label: str = Field(default="ai.gpustack", description="服务名称")
     ProgramArguments: List[str] = Field(
         default_factory=list,
@@ -64,6 +140,27 @@ class HelperConfig(BaseModel):
     def config_path(self) -> Optional[str]:
         return self._config_path
 
+    @property
+    def poll_fast_interval(self) -> int:
+        """
+        Poll interval while the service is starting, stopping or restarting.
+        """
+        return self._poll_fast_interval
+
+    @property
+    def poll_visible_interval(self) -> int:
+        """
+        Max poll interval while the tray menu is shown.
+        """
+        return self._poll_visible_interval
+
+    @property
+    def poll_max_interval(self) -> int:
+        """
+        Max poll interval while the service is stable and the menu is closed.
+        """
+        return self._poll_max_interval
+
     @property
     def default_program_arguments(self) -> List[str]:
         return [
@@ -75,16 +172,17 @@ class HelperConfig(BaseModel):
 
     def _ensure_program_arguments(self) -> dict:
         rtn = dict()
-        if sys.platform == "darwin" and self._binary_path and self._data_dir:
+        if sys.platform != "win32" and self._binary_path and self._data_dir:
             self.ProgramArguments = self.default_program_arguments
             rtn['ProgramArguments'] = self.ProgramArguments
         return rtn
 
     def _ensure_environment_home(self) -> None:
-        if sys.platform != "darwin":
+        if sys.platform == "win32":
             return
         if self.EnvironmentVariables.get("HOME", None) is None:
             self.EnvironmentVariables["HOME"] = os.path.join(self._data_dir, "root")
+            self.invalidate_digest()
 
     def update_with_lock(self, **kwargs):
         """
@@ -105,14 +203,30 @@ class HelperConfig(BaseModel):
         if self._backend is not None:
             self._backend.reload()
 
-    def save(self):
+    @property
+    def version(self) -> int:
+        """
+        Increased every time the configuration is reloaded with new content.
+        """
+        return self._backend.version if self._backend is not None else 0
+
+    def save(self, strict: bool = False):
         """
         Save the configuration to the specified path.
+        Errors are raised instead of logged when strict is set.
         """
         self._ensure_program_arguments()
         self._ensure_environment_home()
         if self._backend is not None:
-            self._backend.save()
+            self._backend.save(strict=strict)
+
+    def needs_save(self) -> bool:
+        """
+        Whether save() would write the config file.
+        """
+        self._ensure_program_arguments()
+        self._ensure_environment_home()
+        return self._backend is not None and self._backend.needs_save()
 
     def __init__(
         self,
@@ -124,6 +238,9 @@ class HelperConfig(BaseModel):
         debug: Optional[bool] = None,
         gpustack_config_path: Optional[str] = None,
         legacy: bool = False,
+        poll_fast_interval: Optional[int] = None,
+        poll_visible_interval: Optional[int] = None,
+        poll_max_interval: Optional[int] = None,
         **kwargs,
     ):
         super().__init__(**kwargs)
@@ -131,6 +248,13 @@ class HelperConfig(BaseModel):
         self._binary_path = binary_path or gpustack_binary_path
         self._config_path = config_path
         self._debug = debug if debug is not None else False
+        for name, value in (
+            ("_poll_fast_interval", poll_fast_interval),
+            ("_poll_visible_interval", poll_visible_interval),
+            ("_poll_max_interval", poll_max_interval),
+        ):
+            if value is not None:
+                setattr(self, name, value)
         self._gpustack_config_path = gpustack_config_path or os.path.join(
             self._data_dir, gpustack_config_name
         )
@@ -144,13 +268,18 @@ class HelperConfig(BaseModel):
 
     @classmethod
     def bind(
-        cls, key: str, widget: QWidget, /, ignore_zero_value: bool = False
-    ) -> DataBinder:
+        cls, key: str, widget: "QWidget", /, ignore_zero_value: bool = False
+    ) -> "DataBinder":
+        from gpustack_helper.databinder import DataBinder
+
         return DataBinder(key, cls, widget, ignore_zero_value=ignore_zero_value)
 
 
-class GPUStackConfig(Config):
+class GPUStackConfig(DigestMixin, Config):
     _backend: Optional[ModelBackend] = PrivateAttr(default=None)
+    _canonical: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    _canonical_version: int = PrivateAttr(default=0)
+    _digest: Optional[str] = PrivateAttr(default=None)
     _confg_path: str = PrivateAttr(default=None)
     _data_dir: str = PrivateAttr(default=None)
 
@@ -177,12 +306,26 @@ class GPUStackConfig(Config):
         if self._backend is not None:
             self._backend.reload()
 
-    def save(self):
+    @property
+    def version(self) -> int:
+        """
+        Increased every time the configuration is reloaded with new content.
+        """
+        return self._backend.version if self._backend is not None else 0
+
+    def save(self, strict: bool = False):
         """
         Save the configuration to the specified path.
+        Errors are raised instead of logged when strict is set.
         """
         if self._backend is not None:
-            self._backend.save()
+            self._backend.save(strict=strict)
+
+    def needs_save(self) -> bool:
+        """
+        Whether save() would write the config file.
+        """
+        return self._backend is not None and self._backend.needs_save()
 
     def __init__(
         self,
@@ -227,8 +370,10 @@ class GPUStackConfig(Config):
 
     @classmethod
     def bind(
-        cls, key: str, widget: QWidget, /, ignore_zero_value: bool = False
-    ) -> DataBinder:
+        cls, key: str, widget: "QWidget", /, ignore_zero_value: bool = False
+    ) -> "DataBinder":
+        from gpustack_helper.databinder import DataBinder
+
         return DataBinder(key, cls, widget, ignore_zero_value=ignore_zero_value)
 
     def validate_updates(self, **kwargs):
@@ -241,7 +386,8 @@ class GPUStackConfig(Config):
 
 
 def legacy_helper_config() -> Optional[HelperConfig]:
-    if not os.path.exists(runtime_plist_path):
+    # only macOS has a legacy launchd plist
+    if runtime_plist_path is None or not os.path.exists(runtime_plist_path):
         return None
     if os.path.islink(runtime_plist_path):
         return None
@@ -255,22 +401,34 @@ def legacy_helper_config() -> Optional[HelperConfig]:
 
 
 def test_port_available(config: GPUStackConfig) -> None:
-    port, _ = config.get_port()
-    host = config.host or '127.0.0.1'
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        try:
-            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            s.bind((host, port))
-        except OSError as e:
-            logger.debug(f"Port {host}:{port} unavailable: {e}")
-            raise RuntimeError(
-                QGuiApplication.translate(
-                    "GPUStackConfig",
-                    "Port {host}:{port} is already in use.".format(
-                        host=host, port=port
-                    ),
-                )
+    """
+    Check every port the service will bind, raise with all the conflicts.
+    """
+    report = preflight_ports(config)
+    if not report.conflicts:
+        return
+    conflicts = report.conflicts
+    if len(conflicts) == 1 and conflicts[0].owner is None and not report.suggestions:
+        raise RuntimeError(
+            QCoreApplication.translate(
+                "GPUStackConfig",
+                "Port {host}:{port} is already in use.".format(
+                    host=conflicts[0].host, port=conflicts[0].port
+                ),
             )
+        )
+    lines = [str(c) for c in conflicts]
+    lines.extend(
+        QCoreApplication.translate(
+            "GPUStackConfig", "Suggested {field}: {range}"
+        ).format(field=field, range=value)
+        for field, value in report.suggestions.items()
+    )
+    raise RuntimeError(
+        QCoreApplication.translate(
+            "GPUStackConfig", "Some ports are not available:\n{conflicts}"
+        ).format(conflicts="\n".join(lines))
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import logging
+from typing import Optional, Set
+
+logger = logging.getLogger(__name__)
+
+if sys.platform == "win32":
+    import msvcrt
+    import pywintypes
+    import win32con
+    import win32file
+else:
+    import fcntl
+
+# polling interval bounds while waiting for a contended lock, in seconds
+_min_wait = 0.001
+_max_wait = 0.05
+# lock files already reported as unusable for shared locks
+_unlocked_paths: Set[str] = set()
+
+
+class LockFileError(OSError):
+    """
+    The lock file of an exclusive lock can't be opened, e.g. it was created
+    by another user or its directory is read-only.
+    """
+
+
+class FileLock:
+    """
+    Advisory lock shared between processes, based on flock on POSIX and byte
+    range locks on Windows. Readers take shared locks and don't block each
+    other, writers take exclusive locks.
+
+    If the lock file can't be opened, an exclusive lock raises LockFileError
+    as the exclusion can't be guaranteed. A shared lock degrades to a no-op
+    with a warning, e.g. for the active configs in a root owned directory,
+    they are replaced by renames and never read half written.
+    """
+
+    path: str
+    shared: bool
+    timeout: Optional[float]
+    _fd: Optional[int] = None
+
+    def __init__(self, path: str, shared: bool = False, timeout: Optional[float] = 10):
+        self.path = path
+        self.shared = shared
+        self.timeout = timeout
+        self._fd = None
+
+    def _open(self) -> Optional[int]:
+        try:
+            return os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        except OSError:
+            pass
+        try:
+            return os.open(self.path, os.O_RDONLY)
+        except OSError as e:
+            if not self.shared:
+                raise LockFileError(
+                    e.errno, f"Unable to open lock file {self.path}: {e.strerror}"
+                ) from e
+            if self.path not in _unlocked_paths:
+                _unlocked_paths.add(self.path)
+                logger.warning(
+                    f"Unable to open lock file {self.path}, reading unlocked: {e}"
+                )
+            return None
+
+    def _try_lock(self) -> bool:
+        if sys.platform == "win32":
+            try:
+                if self.shared:
+                    win32file.LockFileEx(
+                        msvcrt.get_osfhandle(self._fd),
+                        win32con.LOCKFILE_FAIL_IMMEDIATELY,
+                        0,
+                        1,
+                        pywintypes.OVERLAPPED(),
+                    )
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                return True
+            except (OSError, pywintypes.error):
+                return False
+        try:
+            fcntl.flock(
+                self._fd,
+                (fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX) | fcntl.LOCK_NB,
+            )
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(self) -> None:
+        if sys.platform == "win32":
+            if self.shared:
+                win32file.UnlockFileEx(
+                    msvcrt.get_osfhandle(self._fd), 0, 1, pywintypes.OVERLAPPED()
+                )
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def acquire(self) -> None:
+        fd = self._open()
+        if fd is None:
+            return
+        self._fd = fd
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        wait = _min_wait
+        while not self._try_lock():
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(self._fd)
+                self._fd = None
+                raise TimeoutError(
+                    f"Timeout acquiring {'shared' if self.shared else 'exclusive'} lock on {self.path}"
+                )
+            time.sleep(wait)
+            wait = min(wait * 2, _max_wait)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            self._unlock()
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+def lock_path_of(path: str) -> str:
+    """
+    The lock file of a config file, e.g. config.yaml -> .config.yaml.lock
+    """
+    dirname, basename = os.path.split(path)
+    return os.path.join(dirname, f".{basename}.lock")
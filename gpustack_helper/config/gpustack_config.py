@@ -1,7 +1,7 @@
-import yaml
 from typing import Optional, List, Dict, Any
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from gpustack_helper.config.backends import document_cache, YamlEncoder
 
 
 class CommonConfigMixin:
@@ -112,5 +112,4 @@ class Config(
 
 
 def load_config_from_yaml(yaml_file: str) -> Dict[str, Any]:
-    with open(yaml_file, "r") as file:
-        return yaml.safe_load(file)
+    return document_cache.load(yaml_file, YamlEncoder).content
@@ -0,0 +1,179 @@
+"""
+Qt-free helpers to read and write pydantic config models, shared by the
+config backends and the widget data binders.
+"""
+
+import copy
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Type
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+from pydantic_core import PydanticUndefined
+
+
+def get_nested_field_value(
+    model: BaseModel, field_path: str, default: Any = None
+) -> Any:
+    """
+    Get the actual value of a nested model field
+
+    Args:
+        model: Pydantic model instance
+        field_path: Dot-separated field path (e.g. 'user.address.street')
+        default: The default value to return if the field does not exist
+
+    Returns:
+        The field value or the default value
+    """
+    try:
+        parts = field_path.split(".")
+        current = model
+
+        for part in parts:
+            if not hasattr(current, part):
+                return default
+            current = getattr(current, part)
+
+            # 如果遇到None值，提前返回
+            if current is None:
+                return default
+
+        return current
+    except Exception:
+        return default
+
+
+class FieldSetter(NamedTuple):
+    name: str
+    default: Callable[[], Any]
+    # the value to compare with before calling default, _missing if unknown
+    default_value: Any
+
+
+_missing = object()
+_immutable_types = (type(None), str, int, float, bool, bytes, tuple, frozenset)
+# factories which always build the same value, it's compared without calling
+_pure_factories = (list, dict, set, tuple, str, int, float, bool)
+
+
+def _field_setter(name: str, field: FieldInfo) -> Optional[FieldSetter]:
+    if field.default_factory is not None:
+        factory = field.default_factory
+        if factory in _pure_factories:
+            return FieldSetter(name, factory, factory())
+        return FieldSetter(name, factory, _missing)
+    default = field.default
+    if default is PydanticUndefined:
+        return None  # required field, nothing to reset to
+    if isinstance(default, _immutable_types):
+        return FieldSetter(name, lambda: default, default)
+    return FieldSetter(name, lambda: copy.deepcopy(default), default)
+
+
+class ModelPlan:
+    """
+    Field setters and defaults of a model class, built once from model_fields.
+    Applying data only writes the fields whose values changed, so reloading an
+    unchanged document doesn't touch the model at all.
+    """
+
+    model_class: Type[BaseModel]
+    fields: Dict[str, FieldSetter]
+    # plain models can be written through __dict__ without pydantic's setattr
+    _direct: bool
+    _invalidate: Optional[Callable[[BaseModel], None]]
+
+    def __init__(self, model_class: Type[BaseModel]):
+        self.model_class = model_class
+        self.fields = {}
+        for name, field in model_class.model_fields.items():
+            setter = _field_setter(name, field)
+            if setter is not None:
+                self.fields[name] = setter
+        config = model_class.model_config
+        self._direct = not config.get("validate_assignment", False) and not config.get(
+            "frozen", False
+        )
+        # the model caches derived data, e.g. DigestMixin
+        self._invalidate = getattr(model_class, "invalidate_digest", None)
+
+    def _set(self, model: BaseModel, name: str, value: Any) -> bool:
+        current = model.__dict__.get(name, _missing)
+        if current is value or (current is not _missing and current == value):
+            return False
+        if self._direct:
+            model.__dict__[name] = value
+            model.__pydantic_fields_set__.add(name)
+        else:
+            setattr(model, name, value)
+        return True
+
+    def _reset(self, model: BaseModel, setter: FieldSetter) -> bool:
+        current = model.__dict__.get(setter.name, _missing)
+        if setter.default_value is not _missing and current == setter.default_value:
+            return False
+        return self._set(model, setter.name, setter.default())
+
+    def _apply_key(
+        self, model: BaseModel, key: str, value: Any, reset_default: bool
+    ) -> bool:
+        if key not in self.fields:
+            # not a field with a default, e.g. a property
+            if not hasattr(model, key):
+                return False
+            setattr(model, key, value)
+            return True
+        attr = model.__dict__.get(key)
+        if isinstance(value, dict) and isinstance(attr, BaseModel):
+            return bool(model_plan(type(attr)).apply(attr, value, reset_default))
+        return self._set(model, key, value)
+
+    def apply(
+        self, model: BaseModel, data: Dict[str, Any], reset_default: bool = False
+    ) -> List[str]:
+        """
+        Write data into the model, fields missing from data are reset to their
+        defaults if reset_default is set. Returns the names of changed fields.
+        """
+        changed = [
+            key
+            for key, value in data.items()
+            if self._apply_key(model, key, value, reset_default)
+        ]
+        if reset_default:
+            for name, setter in self.fields.items():
+                if name not in data and self._reset(model, setter):
+                    changed.append(name)
+        if changed and self._direct and self._invalidate is not None:
+            self._invalidate(model)
+        return changed
+
+
+@lru_cache(maxsize=None)
+def model_plan(model_class: Type[BaseModel]) -> ModelPlan:
+    return ModelPlan(model_class)
+
+
+def reset_model_to_default(model: BaseModel):
+    model_plan(type(model)).apply(model, {}, reset_default=True)
+
+
+def set_nested_data(
+    model: BaseModel, data: Dict[str, Any], reset_default: bool = False
+) -> bool:
+    """
+    Recursively update the contents of a dict into a nested Pydantic BaseModel instance
+
+    Args:
+        model: Pydantic model instance
+        data: dict data
+        reset_default: Reset the fields missing from data to their defaults
+
+    Returns:
+        bool: Whether all updates succeeded
+    """
+    try:
+        model_plan(type(model)).apply(model, data, reset_default)
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,126 @@
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# suggested port ranges stay out of the well known ports
+min_suggested_port = 1024
+max_port = 65535
+
+
+class PortOwner(NamedTuple):
+    pid: Optional[int]
+    name: Optional[str]
+
+    def __str__(self) -> str:
+        if self.pid is None:
+            return "unknown process"
+        return f"{self.name or 'unknown'} (pid {self.pid})"
+
+
+class _Socket(NamedTuple):
+    port: int
+    listening: bool
+    pid: Optional[int]
+
+
+def _sockets() -> List[_Socket]:
+    try:
+        return [
+            _Socket(conn.laddr.port, conn.status == psutil.CONN_LISTEN, conn.pid)
+            for conn in psutil.net_connections(kind="inet")
+            if conn.laddr
+        ]
+    except psutil.AccessDenied:
+        pass
+    # macOS only lists the sockets of other processes to root, fall back to
+    # the processes we are allowed to inspect
+    sockets = []
+    for process in psutil.process_iter():
+        try:
+            connections = process.net_connections(kind="inet")
+        except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+            continue
+        sockets.extend(
+            _Socket(conn.laddr.port, conn.status == psutil.CONN_LISTEN, process.pid)
+            for conn in connections
+            if conn.laddr
+        )
+    return sockets
+
+
+def _process_name(pid: Optional[int], names: Dict[int, Optional[str]]) -> Optional[str]:
+    if pid is None:
+        return None
+    if pid not in names:
+        try:
+            names[pid] = psutil.Process(pid).name()
+        except psutil.Error:
+            names[pid] = None
+    return names[pid]
+
+
+class PortMap:
+    """
+    One snapshot of the local sockets, indexed by local port. Listening
+    sockets win over other sockets bound to the same port.
+    """
+
+    owners: Dict[int, PortOwner]
+
+    def __init__(self, owners: Dict[int, PortOwner]):
+        self.owners = owners
+
+    @classmethod
+    def snapshot(cls) -> "PortMap":
+        if psutil is None:
+            logger.debug("psutil is not available, port owners are unknown")
+            return cls({})
+        try:
+            sockets = _sockets()
+        except Exception as e:
+            logger.debug(f"Failed to list network connections: {e}")
+            return cls({})
+        owners: Dict[int, PortOwner] = {}
+        listening = set()
+        names: Dict[int, Optional[str]] = {}
+        for sock in sockets:
+            if sock.port in listening or (sock.port in owners and not sock.listening):
+                continue
+            owners[sock.port] = PortOwner(sock.pid, _process_name(sock.pid, names))
+            if sock.listening:
+                listening.add(sock.port)
+        return cls(owners)
+
+    def owner(self, port: int) -> Optional[PortOwner]:
+        return self.owners.get(port)
+
+    def free_block(
+        self, width: int, near: int, reserved: Iterable[int] = ()
+    ) -> Optional[range]:
+        """
+        Return the free block of width contiguous ports whose start is the
+        nearest to near, skipping the ports in the snapshot and reserved.
+        """
+        busy = [0] * (max_port + 2)
+        for port in (*self.owners.keys(), *reserved):
+            if 0 <= port <= max_port:
+                busy[port] = 1
+        # prefix[i] is the number of busy ports below i
+        prefix = [0] * (max_port + 2)
+        for port in range(max_port + 1):
+            prefix[port + 1] = prefix[port] + busy[port]
+        last_start = max_port - width + 1
+        for distance in range(max_port + 1):
+            for start in (near - distance, near + distance):
+                if min_suggested_port <= start <= last_start:
+                    if prefix[start + width] == prefix[start]:
+                        return range(start, start + width)
+            if near - distance < min_suggested_port and near + distance > last_start:
+                break
+        return None
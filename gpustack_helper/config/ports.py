@@ -0,0 +1,183 @@
+import sys
+import errno
+import socket
+import logging
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from gpustack_helper.config.portmap import PortMap, PortOwner
+
+if TYPE_CHECKING:
+    from gpustack_helper.config.config import GPUStackConfig
+
+logger = logging.getLogger(__name__)
+
+
+# fields holding a range of ports, e.g. "40000-40063"
+port_range_fields = (
+    "service_port_range",
+    "rpc_server_port_range",
+    "ray_worker_port_range",
+)
+
+
+class PortConflict(NamedTuple):
+    field: str
+    host: str
+    port: int
+    error: str
+    owner: Optional[PortOwner] = None
+
+    def __str__(self) -> str:
+        if not self.port:
+            return f"{self.field}: {self.error}"
+        text = f"{self.field}: {self.host}:{self.port} {self.error}"
+        return f"{text} by {self.owner}" if self.owner is not None else text
+
+
+class PortReport(NamedTuple):
+    conflicts: List[PortConflict]
+    # free port ranges suggested for the conflicting *_port_range fields
+    suggestions: Dict[str, str]
+
+
+def parse_port_range(value: str) -> range:
+    """
+    Parse a port range like "40000-40063", both ends included.
+    """
+    start, _, end = value.partition("-")
+    try:
+        first, last = int(start), int(end or start)
+    except ValueError:
+        raise ValueError(f"invalid port range {value}") from None
+    if not 0 < first <= last < 65536:
+        raise ValueError(f"invalid port range {value}")
+    return range(first, last + 1)
+
+
+def _server_ports(config: "GPUStackConfig") -> Iterator[Tuple[str, int]]:
+    port, _ = config.get_port()
+    yield "port", port
+    if config.enable_ray:
+        yield "ray_port", config.ray_port
+        yield "ray_client_server_port", config.ray_client_server_port
+
+
+def _worker_ports(config: "GPUStackConfig") -> Iterator[Tuple[str, int]]:
+    yield "worker_port", config.worker_port
+    if not config.disable_metrics:
+        yield "metrics_port", config.metrics_port
+    if config.enable_ray:
+        yield "ray_node_manager_port", config.ray_node_manager_port
+        yield "ray_object_manager_port", config.ray_object_manager_port
+
+
+def _worker_port_ranges(config: "GPUStackConfig") -> Iterator[Tuple[str, str]]:
+    yield "service_port_range", config.service_port_range
+    if not config.disable_rpc_servers:
+        yield "rpc_server_port_range", config.rpc_server_port_range
+    if config.enable_ray:
+        yield "ray_worker_port_range", config.ray_worker_port_range
+
+
+def required_ports(
+    config: "GPUStackConfig",
+) -> Tuple[List[Tuple[str, int]], List[PortConflict]]:
+    """
+    Return the (field, port) pairs the service will bind with the config, and
+    the conflicts of malformed port ranges.
+    """
+    host = _bind_host(config)
+    is_server = not config.server_url
+    ports: List[Tuple[str, int]] = []
+    invalid: List[PortConflict] = []
+    if is_server:
+        ports.extend(_server_ports(config))
+    if not is_server or not config.disable_worker:
+        ports.extend(_worker_ports(config))
+        for field, value in _worker_port_ranges(config):
+            if not value:
+                continue
+            try:
+                ports.extend((field, port) for port in parse_port_range(value))
+            except ValueError as e:
+                invalid.append(PortConflict(field, host, 0, str(e)))
+    return ports, invalid
+
+
+def _bind_host(config: "GPUStackConfig") -> str:
+    return config.host or "127.0.0.1"
+
+
+def _try_bind(host: str, port: int) -> Optional[str]:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as s:
+        if sys.platform == "win32":
+            # SO_REUSEADDR lets a socket steal a bound port on Windows
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind((host, port))
+        except OSError as e:
+            if e.errno in (errno.EADDRINUSE, getattr(errno, "WSAEADDRINUSE", None)):
+                return "in use"
+            return e.strerror or str(e)
+    return None
+
+
+def check_ports(config: "GPUStackConfig") -> List[PortConflict]:
+    """
+    Bind every port the service needs and report the ones that failed, along
+    with the ports claimed by more than one field.
+    """
+    host = _bind_host(config)
+    ports, conflicts = required_ports(config)
+    claimed: Dict[int, str] = {}
+    for field, port in ports:
+        if port in claimed:
+            conflicts.append(
+                PortConflict(field, host, port, f"also used by {claimed[port]}")
+            )
+            continue
+        claimed[port] = field
+        error = _try_bind(host, port)
+        if error is not None:
+            conflicts.append(PortConflict(field, host, port, error))
+    if conflicts:
+        logger.debug(f"Port conflicts: {conflicts}")
+    return conflicts
+
+
+def _suggest_port_ranges(
+    config: "GPUStackConfig", conflicts: List[PortConflict], portmap: PortMap
+) -> Dict[str, str]:
+    ports, _ = required_ports(config)
+    suggestions: Dict[str, str] = {}
+    # suggested blocks must not overlap each other either
+    suggested: List[int] = []
+    for field in port_range_fields:
+        if not any(c.field == field and c.port for c in conflicts):
+            continue
+        current = parse_port_range(getattr(config, field))
+        reserved = [port for name, port in ports if name != field] + suggested
+        block = portmap.free_block(len(current), current.start, reserved)
+        if block is not None:
+            suggestions[field] = f"{block.start}-{block.stop - 1}"
+            suggested.extend(block)
+    return suggestions
+
+
+def preflight_ports(config: "GPUStackConfig") -> PortReport:
+    """
+    Check the ports, then look up the owners of the taken ones and suggest free
+    blocks for the conflicting port ranges from a single socket snapshot.
+    """
+    conflicts = check_ports(config)
+    if not any(c.error == "in use" for c in conflicts):
+        return PortReport(conflicts, {})
+    portmap = PortMap.snapshot()
+    conflicts = [
+        c._replace(owner=portmap.owner(c.port)) if c.error == "in use" else c
+        for c in conflicts
+    ]
+    return PortReport(conflicts, _suggest_port_ranges(config, conflicts, portmap))
@@ -0,0 +1,224 @@
+"""
+Index of the config model fields: type, list-ness, element type, default and
+CLI flag. The index is built from model_fields on first use and memoized. The
+frozen app ships a prebuilt copy, keyed by the helper and gpustack versions, so
+the bundle doesn't introspect the models on startup, see helper.spec.
+"""
+
+import os
+import sys
+import json
+import types
+import logging
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Type, Union
+from typing import get_args, get_origin
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+from pydantic_core import PydanticUndefined
+from gpustack_helper import __version__, __gpustack_commit__
+from gpustack_helper.defaults import config_schema_path
+from gpustack_helper.config.gpustack_config import (
+    CommonConfigMixin,
+    ServerConfigCLIMixin,
+    WorkerConfigCLIMixin,
+    list_config_attributes,
+)
+from gpustack_helper.config.config import HelperConfig, GPUStackConfig
+
+logger = logging.getLogger(__name__)
+
+SchemaIndex = Dict[str, Dict[str, "FieldSchema"]]
+
+_python_types: Dict[str, type] = {
+    "str": str,
+    "int": int,
+    "bool": bool,
+    "float": float,
+    "dict": dict,
+    "list": list,
+}
+
+indexed_models: Tuple[Type[BaseModel], ...] = (GPUStackConfig, HelperConfig)
+
+
+class FieldSchema(NamedTuple):
+    name: str
+    # one of the keys of _python_types, or "object"
+    type: str
+    optional: bool
+    element_type: Optional[str]
+    has_default: bool
+    # only meaningful when has_default, the JSON form of the default
+    default: Any
+    cli_flag: Optional[str]
+
+    @property
+    def is_list(self) -> bool:
+        return self.type == "list"
+
+    @property
+    def python_type(self) -> Optional[type]:
+        return _python_types.get(self.type)
+
+    @property
+    def element_python_type(self) -> Optional[type]:
+        return _python_types.get(self.element_type)
+
+    def is_default(self, value: Any) -> bool:
+        return self.has_default and value == self.default
+
+
+def _type_name(annotation: Any) -> str:
+    for name, python_type in _python_types.items():
+        if annotation is python_type:
+            return name
+    return "object"
+
+
+def _describe(annotation: Any) -> Tuple[str, bool, Optional[str]]:
+    """
+    Return (type, optional, element type) of an annotation.
+    """
+    optional = False
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = get_args(annotation)
+        non_none = [arg for arg in args if arg is not type(None)]
+        optional = len(non_none) < len(args)
+        if len(non_none) == 1:
+            annotation = non_none[0]
+    origin = get_origin(annotation) or annotation
+    if origin is list:
+        args = get_args(annotation)
+        return "list", optional, _type_name(args[0]) if args else None
+    return _type_name(origin), optional, None
+
+
+def _default_of(field: FieldInfo) -> Tuple[bool, Any]:
+    if field.default_factory is not None:
+        if field.default_factory in (list, dict):
+            return True, field.default_factory()
+        return False, None
+    if field.default is PydanticUndefined:
+        return False, None
+    try:
+        json.dumps(field.default)
+    except (TypeError, ValueError):
+        return False, None
+    return True, field.default
+
+
+def _cli_fields(model: Type[BaseModel]) -> set:
+    if not issubclass(model, CommonConfigMixin):
+        return set()
+    return {
+        name
+        for mixin in (CommonConfigMixin, ServerConfigCLIMixin, WorkerConfigCLIMixin)
+        for name in list_config_attributes(mixin)
+    }
+
+
+def build_model_schema(
+    model: Type[BaseModel], prefix: str = ""
+) -> Dict[str, FieldSchema]:
+    """
+    Nested models are indexed with dot-separated paths, e.g. 'a.b'.
+    """
+    cli_fields = _cli_fields(model)
+    schema: Dict[str, FieldSchema] = {}
+    for name, field in model.model_fields.items():
+        path = f"{prefix}{name}"
+        type_name, optional, element_type = _describe(field.annotation)
+        has_default, default = _default_of(field)
+        schema[path] = FieldSchema(
+            name=path,
+            type=type_name,
+            optional=optional,
+            element_type=element_type,
+            has_default=has_default,
+            default=default,
+            cli_flag=(
+                "--" + name.replace("_", "-")
+                if name in cli_fields and not prefix
+                else None
+            ),
+        )
+        nested = field.annotation
+        if isinstance(nested, type) and issubclass(nested, BaseModel):
+            schema.update(build_model_schema(nested, prefix=f"{path}."))
+    return schema
+
+
+def schema_key() -> str:
+    return f"{__version__}+{__gpustack_commit__}"
+
+
+def build_schema_index() -> SchemaIndex:
+    return {model.__name__: build_model_schema(model) for model in indexed_models}
+
+
+def save_schema_index(path: str) -> None:
+    content = {
+        "key": schema_key(),
+        "models": {
+            model_name: [field._asdict() for field in fields.values()]
+            for model_name, fields in build_schema_index().items()
+        },
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(content, f, indent=2, sort_keys=True)
+
+
+def load_schema_index(path: str) -> Optional[SchemaIndex]:
+    """
+    Return None if the file is missing or built for another version.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = json.load(f)
+        if content.get("key") != schema_key():
+            logger.debug(f"Ignoring config schema built for {content.get('key')}")
+            return None
+        return {
+            model_name: {item["name"]: FieldSchema(**item) for item in fields}
+            for model_name, fields in content["models"].items()
+        }
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to load config schema from {path}: {e}")
+        return None
+
+
+@lru_cache(maxsize=None)
+def schema_index() -> SchemaIndex:
+    index = None
+    if getattr(sys, "frozen", False):
+        index = load_schema_index(config_schema_path)
+    if index is None:
+        index = build_schema_index()
+    return index
+
+
+@lru_cache(maxsize=None)
+def model_schema(model: Type[BaseModel]) -> Dict[str, FieldSchema]:
+    if model in indexed_models:
+        return schema_index()[model.__name__]
+    return build_model_schema(model)
+
+
+def field_schema(model: Type[BaseModel], path: str) -> Optional[FieldSchema]:
+    return model_schema(model).get(path)
+
+
+@lru_cache(maxsize=None)
+def cli_flags(model: Type[BaseModel]) -> Dict[str, str]:
+    """
+    Map the CLI flags of a model to its field names, e.g. '--data-dir' -> 'data_dir'.
+    """
+    return {
+        field.cli_flag: name
+        for name, field in model_schema(model).items()
+        if field.cli_flag is not None
+    }
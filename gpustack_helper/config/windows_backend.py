@@ -5,7 +5,7 @@ import logging
 import win32service
 from gpustack_helper.defaults import nssm_binary_path
 from gpustack_helper.config.backends import ModelBackend
-from gpustack_helper.databinder import set_nested_data
+from gpustack_helper.config.model_plan import model_plan, set_nested_data
 from gpustack_helper.config.config import (
     HelperConfig,
 )
@@ -132,24 +132,31 @@ class RegistryModel(ModelBackend):
         if stderr is not None and stderr != "":
             config_data["StandardErrorPath"] = registry_data.get("AppStderr")
 
+    def prepare_update(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create the service if it doesn't exist yet and write the values which
+        are not fields of the model, i.e. data_dir and nssm_path.
+        """
+        kwargs = dict(kwargs)
+        config_data = {}
+        data_dir = kwargs.pop('data_dir', None)
+        if data_dir:
+            config_data['AppDirectory'] = data_dir
+        nssm_path = kwargs.pop('nssm_path', None)
+        if nssm_path:
+            config_data['NSSMPath'] = nssm_path
+        if ensure_service():
+            # in create service case, the AppDirectory is not set
+            config_data['AppDirectory'] = self.helper_config.data_dir
+            config_data['NSSMPath'] = str(nssm_binary_path)
+        if len(config_data) != 0:
+            set_in_registry(config_data)
+        return kwargs
+
     def update_with_lock(self, **kwargs):
-        with self._lock:
-            config_data = {}
-            data_dir = kwargs.pop('data_dir', None)
-            if data_dir:
-                config_data['AppDirectory'] = data_dir
-            nssm_path = kwargs.pop('nssm_path', None)
-            if nssm_path:
-                config_data['NSSMPath'] = nssm_path
-            if not ensure_service():
-                self.reload()
-            else:
-                # in create service case, the AppDirectory is not set
-                config_data['AppDirectory'] = self.helper_config.data_dir
-                config_data['NSSMPath'] = str(nssm_binary_path)
-            if len(config_data) != 0:
-                set_in_registry(config_data)
-            set_nested_data(self.helper_config, kwargs)
+        with self.locked():
+            self.reload()
+            set_nested_data(self.helper_config, self.prepare_update(kwargs))
             self.save()
 
     def reload(self):
@@ -183,11 +190,29 @@ class RegistryModel(ModelBackend):
 
         self._parse_data(registry_data, config_data)
 
-        set_nested_data(self.helper_config, config_data)
+        with self._lock:
+            try:
+                changed = model_plan(type(self.helper_config)).apply(
+                    self.helper_config, config_data
+                )
+            except Exception as e:
+                logger.error(f"Failed to reload registry model: {e}")
+                self._mark_reloaded(False)
+                return
+            # an unchanged registry keeps the model and its digest
+            self._mark_reloaded(bool(changed))
 
-    def save(self):
+    def save(self, strict: bool = False):
         set_in_registry(self.helper_config.model_dump())
 
+    def snapshot(self) -> Dict[str, Any]:
+        return self.helper_config.model_dump()
+
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        with self.locked():
+            set_in_registry(snapshot)
+            set_nested_data(self.helper_config, snapshot)
+
 
 def legacy_helper_config() -> Optional[HelperConfig]:
     exists, _ = service_exists()
@@ -227,6 +252,28 @@ def service_exists() -> Tuple[bool, bool]:
             win32service.CloseServiceHandle(scm)
 
 
+def service_pid() -> Optional[int]:
+    """
+    return the pid of the running service process, None if it is not running
+    """
+    scm = None
+    try:
+        scm = win32service.OpenSCManager(None, None, win32service.SC_MANAGER_CONNECT)
+        service = win32service.OpenService(
+            scm, service_name, win32service.SERVICE_QUERY_STATUS
+        )
+        status = win32service.QueryServiceStatusEx(service)
+        win32service.CloseServiceHandle(service)
+        if status["CurrentState"] != win32service.SERVICE_RUNNING:
+            return None
+        return status["ProcessId"] or None
+    except Exception:
+        return None
+    finally:
+        if scm is not None:
+            win32service.CloseServiceHandle(scm)
+
+
 def ensure_service() -> bool:
     exists, _ = service_exists()
     if exists:
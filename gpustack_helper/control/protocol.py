@@ -0,0 +1,183 @@
+"""
+The local control protocol of the helper: one JSON object per line, over a
+Unix domain socket, or a named pipe on Windows. Every request has a "command"
+field and gets exactly one response line with an "ok" field, e.g.
+
+    {"command": "status"}
+    {"ok": true, "state": ["STARTED"], ...}
+
+The client side doesn't import Qt, so a second launch of the helper hands off
+to the running one in a few milliseconds.
+"""
+
+import os
+import sys
+import json
+import stat
+import struct
+import socket
+import threading
+from typing import Any, Callable, Dict, Optional
+from gpustack_helper.defaults import data_dir as user_data_dir
+
+# a request line longer than this closes the connection
+max_line_length = 64 * 1024
+default_timeout_ms = 1000
+
+
+def control_dir() -> str:
+    """
+    The directory of the control socket and its lock, only accessible by the
+    user. A shared one like /tmp would let other users squat the names.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "gpustack-helper")
+    return os.path.join(user_data_dir, "run")
+
+
+def ensure_private_dir(path: str) -> None:
+    """
+    Create the directory with mode 0700, raises PermissionError if it exists
+    and isn't a directory owned by the user and closed to the others.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if sys.platform == "win32":
+        return
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} isn't a directory owned by the user")
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)
+
+
+def owned_by_user(path: str) -> bool:
+    """
+    Whether the socket file and its directory belong to the user, so the
+    helper answering on it runs as the same user.
+    """
+    try:
+        st = os.lstat(path)
+        parent = os.lstat(os.path.dirname(path))
+    except OSError:
+        return False
+    return (
+        stat.S_ISSOCK(st.st_mode)
+        and st.st_uid == os.getuid()
+        and parent.st_uid == os.getuid()
+        and not parent.st_mode & 0o022
+    )
+
+
+def control_socket_name() -> str:
+    """
+    The name passed to QLocalServer and QLocalSocket, one per user.
+    """
+    if sys.platform == "win32":
+        # the pipe is \\.\pipe\gpustack-helper-<user>
+        return f"gpustack-helper-{os.environ.get('USERNAME', 'user')}"
+    return os.path.join(control_dir(), "gpustack-helper.sock")
+
+
+def control_lock_path(name: str) -> str:
+    """
+    The file locked by the helper serving name for its whole lifetime.
+    """
+    if os.path.isabs(name):
+        return f"{name}.lock"
+    return os.path.join(control_dir(), f"{name}.lock")
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode(line: bytes) -> Dict[str, Any]:
+    message = json.loads(line.decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("a message must be a JSON object")
+    return message
+
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    if not hasattr(socket, "SO_PEERCRED"):
+        # e.g. macOS, the owner of the socket file was checked instead
+        return None
+    creds = sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    return struct.unpack("3i", creds)[1]
+
+
+def _unix_request(name: str, data: bytes, timeout: float) -> bytes:
+    if not owned_by_user(name):
+        return b""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(name)
+        uid = _peer_uid(sock)
+        if uid is not None and uid != os.getuid():
+            return b""
+        sock.sendall(data)
+        with sock.makefile("rb") as reader:
+            return reader.readline(max_line_length)
+
+
+def call_with_timeout(func: Callable[[], bytes], timeout: float) -> bytes:
+    """
+    Run a blocking call in a daemon thread, returns b"" if it doesn't return
+    in time. The thread is left blocked, it doesn't keep the process alive.
+    """
+    result: Dict[str, Any] = {}
+
+    def run() -> None:
+        try:
+            result["line"] = func()
+        except OSError as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, name="control-request", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if "error" in result:
+        raise result["error"]
+    return result.get("line", b"")
+
+
+def _pipe_exchange(name: str, data: bytes) -> bytes:
+    # QLocalServer creates the pipe under \\.\pipe\, it opens like a file
+    with open(f"\\\\.\\pipe\\{name}", "r+b", buffering=0) as pipe:
+        pipe.write(data)
+        line = b""
+        while not line.endswith(b"\n") and len(line) < max_line_length:
+            chunk = pipe.read(4096)
+            if not chunk:
+                break
+            line += chunk
+        return line
+
+
+def _pipe_request(name: str, data: bytes, timeout: float) -> bytes:
+    # the reads of a pipe opened like a file can't time out, a busy or hung
+    # helper would block the second launch forever
+    return call_with_timeout(lambda: _pipe_exchange(name, data), timeout)
+
+
+def send_request(
+    request: Dict[str, Any],
+    name: Optional[str] = None,
+    timeout_ms: int = default_timeout_ms,
+) -> Optional[Dict[str, Any]]:
+    """
+    Send one request to the running helper and wait for its response. Returns
+    None if no helper of the user is listening or it doesn't respond in time.
+    """
+    name = name or control_socket_name()
+    try:
+        if sys.platform == "win32":
+            line = _pipe_request(name, encode(request), timeout_ms / 1000)
+        else:
+            line = _unix_request(name, encode(request), timeout_ms / 1000)
+        return decode(line) if line else None
+    except (OSError, ValueError):
+        return None
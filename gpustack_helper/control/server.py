@@ -0,0 +1,260 @@
+import os
+import time
+import logging
+from typing import Any, Callable, Dict, Optional
+from PySide6.QtCore import QObject, Signal, Slot
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+from gpustack_helper.config import (
+    user_helper_config,
+    active_helper_config,
+    user_gpustack_config,
+    active_gpustack_config,
+)
+from gpustack_helper.config.filelock import FileLock, LockFileError
+from gpustack_helper.controller import ServiceController
+from gpustack_helper.control.protocol import (
+    control_lock_path,
+    control_socket_name,
+    decode,
+    default_timeout_ms,
+    encode,
+    ensure_private_dir,
+    max_line_length,
+)
+from gpustack_helper.services.abstract_service import (
+    AbstractService as service,
+    transitional_states,
+)
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def state_names(state: service.State) -> list:
+    return [member.name for member in service.State if member & state]
+
+
+class ControlServer(QObject):
+    """
+    Serve the state of the ServiceController to local clients. The snapshot
+    is taken when the state changes or is probed, reads never query the
+    service. Service commands go through the controller like the menu
+    actions.
+    """
+
+    # emitted with the window name when another launch of the helper hands off
+    show_requested = Signal(str)
+
+    controller: ServiceController
+    handlers: Dict[str, Handler]
+    _server: QLocalServer
+    _name: str
+    # held while serving, two helpers launched together can't both listen
+    _lock: FileLock
+    _snapshot: Dict[str, Any]
+    # state name -> wall clock time it was last entered
+    _transitions: Dict[str, float]
+    _last_error: Optional[str] = None
+
+    def __init__(
+        self,
+        controller: ServiceController,
+        parent: Optional[QObject] = None,
+        name: Optional[str] = None,
+    ):
+        super().__init__(parent)
+        self.controller = controller
+        self._name = name or control_socket_name()
+        self._lock = FileLock(control_lock_path(self._name), timeout=0)
+        self._server = QLocalServer(self)
+        # only the user running the helper may control it
+        self._server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self._server.newConnection.connect(self.on_new_connection)
+        self._transitions = {}
+        self._snapshot = {}
+        self.handlers = {
+            "status": self.handle_status,
+            "start": self.handle_start,
+            "stop": self.handle_stop,
+            "restart": self.handle_restart,
+            "activate": self.handle_activate,
+        }
+        self._last_error = None
+        controller.status_signal.connect(self.on_status_changed)
+        # refresh the pid and digests even if the state didn't change
+        controller.probed.connect(self.on_status_changed)
+        controller.error.connect(self.on_error)
+        self.on_status_changed(controller.status)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def _answered(self) -> bool:
+        socket = QLocalSocket()
+        socket.connectToServer(self._name)
+        if not socket.waitForConnected(default_timeout_ms):
+            return False
+        socket.abort()
+        return True
+
+    def listen(self) -> bool:
+        """
+        Returns False if another helper is serving the name already. Other
+        failures are only logged, the helper works without the control socket.
+        """
+        if os.path.isabs(self._name):
+            try:
+                ensure_private_dir(os.path.dirname(self._name))
+            except OSError as e:
+                logger.error(f"Control socket disabled: {e}")
+                return True
+        try:
+            self._lock.acquire()
+        except TimeoutError:
+            logger.warning(f"Another helper holds {self._lock.path}")
+            return False
+        except LockFileError as e:
+            # serving without the lock could replace the socket of another
+            # helper, run without the control socket instead
+            logger.error(f"Control socket disabled: {e}")
+            return True
+        # listening with socket options replaces the socket file of a running
+        # helper on Unix. The lock degrades to a no-op if it can't be created,
+        # check the socket too
+        if self._answered():
+            logger.warning(f"Another helper is listening on {self._name}")
+            self._lock.release()
+            return False
+        # left behind by a helper which didn't exit cleanly, it can only be
+        # removed while holding the lock
+        QLocalServer.removeServer(self._name)
+        if not self._server.listen(self._name):
+            logger.error(
+                f"Failed to listen on {self._name}: {self._server.errorString()}"
+            )
+            return True
+        logger.debug(f"Control server listening on {self._name}")
+        return True
+
+    @Slot()
+    def close(self) -> None:
+        self._server.close()
+        self._lock.release()
+
+    def register(self, command: str, handler: Handler) -> None:
+        self.handlers[command] = handler
+
+    @Slot(service.State)
+    def on_status_changed(self, status: service.State) -> None:
+        now = time.time()
+        names = state_names(status)
+        since = self._snapshot.get("since", now)
+        if names != self._snapshot.get("state"):
+            since = now
+            for name in names:
+                self._transitions[name] = now
+        # replaced, not mutated, so a response never mixes two snapshots
+        self._snapshot = {
+            "state": names,
+            "display": service.get_display_text(status),
+            "since": since,
+            "transitions": dict(self._transitions),
+            "pid": self.controller.service_class.get_service_pid(),
+            "busy": self.controller.is_busy(),
+            "digests": {
+                "helper": {
+                    "user": user_helper_config().digest(),
+                    "active": active_helper_config().digest(),
+                },
+                "gpustack": {
+                    "user": user_gpustack_config().digest(),
+                    "active": active_gpustack_config().digest(),
+                },
+            },
+        }
+
+    @Slot(str, str)
+    def on_error(self, title: str, message: str) -> None:
+        self._last_error = message
+
+    @Slot()
+    def on_new_connection(self) -> None:
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            socket.readyRead.connect(lambda s=socket: self.on_ready_read(s))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def on_ready_read(self, socket: QLocalSocket) -> None:
+        while socket.canReadLine():
+            line = bytes(socket.readLine())
+            if not line.strip():
+                continue
+            socket.write(encode(self.dispatch(line)))
+        if socket.bytesAvailable() > max_line_length:
+            logger.warning("Closing control connection, request line too long")
+            socket.abort()
+
+    def dispatch(self, line: bytes) -> Dict[str, Any]:
+        try:
+            request = decode(line)
+        except ValueError as e:
+            return {"ok": False, "error": f"invalid request: {e}"}
+        command = request.get("command")
+        handler = self.handlers.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"unknown command {command}"}
+        try:
+            return {"ok": True, **handler(request)}
+        except Exception as e:
+            logger.error(f"Control command {command} failed: {e}")
+            return {"ok": False, "error": str(e)}
+
+    def handle_status(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        # the queue changes without a state change, read it on each request
+        return {**self._snapshot, "queue": self.controller.queue.stats()}
+
+    def _expect(self, state: service.State, command: str) -> None:
+        if not self.controller.status & state:
+            raise RuntimeError(
+                f"cannot {command} while the service is "
+                f"{service.get_display_text(self.controller.status)}"
+            )
+
+    def handle_start(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        # starting a running service only applies the changed settings
+        self._expect(service.State.STOPPED | service.State.STARTED, "start")
+        skip_check = bool(self.controller.status & service.State.TO_MIGRATE)
+        self._last_error = None
+        if not self.controller.start_action(skip_config_check=skip_check):
+            raise RuntimeError(self._last_error or "invalid configuration")
+        return {"state": state_names(self.controller.status)}
+
+    def handle_stop(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        # like the menu, a stop while starting or restarting is queued behind
+        # the running operation, a repeated stop is merged into it
+        self._expect(service.State.STARTED | transitional_states, "stop")
+        self.controller.stop_action()
+        return {"state": state_names(self.controller.status)}
+
+    def handle_restart(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._expect(service.State.STARTED, "restart")
+        self.controller.restart_action()
+        return {"state": state_names(self.controller.status)}
+
+    def handle_activate(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Sent by a second launch of the helper with its arguments.
+        """
+        data_dir = request.get("data_dir")
+        current = user_gpustack_config().static_data_dir
+        if data_dir and os.path.normcase(data_dir) != os.path.normcase(current):
+            raise RuntimeError(f"the running helper uses the data dir {current}")
+        if request.get("debug"):
+            logging.getLogger().setLevel(logging.DEBUG)
+            logger.debug("Debug logs enabled by another launch")
+        window = request.get("show")
+        if window:
+            self.show_requested.emit(window)
+        return {"pid": os.getpid()}
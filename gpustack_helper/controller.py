@@ -0,0 +1,528 @@
+import time
+import logging
+from PySide6.QtCore import (
+    Slot,
+    Signal,
+    QObject,
+    QProcess,
+    QTimer,
+    QRunnable,
+    QThreadPool,
+    QCoreApplication,
+)
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple, Type
+from gpustack_helper.config import (
+    user_gpustack_config,
+    active_gpustack_config,
+    active_helper_config,
+    classify_unsynced_fields,
+    reload_configs,
+)
+from gpustack_helper.services.abstract_service import (
+    AbstractService as service,
+    ServiceOperation,
+    Transition,
+    transitional_states,
+)
+from gpustack_helper.services.factory import get_service_class
+from gpustack_helper.services.process_output import OutputReader
+from gpustack_helper.data_migration import read_progress
+
+logger = logging.getLogger(__name__)
+
+
+class _ProbeTask(QRunnable):
+    def __init__(self, probe: "StatusProbe"):
+        super().__init__()
+        self.probe = probe
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        try:
+            state = self.probe.target()
+        except Exception as e:
+            logger.error(f"Failed to query service status: {e}")
+            state = service.State.UNKNOWN
+        self.probe.finished.emit(state, time.perf_counter() - start)
+
+
+class StatusProbe(QObject):
+    """
+    Query the service state in the thread pool so slow launchctl or SCM calls
+    never block the GUI thread. Requests made while a probe is in flight are
+    coalesced into one follow-up probe.
+    """
+
+    probed = Signal(service.State)
+    finished = Signal(service.State, float)
+
+    target: Callable[[], service.State]
+    _pool: QThreadPool
+    _in_flight: bool = False
+    _pending: bool = False
+
+    def __init__(
+        self,
+        target: Callable[[], service.State],
+        parent: Optional[QObject] = None,
+        pool: Optional[QThreadPool] = None,
+    ):
+        super().__init__(parent)
+        self.target = target
+        self._pool = pool or QThreadPool.globalInstance()
+        self._in_flight = False
+        self._pending = False
+        self.finished.connect(self._on_finished)
+
+    @property
+    def in_flight(self) -> bool:
+        return self._in_flight
+
+    @Slot()
+    def request(self) -> None:
+        if self._in_flight:
+            self._pending = True
+            return
+        self._in_flight = True
+        self._pool.start(_ProbeTask(self))
+
+    @Slot(service.State, float)
+    def _on_finished(self, state: service.State, elapsed: float) -> None:
+        logger.debug(f"Service status probed in {elapsed * 1000:.1f}ms: {state}")
+        self._in_flight = False
+        if self._pending:
+            # the result is stale already, probe again and emit the fresh one
+            self._pending = False
+            self.request()
+            return
+        self.probed.emit(state)
+
+
+class Operation(NamedTuple):
+    # the transitional state shown while it runs, e.g. STARTING
+    state: service.State
+    create: Callable[[], ServiceOperation]
+    # (failed_state, success_state)
+    result: Tuple[service.State, service.State]
+    submitted: float
+
+
+class _OperationTask(QRunnable):
+    def __init__(self, queue: "OperationQueue", target: Callable[[], None]):
+        super().__init__()
+        self.queue = queue
+        self.target = target
+
+    def run(self) -> None:
+        try:
+            self.target()
+            ok = True
+        except Exception as e:
+            logger.error(f"Service operation failed: {e}")
+            ok = False
+        self.queue.task_finished.emit(ok)
+
+
+class OperationQueue(QObject):
+    """
+    Run the service operations one at a time. At most one operation waits
+    behind the running one, a newer request replaces it: repeated requests
+    are merged and superseded ones are cancelled before they prompt for
+    privileges. A running operation is never interrupted, it would leave the
+    service half configured.
+    """
+
+    started = Signal(Operation)
+    # the operation and whether it succeeded
+    finished = Signal(Operation, bool)
+    # a failure the user should see, e.g. the process couldn't start
+    failed = Signal(str)
+    task_finished = Signal(bool)
+
+    _pool: QThreadPool
+    _running: Optional[Operation] = None
+    _pending: Optional[Operation] = None
+    _process: Optional[QProcess] = None
+    _reader: Optional[OutputReader] = None
+    _started_at: float = 0.0
+    _stats: Dict[str, Any]
+    # the failure to show for the exit code of a process, if any
+    _describe_exit: Callable[[int], Optional[str]]
+
+    def __init__(
+        self,
+        parent: Optional[QObject] = None,
+        describe_exit: Callable[[int], Optional[str]] = lambda code: None,
+    ):
+        super().__init__(parent)
+        self._describe_exit = describe_exit
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._running = None
+        self._pending = None
+        self._process = None
+        self._stats = {
+            "completed": 0,
+            "failed": 0,
+            "merged": 0,
+            "cancelled": 0,
+            "last_wait_ms": None,
+            "last_run_ms": None,
+            "last_phases": {},
+        }
+        self.task_finished.connect(self._on_finished)
+
+    @property
+    def running(self) -> Optional[Operation]:
+        return self._running
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of operations waiting behind the running one.
+        """
+        return 0 if self._pending is None else 1
+
+    @property
+    def busy(self) -> bool:
+        return self._running is not None
+
+    @property
+    def target_state(self) -> Optional[service.State]:
+        """
+        The state the service reaches when the queued operations succeed.
+        """
+        last = self._pending or self._running
+        return None if last is None else last.result[1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": None if self._running is None else self._running.state.name,
+            "depth": self.depth,
+        }
+
+    def submit(self, operation: Operation) -> None:
+        if self._running is None:
+            self._start(operation)
+            return
+        if self._pending is not None and self._pending.state == operation.state:
+            self._stats["merged"] += 1
+            logger.debug(f"Merged {operation.state.name} into the queued one")
+            return
+        if self._pending is not None:
+            self._stats["cancelled"] += 1
+            logger.info(
+                f"Cancelled {self._pending.state.name}, "
+                f"superseded by {operation.state.name}"
+            )
+            self._pending = None
+        if self._running.state == operation.state and operation.state in (
+            service.State.STARTING,
+            service.State.STOPPING,
+        ):
+            # the running one already leads to the requested state
+            self._stats["merged"] += 1
+            logger.debug(f"Merged {operation.state.name} into the running one")
+            return
+        self._pending = operation
+
+    def _start(self, operation: Operation) -> None:
+        self._running = operation
+        self._started_at = time.perf_counter()
+        self._stats["last_wait_ms"] = round(
+            (self._started_at - operation.submitted) * 1000, 1
+        )
+        self.started.emit(operation)
+        try:
+            target = operation.create()
+        except Exception as e:
+            logger.error(f"Failed to prepare {operation.state.name}: {e}")
+            self.failed.emit(str(e))
+            self._on_finished(False)
+            return
+        if isinstance(target, QProcess):
+            target.setParent(self)
+            target.finished.connect(self._on_process_finished)
+            target.errorOccurred.connect(self._on_process_error)
+            self._process = target
+            self._reader = OutputReader(target, operation.state.name.lower(), self)
+            target.start()
+        else:
+            self._pool.start(_OperationTask(self, target))
+
+    @Slot(int, QProcess.ExitStatus)
+    def _on_process_finished(self, code: int, status: QProcess.ExitStatus) -> None:
+        process, reader = self._process, self._reader
+        ok = code == 0 and status == QProcess.ExitStatus.NormalExit
+        reader.flush()
+        phases = reader.durations()
+        self._stats["last_phases"] = phases
+        if phases:
+            logger.info(
+                "Service process phases: "
+                + ", ".join(
+                    f"{phase} {seconds:.1f}s" for phase, seconds in phases.items()
+                )
+            )
+        if not ok:
+            output = "\n".join(reader.lines)
+            logger.error(f"Service process failed with code {code}, output:\n{output}")
+            message = (
+                self._describe_exit(code)
+                if status == QProcess.ExitStatus.NormalExit
+                else None
+            )
+            if message:
+                self.failed.emit(message)
+        reader.deleteLater()
+        process.deleteLater()
+        self._process = None
+        self._reader = None
+        self._on_finished(ok)
+
+    @Slot(QProcess.ProcessError)
+    def _on_process_error(self, error: QProcess.ProcessError) -> None:
+        process = self._process
+        # finished is only emitted if the process started
+        if process is None or error != QProcess.ProcessError.FailedToStart:
+            return
+        message = f"Failed to run {process.program()}: {process.errorString()}"
+        logger.error(message)
+        self._reader.deleteLater()
+        process.deleteLater()
+        self._process = None
+        self._reader = None
+        self.failed.emit(message)
+        self._on_finished(False)
+
+    @Slot(bool)
+    def _on_finished(self, ok: bool) -> None:
+        operation = self._running
+        elapsed = (time.perf_counter() - self._started_at) * 1000
+        self._stats["last_run_ms"] = round(elapsed, 1)
+        self._stats["completed" if ok else "failed"] += 1
+        logger.info(
+            f"Service operation {operation.state.name} "
+            f"{'finished' if ok else 'failed'} in {elapsed:.0f}ms"
+        )
+        self._running = None
+        # the depth still counts the queued one while finished is handled
+        self.finished.emit(operation, ok)
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self._start(pending)
+
+    def wait(self) -> None:
+        """
+        Wait for the running operation, the queued one is dropped.
+        """
+        self._pending = None
+        if self._process is not None:
+            self._process.waitForFinished()
+        self._pool.waitForDone()
+
+
+class ServiceController(QObject):
+    """
+    The service state machine. Setting a transitional state launches the
+    matching service operation, its result or a probe moves the state on.
+    It only depends on QtCore, the tray menu and the headless mode drive the
+    same controller.
+    """
+
+    # emitted only when the state changes
+    status_signal = Signal(service.State)
+    # emitted with every probed state, even if it didn't change
+    probed = Signal(service.State)
+    # title and message of a failure the user should see
+    error = Signal(str, str)
+    # done and total bytes of the legacy data migration, (0, 0) once it ends
+    migration_progress = Signal(int, int)
+
+    _status: service.State = None
+
+    @property
+    def status(self) -> service.State:
+        return self._status
+
+    @status.setter
+    def status(self, value: service.State) -> None:
+        if value == self._status:
+            return
+        self._status = value
+        self.status_signal.emit(value)
+
+    queue: OperationQueue
+    _migration_timer: QTimer
+    _migration: Optional[Tuple[int, int]] = None
+
+    service_class: Type[service] = get_service_class()
+    probe: StatusProbe
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._status = service.State.UNKNOWN
+        self.queue = OperationQueue(self, self.service_class.describe_exit)
+        self.queue.started.connect(self.on_operation_started)
+        self.queue.finished.connect(self.on_operation_finished)
+        self.queue.failed.connect(self.on_operation_failed)
+        self._migration = None
+        # the migration may run in the privileged start script, its progress
+        # file is polled while the service starts
+        self._migration_timer = QTimer(self)
+        self._migration_timer.setInterval(500)
+        self._migration_timer.timeout.connect(self.poll_migration)
+        self.probe = StatusProbe(self.probe_state, self)
+        self.probe.probed.connect(self.on_state_probed)
+        self.status_signal.connect(self.on_status_changed)
+
+    def _create_operation(self, state: service.State) -> Operation:
+        create, failed = {
+            service.State.STARTING: (self.service_class.start, service.State.STOPPED),
+            service.State.RESTARTING: (
+                self.service_class.restart,
+                service.State.STOPPED,
+            ),
+            service.State.SYNCING: (self.service_class.sync, service.State.UNKNOWN),
+            service.State.STOPPING: (self.service_class.stop, service.State.UNKNOWN),
+        }[state]
+        success = (
+            service.State.STOPPED
+            if state == service.State.STOPPING
+            else service.State.STARTED
+        )
+        # created when it starts, so it works with the latest configs
+        return Operation(state, create, (failed, success), time.perf_counter())
+
+    def submit(self, state: service.State) -> None:
+        """
+        Queue the operation leading through the transitional state, e.g.
+        STARTING. The state is shown once the operation starts.
+        """
+        self.queue.submit(self._create_operation(state))
+        logger.debug(f"Service operation queue: {self.queue.stats()}")
+
+    @Slot(Operation)
+    def on_operation_started(self, operation: Operation) -> None:
+        self.status = operation.state
+        if operation.state & (service.State.STARTING | service.State.RESTARTING):
+            self._migration_timer.start()
+
+    @Slot(Operation, bool)
+    def on_operation_finished(self, operation: Operation, ok: bool) -> None:
+        self._migration_timer.stop()
+        if self._migration is not None:
+            self._migration = None
+            self.migration_progress.emit(0, 0)
+        active_gpustack_config().reload()
+        active_helper_config().reload()
+        if self.queue.depth:
+            # the next operation sets its own state
+            return
+        self.status = operation.result[1] if ok else operation.result[0]
+
+    @Slot()
+    def poll_migration(self) -> None:
+        progress = read_progress(active_gpustack_config().static_data_dir)
+        if progress is None or progress == self._migration:
+            return
+        self._migration = progress
+        self.migration_progress.emit(*progress)
+
+    @Slot(str)
+    def on_operation_failed(self, message: str) -> None:
+        self.error.emit(QCoreApplication.translate("Status", "Service Error"), message)
+
+    @Slot(service.State)
+    def on_status_changed(self, status: service.State):
+        # setting a transitional state directly queues its operation
+        if not status & transitional_states:
+            return
+        running = self.queue.running
+        if running is None or running.state != status:
+            self.submit(status)
+
+    def plan_transition(self, restart: bool = False) -> Transition:
+        restart_changes, sync_changes = classify_unsynced_fields()
+        # plan from the state the queued operations lead to
+        state = self.queue.target_state or self.status
+        return self.service_class.plan_transition(
+            state, bool(restart_changes), bool(sync_changes), restart
+        )
+
+    def apply_transition(self, transition: Transition) -> None:
+        logger.info(f"Service transition: {transition.value}")
+        if transition == Transition.NONE:
+            # the cached state may be stale, refresh it instead
+            self.update_status()
+            return
+        self.submit(
+            {
+                Transition.START: service.State.STARTING,
+                Transition.SYNC: service.State.SYNCING,
+                Transition.RESTART: service.State.RESTARTING,
+            }[transition]
+        )
+
+    @Slot()
+    def restart_action(self):
+        self.apply_transition(self.plan_transition(restart=True))
+
+    @Slot()
+    def stop_action(self):
+        self.submit(service.State.STOPPING)
+
+    def start_action(self, skip_config_check: bool = False) -> bool:
+        """
+        Returns False and emits error if the config doesn't pass the checks.
+        """
+        if not skip_config_check:
+            try:
+                user_gpustack_config().validate_updates()
+            except Exception as e:
+                self.error.emit(
+                    QCoreApplication.translate("GPUStackConfig", "Configuration Error"),
+                    QCoreApplication.translate("GPUStackConfig", "{error}").format(
+                        error=str(e)
+                    ),
+                )
+                return False
+        self.apply_transition(self.plan_transition())
+        return True
+
+    def is_busy(self) -> bool:
+        """
+        Whether a service operation is running or queued.
+        """
+        return self.queue.busy
+
+    @Slot()
+    def update_status(self):
+        logger.debug("Query service status")
+        if self.is_busy():
+            logger.debug("Service operation is running, skipping status update")
+            return
+        self.probe.request()
+
+    def probe_state(self) -> service.State:
+        """
+        Runs in the thread pool, it must not touch any widget.
+        """
+        reload_configs()
+        return self.service_class.get_current_state()
+
+    @Slot(service.State)
+    def on_state_probed(self, state: service.State):
+        if self.queue.busy:
+            # a service operation started while probing, its result wins
+            return
+        self.status = state
+        self.probed.emit(state)
+
+    @Slot()
+    def wait_for_process_finish(self):
+        # a service operation waiting for a state gives up instead of
+        # blocking the quit until its timeout
+        self.service_class.cancel_waits()
+        self.queue.wait()
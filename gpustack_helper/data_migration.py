@@ -0,0 +1,416 @@
+"""
+Move the legacy data dir into the new one. An entry of the legacy dir is
+renamed when both dirs are on the same filesystem, otherwise its files are
+copied in parallel and the entry is removed once all of them are copied.
+
+The progress is written to a journal in the target dir, an interrupted
+migration resumes from it instead of copying everything again. A small
+progress file is written next to it for the helper, the migration may run in
+a privileged process on macOS. It doesn't import Qt.
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import shutil
+import fnmatch
+import logging
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+logger = logging.getLogger(__name__)
+
+journal_name = ".gpustack-migration.journal"
+progress_name = ".gpustack-migration.progress"
+default_workers = min(8, os.cpu_count() or 4)
+# seconds between two writes of the progress file
+progress_interval = 0.5
+copy_chunk_size = 64 * 1024 * 1024
+
+Progress = Callable[[int, int], None]
+
+# copy_file_range and sendfile fail with these when the filesystems or file
+# types don't support them, the file is copied with read/write instead
+_unsupported_errnos = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+}
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, count: int, offset: int) -> int:
+    return os.copy_file_range(src_fd, dst_fd, count, offset)
+
+
+def _sendfile(src_fd: int, dst_fd: int, count: int, offset: int) -> int:
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+# in-kernel copies, tried in order
+_copiers = [
+    copier
+    for copier, name in (
+        (_copy_file_range, "copy_file_range"),
+        (_sendfile, "sendfile"),
+    )
+    if hasattr(os, name)
+]
+
+
+def _kernel_copy(
+    copier: Callable[[int, int, int, int], int],
+    src_fd: int,
+    dst_fd: int,
+    offset: int,
+    size: int,
+) -> int:
+    """
+    Copy from offset until size or the first unsupported call, returns the
+    offset reached. Both calls advance the position of dst_fd.
+    """
+    try:
+        while offset < size:
+            copied = copier(src_fd, dst_fd, min(copy_chunk_size, size - offset), offset)
+            if copied == 0:
+                break
+            offset += copied
+    except OSError as e:
+        if e.errno not in _unsupported_errnos:
+            raise
+    return offset
+
+
+def _copy_range(src_fd: int, dst_fd: int, size: int) -> None:
+    offset = 0
+    for copier in _copiers:
+        if offset < size:
+            offset = _kernel_copy(copier, src_fd, dst_fd, offset, size)
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    while True:
+        data = os.read(src_fd, copy_chunk_size)
+        if not data:
+            return
+        os.write(dst_fd, data)
+
+
+def copy_file(src: str, dst: str) -> int:
+    """
+    Copy a file without a partial dst if interrupted, returns its size.
+    """
+    part = f"{dst}.part"
+    if sys.platform.startswith("linux"):
+        with open(src, "rb") as fsrc, open(part, "wb") as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            _copy_range(fsrc.fileno(), fdst.fileno(), size)
+            os.fsync(fdst.fileno())
+    else:
+        # shutil uses fcopyfile on macOS, clones on APFS included
+        shutil.copyfile(src, part, follow_symlinks=False)
+        size = os.stat(part).st_size
+    shutil.copystat(src, part, follow_symlinks=False)
+    os.replace(part, dst)
+    return size
+
+
+def _file_size(path: str) -> int:
+    # the links are recreated, they don't count
+    if os.path.islink(path):
+        return 0
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def tree_size(path: str) -> int:
+    if os.path.islink(path) or not os.path.isdir(path):
+        return _file_size(path)
+    return sum(
+        _file_size(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def read_progress(target: str) -> Optional[Tuple[int, int]]:
+    """
+    Return (done bytes, total bytes) of a running migration into target.
+    """
+    try:
+        with open(os.path.join(target, progress_name)) as f:
+            data = json.load(f)
+        return int(data["done"]), int(data["total"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+class JournalState(NamedTuple):
+    completed: Set[str]
+    # entry -> relative paths of its copied files
+    copied: Dict[str, Set[str]]
+    done_bytes: int
+    # bytes of the copied files of the entries not completed yet
+    partial_bytes: int
+
+
+class Journal:
+    """
+    Append-only JSON lines, each one with the entry it belongs to. Replaying
+    it returns the completed entries and the files copied so far.
+    """
+
+    path: str
+    _lock: threading.Lock
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def replay(self) -> JournalState:
+        completed: Set[str] = set()
+        copied: Dict[str, Set[str]] = {}
+        entry_bytes: Dict[str, int] = {}
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # a torn last line of an interrupted run
+                continue
+            entry = record.get("entry")
+            if entry is None:
+                continue
+            entry_bytes[entry] = entry_bytes.get(entry, 0) + record.get("bytes", 0)
+            if record.get("done"):
+                completed.add(entry)
+            elif "file" in record:
+                copied.setdefault(entry, set()).add(record["file"])
+        return JournalState(
+            completed,
+            copied,
+            sum(entry_bytes.values()),
+            sum(size for name, size in entry_bytes.items() if name not in completed),
+        )
+
+    def record(self, **record: Any) -> None:
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class DataMigration:
+    source: str
+    target: str
+    exclude: Sequence[str]
+    workers: int
+    progress: Optional[Progress]
+
+    _journal: Journal
+    _lock: threading.Lock
+    # set by the first failed copy, the copies picked up after it are skipped
+    _failed: threading.Event
+    _done: int = 0
+    _total: int = 0
+    _reported: float = 0.0
+
+    def __init__(
+        self,
+        source: str,
+        target: str,
+        exclude: Sequence[str] = (),
+        workers: int = default_workers,
+        progress: Optional[Progress] = None,
+    ):
+        self.source = source
+        self.target = target
+        self.exclude = exclude
+        self.workers = max(1, workers)
+        self.progress = progress
+        self._journal = Journal(os.path.join(target, journal_name))
+        self._lock = threading.Lock()
+        self._failed = threading.Event()
+
+    def entries(self) -> List[str]:
+        return sorted(
+            name
+            for name in os.listdir(self.source)
+            if not any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude)
+        )
+
+    def run(self) -> None:
+        os.makedirs(self.target, exist_ok=True)
+        state = self._journal.replay()
+        if state.completed or state.copied:
+            logger.info(
+                f"Resuming the migration of {self.source}, "
+                f"{len(state.completed)} entries done"
+            )
+        entries = [name for name in self.entries() if name not in state.completed]
+        sizes = {name: tree_size(os.path.join(self.source, name)) for name in entries}
+        self._done = state.done_bytes
+        # the copied files of a partial entry are still in the source too
+        self._total = state.done_bytes - state.partial_bytes + sum(sizes.values())
+        self._report(force=True)
+        try:
+            for name in entries:
+                started = name in state.copied
+                renamed = self._migrate_entry(
+                    name, started, state.copied.get(name, set())
+                )
+                self._done_entry(name, sizes[name] if renamed else 0)
+        finally:
+            self._report(force=True)
+            self._journal.close()
+        for name in (journal_name, progress_name):
+            _remove(os.path.join(self.target, name))
+        logger.info(f"Migrated {self.source} to {self.target}")
+
+    def _done_entry(self, name: str, renamed_bytes: int) -> None:
+        self._journal.sync()
+        self._journal.record(entry=name, done=True, bytes=renamed_bytes)
+        self._add_progress(renamed_bytes)
+
+    def _migrate_entry(self, name: str, started: bool, copied: Set[str]) -> bool:
+        """
+        Returns whether the entry was renamed instead of copied.
+        """
+        src = os.path.join(self.source, name)
+        dst = os.path.join(self.target, name)
+        if not started:
+            if os.path.lexists(dst):
+                logger.warning(f"{dst} already exists, replacing it")
+                _remove(dst)
+            try:
+                os.rename(src, dst)
+                return True
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+            # the first record tells a resumed run the target is ours
+            self._journal.record(entry=name, started=True)
+        self._copy_entry(name, copied)
+        _remove(src)
+        return False
+
+    def _copy_entry(self, name: str, copied: Set[str]) -> None:
+        src_root = os.path.join(self.source, name)
+        dst_root = os.path.join(self.target, name)
+        if os.path.islink(src_root) or not os.path.isdir(src_root):
+            if "." not in copied:
+                self._copy_one(name, ".", src_root, dst_root)
+            return
+        files: List[Tuple[str, str, str]] = []
+        for root, dirs, names in os.walk(src_root):
+            rel_root = os.path.relpath(root, src_root)
+            dst_dir = os.path.join(dst_root, rel_root)
+            os.makedirs(dst_dir, exist_ok=True)
+            # os.walk lists the links to dirs in dirs, they are not followed
+            links = [d for d in dirs if os.path.islink(os.path.join(root, d))]
+            for item in names + links:
+                rel = os.path.normpath(os.path.join(rel_root, item))
+                rel = rel.replace(os.sep, "/")
+                if rel not in copied:
+                    files.append(
+                        (rel, os.path.join(root, item), os.path.join(dst_dir, item))
+                    )
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = [
+                executor.submit(self._copy_one, name, rel, src, dst)
+                for rel, src, dst in files
+            ]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in done:
+                # raises the first failure, the copied files stay journaled
+                future.result()
+        finally:
+            # e.g. on ENOSPC the queued copies are dropped instead of running
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _copy_one(self, name: str, rel: str, src: str, dst: str) -> None:
+        if self._failed.is_set():
+            return
+        try:
+            if os.path.islink(src):
+                _remove(dst)
+                os.symlink(os.readlink(src), dst)
+                size = 0
+            else:
+                size = copy_file(src, dst)
+        except BaseException:
+            self._failed.set()
+            raise
+        self._journal.record(entry=name, file=rel, bytes=size)
+        self._add_progress(size)
+
+    def _add_progress(self, size: int) -> None:
+        with self._lock:
+            self._done += size
+        self._report()
+
+    def _report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._reported < progress_interval:
+                return
+            self._reported = now
+            done, total = self._done, self._total
+        if self.progress is not None:
+            self.progress(done, total)
+        path = os.path.join(self.target, progress_name)
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                json.dump({"done": done, "total": total}, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.debug(f"Failed to write the migration progress: {e}")
+
+
+def migrate_data_dir(
+    source: str,
+    target: str,
+    exclude: Sequence[str] = (),
+    workers: int = default_workers,
+    progress: Optional[Progress] = None,
+) -> None:
+    DataMigration(source, target, exclude, workers, progress).run()
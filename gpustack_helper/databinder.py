@@ -7,24 +7,27 @@ from PySide6.QtWidgets import (
     QComboBox,
     QTableWidgetItem,
 )
-from typing import Callable, TypeVar, Type, Union, Dict, Any, Optional
+from typing import Callable, TypeVar, Type, Union, Dict, Any
 from pydantic import BaseModel
 from PySide6.QtGui import QAction, QIntValidator
-from pydantic.fields import FieldInfo
+from gpustack_helper.config.model_plan import (  # noqa: F401
+    get_nested_field_value,
+    model_plan,
+    reset_model_to_default,
+    set_nested_data,
+)
 
 supported_types = (str, int, bool, float, Dict[str, str])
 T = TypeVar("T", str, int, bool, float, Dict[str, str])
 T_BaseModel = TypeVar("T_BaseModel", bound=BaseModel)  # 定义在模块顶部
-
-
-def _get_base_type(key_type: Type[T]) -> Type[T]:
-    """Extract the base type from Optional[T] or return the type itself."""
-    if hasattr(key_type, "__origin__") and key_type.__origin__ is Union:
-        # Handle Optional[T] which is Union[T, None]
-        for t in key_type.__args__:
-            if t is not type(None):
-                return t
-    return key_type
+# types of the config schema, see gpustack_helper.config.schema
+_schema_types = {
+    "str": str,
+    "int": int,
+    "bool": bool,
+    "float": float,
+    "dict": Dict[str, str],
+}
 
 
 def get_zero_value(t: Type[T]) -> T:
@@ -55,9 +58,13 @@ class DataBinder(QObject):
     ):
         super().__init__()
         self._ignore_zero_value = ignore_zero_value
-        field = get_nested_field_info(type_class, key)
+        # imported here as the config package depends on this module
+        from gpustack_helper.config.schema import field_schema
 
-        base_type = _get_base_type(field.annotation)
+        field = field_schema(type_class, key)
+        if field is None:
+            raise ValueError(f"{key} is not a field of {type_class.__name__}")
+        base_type = _schema_types.get(field.type, field.type)
         if base_type not in supported_types:
             raise NotImplementedError(
                 f"type {base_type} is not supported, supported types are {supported_types}"
@@ -153,114 +160,3 @@ class DataBinder(QObject):
             current = current[part]
         # 最后一个部分是实际的键
         current[split_keys[-1]] = value
-
-
-def get_nested_field_info(
-    model: Type[BaseModel], field_path: str
-) -> Optional[FieldInfo]:
-    """
-    Recursively get the field info of a nested model
-
-    :param model: The root model class
-    :param field_path: Dot-separated field path, e.g. 'b.c'
-    :return: Field info object or None (if the field does not exist)
-    """
-    current = model
-    parts = field_path.split(".")
-
-    for part in parts:
-        if not hasattr(current, "model_fields"):
-            return None
-
-        fields = current.model_fields
-        if part not in fields:
-            return None
-
-        field_info = fields[part]
-        current = field_info.annotation
-
-        # 如果是嵌套模型且不是最后一个部分，继续深入
-        if (
-            isinstance(current, type)
-            and issubclass(current, BaseModel)
-            and part != parts[-1]
-        ):
-            continue
-
-        return field_info if part == parts[-1] else None
-
-    return None  # 如果没有找到字段，返回None
-
-
-def get_nested_field_value(
-    model: BaseModel, field_path: str, default: Any = None
-) -> Any:
-    """
-    Get the actual value of a nested model field
-
-    Args:
-        model: Pydantic model instance
-        field_path: Dot-separated field path (e.g. 'user.address.street')
-        default: The default value to return if the field does not exist
-
-    Returns:
-        The field value or the default value
-    """
-    try:
-        parts = field_path.split(".")
-        current = model
-
-        for part in parts:
-            if not hasattr(current, part):
-                return default
-            current = getattr(current, part)
-
-            # 如果遇到None值，提前返回
-            if current is None:
-                return default
-
-        return current
-    except Exception:
-        return default
-
-
-def reset_model_to_default(model: BaseModel):
-    # Pydantic v2
-    for name, field in model.__class__.model_fields.items():
-        if field.default_factory is not None:
-            value = field.default_factory()
-        elif hasattr(field, 'default'):
-            value = field.default  # 允许 default 为 None
-        else:
-            continue  # 没有 default 也没有 default_factory
-        setattr(model, name, value)
-
-
-def set_nested_data(
-    model: BaseModel, data: Dict[str, Any], reset_default: bool = False
-) -> bool:
-    """
-    Recursively update the contents of a dict into a nested Pydantic BaseModel instance
-
-    Args:
-        model: Pydantic model instance
-        data: dict data
-
-    Returns:
-        bool: Whether all updates succeeded
-    """
-    try:
-        if reset_default:
-            reset_model_to_default(model)
-        for key, value in data.items():
-            if not hasattr(model, key):
-                continue  # 跳过不存在的字段
-            attr = getattr(model, key)
-            # 如果 value 是 dict 且 attr 是 BaseModel，递归
-            if isinstance(value, dict) and isinstance(attr, BaseModel):
-                set_nested_data(attr, value)
-            else:
-                setattr(model, key, value)
-        return True
-    except Exception:
-        return False
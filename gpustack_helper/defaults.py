@@ -32,6 +32,7 @@ resource_path = abspath(
 )
 icon_path = join(resource_path, "tray_icon.png")
 translation_path = join(resource_path, "translations")
+config_schema_path = join(resource_path, "config_schema.json")
 
 data_dir = user_data_dir(helper_name, appauthor=False, roaming=True)
 global_data_dir = site_data_dir(app_name, appauthor=False)
@@ -42,7 +43,7 @@ log_file_path = (
     else join(global_data_dir, "log", "gpustack.log")
 )
 
-gpustack_binary_name = "gpustack" if sys.platform == "darwin" else "gpustack.exe"
+gpustack_binary_name = "gpustack.exe" if sys.platform == "win32" else "gpustack"
 
 
 def is_running_in_app() -> bool:
@@ -51,6 +52,15 @@ def is_running_in_app() -> bool:
     return False
 
 
+def helper_command() -> List[str]:
+    """
+    The command line running this helper, e.g. from a privileged script.
+    """
+    if getattr(sys, "frozen", False):
+        return [sys.executable]
+    return [sys.executable, "-m", "gpustack_helper.main"]
+
+
 def locate_gpustack() -> str:
     if sys.platform == "windows" or not getattr(sys, "frozen", False):
         return join(dirname(sys.executable), gpustack_binary_name)
@@ -89,19 +99,23 @@ nssm_binary_path = (
 
 
 def open_and_select_file(file_path: str, selected: bool = True) -> None:
-    if sys.platform != "darwin" and sys.platform != "win32":
+    if sys.platform not in ("darwin", "win32", "linux"):
         raise NotImplementedError("Unsupported platform for opening file explorer")
-    file_explorer = "open" if sys.platform == "darwin" else "explorer"
     path_func: Dict[
-        Literal["darwin", "win32"], Dict[bool, Callable[[str], List[str]]]
+        Literal["darwin", "win32", "linux"], Dict[bool, Callable[[str], List[str]]]
     ] = {
         "darwin": {
-            True: lambda path: [file_explorer, "-R", path],
-            False: lambda path: [file_explorer, dirname(path)],
+            True: lambda path: ["open", "-R", path],
+            False: lambda path: ["open", dirname(path)],
         },
         "win32": {
-            True: lambda path: [file_explorer, f"/select,{path}"],
-            False: lambda path: [file_explorer, dirname(path)],
+            True: lambda path: ["explorer", f"/select,{path}"],
+            False: lambda path: ["explorer", dirname(path)],
+        },
+        # xdg-open can't select a file, open its directory instead
+        "linux": {
+            True: lambda path: ["xdg-open", dirname(path)],
+            False: lambda path: ["xdg-open", dirname(path)],
         },
     }
     args = path_func[sys.platform][selected](file_path)
@@ -109,13 +123,15 @@ def open_and_select_file(file_path: str, selected: bool = True) -> None:
 
 
 def open_with_app(file_path: str) -> None:
-    if sys.platform != "darwin" and sys.platform != "win32":
+    if sys.platform not in ("darwin", "win32", "linux"):
         raise NotImplementedError("Unsupported platform for opening file with app")
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"The file {file_path} does not exist.")
-    app_command = (
-        ["open", "-a", "Console"] if sys.platform == "darwin" else ["notepad.exe"]
-    )
+    app_command = {
+        "darwin": ["open", "-a", "Console"],
+        "win32": ["notepad.exe"],
+        "linux": ["xdg-open"],
+    }[sys.platform]
     app_command.append(file_path)
     subprocess.Popen(app_command)
 
@@ -0,0 +1,120 @@
+"""
+Run the helper without the tray icon, e.g. on a server without a desktop. Only
+QtCore and QtNetwork are loaded: the service controller, the status watcher,
+the control server and the config sync run on a QCoreApplication.
+"""
+
+import sys
+import signal
+import argparse
+import logging
+from PySide6.QtCore import QCoreApplication, QObject, Slot, QTimer
+from gpustack_helper.config import (
+    user_gpustack_config,
+    migrate_config,
+    ensure_data_dir,
+    is_first_boot,
+    unsynced_fields,
+)
+from gpustack_helper.controller import ServiceController
+from gpustack_helper.watcher import StatusWatcher
+from gpustack_helper.control.server import ControlServer
+from gpustack_helper.services.abstract_service import AbstractService as service
+
+logger = logging.getLogger(__name__)
+
+
+class StatusLogger(QObject):
+    """
+    Log the state transitions of the service, the headless counterpart of
+    the status menu.
+    """
+
+    _last: service.State
+    _migrated_percent: int = -1
+
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+        self._last = service.State.UNKNOWN
+        self._migrated_percent = -1
+
+    @Slot(service.State)
+    def on_status_changed(self, status: service.State) -> None:
+        logger.info(
+            f"Service status: {service.get_display_text(self._last)} -> "
+            f"{service.get_display_text(status)}"
+        )
+        if status & service.State.TO_SYNC and not self._last & service.State.TO_SYNC:
+            logger.info(
+                "Changed settings, restart the service to apply: "
+                f"{', '.join(unsynced_fields().keys())}"
+            )
+        self._last = status
+
+    @Slot(int, int)
+    def on_migration_progress(self, done: int, total: int) -> None:
+        if total <= 0:
+            self._migrated_percent = -1
+            return
+        # logged every 10%
+        percent = done * 100 // total // 10 * 10
+        if percent != self._migrated_percent:
+            self._migrated_percent = percent
+            logger.info(f"Migrating the legacy data dir: {percent}%")
+
+    @Slot(str, str)
+    def on_error(self, title: str, message: str) -> None:
+        logger.error(f"{title}: {message}")
+
+
+def _quit_on_signals(app: QCoreApplication) -> None:
+    """
+    Quit the event loop on SIGINT/SIGTERM, so a running service operation is
+    waited for on aboutToQuit.
+    """
+    if sys.platform == "win32":
+        return
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: app.quit())
+    # python signal handlers only run when the interpreter gets control
+    timer = QTimer(app)
+    timer.timeout.connect(lambda: None)
+    timer.start(500)
+
+
+def run_headless(args: argparse.Namespace) -> int:
+    app = QCoreApplication(sys.argv)
+    _quit_on_signals(app)
+
+    controller = ServiceController(app)
+    control = ControlServer(controller, app)
+    if not control.listen():
+        return 0
+    app.aboutToQuit.connect(control.close)
+    control.show_requested.connect(
+        lambda window: logger.info(f"Ignoring the request to show {window}")
+    )
+    status_logger = StatusLogger(app)
+    controller.status_signal.connect(status_logger.on_status_changed)
+    controller.error.connect(status_logger.on_error)
+    controller.migration_progress.connect(status_logger.on_migration_progress)
+
+    watcher = StatusWatcher(controller.service_class, app)
+    watcher.refresh.connect(controller.update_status)
+    controller.status_signal.connect(watcher.on_status_changed)
+    # the service pid may change without a state change
+    controller.probed.connect(watcher.on_status_changed)
+    app.aboutToQuit.connect(watcher.stop)
+    app.aboutToQuit.connect(controller.wait_for_process_finish)
+
+    migrate_config()
+    ensure_data_dir()
+    if is_first_boot():
+        logger.info(
+            "The service is not configured yet, "
+            f"edit {user_gpustack_config().config_path} to configure it"
+        )
+    watcher.start()
+    controller.update_status()
+    logger.info("GPUStack helper is running in headless mode")
+    return app.exec()
@@ -18,8 +18,9 @@ from gpustack_helper.config import (
     GPUStackConfig,
     user_gpustack_config,
     user_helper_config,
+    config_transaction,
 )
-from gpustack_helper.common import show_warning
+from gpustack_helper.common import show_warning, update_enabled, update_text
 from gpustack_helper.quickconfig.common import wrap_layout, DataBindWidget
 from gpustack_helper.quickconfig.general import GeneralConfigPage
 from gpustack_helper.quickconfig.envvar import EnvironmentVariablePage
@@ -153,7 +154,9 @@ class QuickConfig(QDialog):
         )
         buttons.rejected.connect(self.reject)
         ok = buttons.button(QDialogButtonBox.StandardButton.Ok)
-        ok.setText(self.tr("Start"))
+        start_text = self.tr("Start")
+        restart_text = self.tr("Restart")
+        ok.setText(start_text)
         ok.clicked.connect(self.save_and_start)
         cancel = buttons.button(QDialogButtonBox.StandardButton.Cancel)
         cancel.setText(self.tr("Cancel"))
@@ -161,14 +164,14 @@ class QuickConfig(QDialog):
         @Slot()
         def on_state_changed(new_state: service.State):
             if new_state & service.State.STARTED:
-                ok.setText(self.tr("Restart"))
-                ok.setEnabled(True)
+                update_text(ok, restart_text)
+                update_enabled(ok, True)
             elif new_state & service.State.STOPPED:
-                ok.setText(self.tr("Start"))
-                ok.setEnabled(True)
+                update_text(ok, start_text)
+                update_enabled(ok, True)
             else:
-                ok.setText(self.tr("Start"))
-                ok.setEnabled(False)
+                update_text(ok, start_text)
+                update_enabled(ok, False)
 
         self.status.status_signal.connect(on_state_changed)
 
@@ -214,13 +217,7 @@ class QuickConfig(QDialog):
                 ),
             )
             return False
-        helper_data: Dict[str, any] = {}
-        config_data: Dict[str, any] = {}
-        for _, page in self.pages:
-            for binder in page.helper_binders:
-                binder.update_config(helper_data)
-            for binder in page.config_binders:
-                binder.update_config(config_data)
+        helper_data, config_data = self.collect_updates()
         if validate_config:
             try:
                 config.validate_updates(**config_data)
@@ -234,8 +231,43 @@ class QuickConfig(QDialog):
                 )
                 return False
 
-        cfg.update_with_lock(**helper_data)
-        config.update_with_lock(**config_data)
+        if not self.commit(cfg, config, helper_data, config_data):
+            return False
 
         super().accept()
         return True
+
+    def collect_updates(self) -> Tuple[Dict[str, any], Dict[str, any]]:
+        helper_data: Dict[str, any] = {}
+        config_data: Dict[str, any] = {}
+        for _, page in self.pages:
+            for binder in page.helper_binders:
+                binder.update_config(helper_data)
+            for binder in page.config_binders:
+                binder.update_config(config_data)
+        return helper_data, config_data
+
+    def commit(
+        self,
+        cfg: HelperConfig,
+        config: GPUStackConfig,
+        helper_data: Dict[str, any],
+        config_data: Dict[str, any],
+    ) -> bool:
+        """
+        Save both configs together, none of them is changed if it fails.
+        """
+        try:
+            with config_transaction(cfg, config) as transaction:
+                transaction.update(cfg, **helper_data)
+                transaction.update(config, **config_data)
+        except Exception as e:
+            show_warning(
+                self,
+                QGuiApplication.translate("QuickConfig", "Failed to save"),
+                QGuiApplication.translate("QuickConfig", "{error}").format(
+                    error=str(e)
+                ),
+            )
+            return False
+        return True
@@ -1,9 +1,81 @@
+import time
+import logging
+import threading
 from abc import ABC, abstractmethod
-from PySide6.QtCore import QProcess, QThread
-from enum import Flag, auto
-from typing import Union
+from PySide6.QtCore import QObject, QProcess
+from enum import Enum, Flag, auto
+from typing import Callable, Dict, Iterator, Union, List, Optional
 from PySide6.QtCore import QCoreApplication
 
+logger = logging.getLogger(__name__)
+
+# polling bounds while waiting for a service transition, in seconds
+wait_initial_interval = 0.01
+wait_max_interval = 0.5
+
+
+def backoff_delays(
+    timeout: float,
+    initial: float = wait_initial_interval,
+    maximum: float = wait_max_interval,
+) -> Iterator[float]:
+    """
+    Yield exponentially growing delays capped at maximum, until their sum
+    reaches timeout.
+    """
+    delay, total = initial, 0.0
+    while total < timeout:
+        yield delay
+        total += delay
+        delay = min(delay * 2, maximum)
+
+
+def poll_until(
+    predicate: Callable[[], bool],
+    deadline: float,
+    cancel: Optional[threading.Event] = None,
+) -> float:
+    """
+    Call predicate with exponential backoff until it returns True, and return
+    the elapsed seconds. deadline is a time.monotonic() timestamp.
+    Raises TimeoutError when the deadline passes and InterruptedError when
+    cancel is set.
+    """
+    start = time.monotonic()
+    delay = wait_initial_interval
+    while not predicate():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(
+                f"Condition not met after {time.monotonic() - start:.2f}s"
+            )
+        if cancel is None:
+            time.sleep(min(delay, remaining))
+        elif cancel.wait(min(delay, remaining)):
+            raise InterruptedError("Waiting was cancelled")
+        delay = min(delay * 2, wait_max_interval)
+    return time.monotonic() - start
+
+
+# a service operation is a privileged process, or a function run in the thread
+# pool of the operation queue
+ServiceOperation = Union[QProcess, Callable[[], None]]
+
+
+class Transition(Enum):
+    """
+    How the service is brought to run with the user configs.
+    """
+
+    # running with the user configs already
+    NONE = "none"
+    # not running, start it with the user configs
+    START = "start"
+    # running, the changes are applied without restarting it
+    SYNC = "sync"
+    # running, the changes only take effect after a restart
+    RESTART = "restart"
+
 
 class AbstractService(ABC):
     """
@@ -20,9 +92,36 @@ class AbstractService(ABC):
         TO_SYNC = auto()
         UNKNOWN = auto()
         STARTED = auto()
+        SYNCING = auto()
+
+    # pid of the service process recorded by the latest get_current_state call
+    _pid: Optional[int] = None
+    # set on quit, the waits of the running operation give up
+    _cancel_waits: threading.Event = threading.Event()
+
+    # state -> translated text, see get_display_text
+    _display_texts: Dict[State, str] = {}
+
+    @classmethod
+    def clear_display_text(cls) -> None:
+        """
+        Must be called when the translator is changed.
+        """
+        AbstractService._display_texts = {}
 
     @classmethod
     def get_display_text(cls, state: State) -> str:
+        text = AbstractService._display_texts.get(state)
+        if text is None:
+            text = cls._translate_state(state)
+            AbstractService._display_texts = {
+                **AbstractService._display_texts,
+                state: text,
+            }
+        return text
+
+    @classmethod
+    def _translate_state(cls, state: State) -> str:
         display_text = {
             cls.State.STOPPED
             | cls.State.TO_MIGRATE: QCoreApplication.translate(
@@ -43,6 +142,9 @@ class AbstractService(ABC):
             ),
             cls.State.UNKNOWN: QCoreApplication.translate("AbstractService", "Unknown"),
             cls.State.STARTED: QCoreApplication.translate("AbstractService", "Running"),
+            cls.State.SYNCING: QCoreApplication.translate(
+                "AbstractService", "Applying Settings"
+            ),
         }
         if display_text.get(state, None) is not None:
             return display_text[state]
@@ -58,28 +160,128 @@ class AbstractService(ABC):
 
     @classmethod
     @abstractmethod
-    def start(cls) -> Union[QProcess, QThread]:
+    def start(cls) -> ServiceOperation:
         """
         Start the service. Override this method in subclasses to provide specific start logic.
         """
 
     @classmethod
     @abstractmethod
-    def stop(self) -> Union[QProcess, QThread]:
+    def stop(self) -> ServiceOperation:
         """
         Stop the service. Override this method in subclasses to provide specific stop logic.
         """
 
     @classmethod
     @abstractmethod
-    def restart(cls) -> Union[QProcess, QThread]:
+    def restart(cls) -> ServiceOperation:
         """
         Restart the service. Override this method in subclasses to provide specific restart logic.
         """
 
+    @classmethod
+    def sync(cls) -> ServiceOperation:
+        """
+        Apply the changes which don't need a restart, e.g. RunAtLoad, to the
+        running service. Subclasses which can't do it restart the service.
+        """
+        return cls.restart()
+
+    @classmethod
+    def describe_exit(cls, code: int) -> Optional[str]:
+        """
+        The failure to show for the exit code of a service process, e.g. a
+        dismissed authentication, None when the output tells it already.
+        """
+        return None
+
+    @classmethod
+    def plan_transition(
+        cls, state: State, restart_changes: bool, sync_changes: bool, restart: bool
+    ) -> Transition:
+        """
+        The cheapest transition to a service running with the user configs.
+        restart_changes and sync_changes tell whether the unsynced changes
+        include ones which need a restart, and ones which don't. restart is
+        set for an explicit restart request, which is honored when nothing
+        changed.
+        """
+        if not state & cls.State.STARTED:
+            return Transition.START
+        if restart_changes:
+            return Transition.RESTART
+        if sync_changes:
+            return Transition.SYNC
+        return Transition.RESTART if restart else Transition.NONE
+
     @classmethod
     @abstractmethod
     def get_current_state(cls) -> State:
         """
         Get the current state of the service. Override this method in subclasses to provide specific state retrieval logic.
         """
+
+    @classmethod
+    def cancel_waits(cls) -> None:
+        """
+        Make the running and later wait_for_state calls give up, e.g. on quit.
+        """
+        AbstractService._cancel_waits.set()
+
+    @classmethod
+    def wait_for_state(
+        cls,
+        target: State,
+        deadline: float,
+        cancel: Optional[threading.Event] = None,
+        probe: Optional[Callable[[], State]] = None,
+    ) -> float:
+        """
+        Wait until the service reaches any of the target states, polling fast
+        first and backing off exponentially. Returns how long it took in
+        seconds, see poll_until for the deadline and cancellation. cancel
+        defaults to the event set by cancel_waits. probe replaces
+        get_current_state, e.g. with a cheaper query of the same service.
+        """
+        probe = probe or cls.get_current_state
+        elapsed = poll_until(
+            lambda: bool(probe() & target),
+            deadline,
+            cancel if cancel is not None else AbstractService._cancel_waits,
+        )
+        logger.debug(f"Service reached {target} in {elapsed * 1000:.0f}ms")
+        return elapsed
+
+    @classmethod
+    def get_service_pid(cls) -> Optional[int]:
+        """
+        Get the pid of the running service recorded by the latest state query.
+        It is used to get notified when the service exits instead of polling.
+        """
+        return cls._pid
+
+    @classmethod
+    def state_notifier(cls) -> Optional[QObject]:
+        """
+        An object with a changed signal, emitted when the service state may
+        have changed, so the status is refreshed without polling.
+        Override this method in subclasses which can be notified.
+        """
+        return None
+
+    @classmethod
+    def watch_paths(cls) -> List[str]:
+        """
+        Paths other than the config files which change when the service is
+        registered or unregistered. Override this method in subclasses.
+        """
+        return []
+
+
+# the states shown while a service operation runs
+transitional_states = (
+    AbstractService.State.STARTING
+    | AbstractService.State.STOPPING
+    | AbstractService.State.RESTARTING
+    | AbstractService.State.SYNCING
+)
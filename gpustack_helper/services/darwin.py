@@ -3,9 +3,9 @@ import logging
 import re
 import os
 from os.path import exists, islink
-from typing import Dict, Any, List, Tuple
-from PySide6.QtGui import QGuiApplication
-from PySide6.QtCore import QProcess
+from functools import partial
+from typing import Dict, Any, List, Optional, Tuple
+from PySide6.QtCore import QCoreApplication, QProcess
 from gpustack_helper.config import (
     user_helper_config,
     active_helper_config,
@@ -14,9 +14,16 @@ from gpustack_helper.config import (
     legacy_gpustack_config,
     all_config_sync,
 )
-from gpustack_helper.services.abstract_service import AbstractService
+from gpustack_helper.services.abstract_service import AbstractService, backoff_delays
+from gpustack_helper.services.sync_plan import (
+    SyncPlan,
+    copy_needed,
+    save_configs,
+    unsaved_configs,
+)
 from gpustack_helper.defaults import (
     get_dac_filename,
+    helper_command,
     resource_path,
     runtime_plist_path as plist_path,
 )
@@ -24,10 +31,20 @@ from gpustack_helper.defaults import (
 logger = logging.getLogger(__name__)
 
 service_id = "system/ai.gpustack"
+# seconds to wait for launchd to unload the service before bootstrapping it
+stop_timeout = 60
 
 
-def bash_escape_spaces(s: str) -> str:
-    return re.sub(r' ', r'\\ ', s)
+def wait_script(condition: str, timeout: float) -> str:
+    """
+    Shell loop polling condition with the backoff of
+    AbstractService.wait_for_state, giving up after timeout seconds.
+    """
+    delays = [f"{delay:g}" for delay in backoff_delays(timeout)]
+    head = [delay for delay in delays if delay != delays[-1]]
+    # jot repeats the capped delay instead of spelling it out
+    words = " ".join(head + [f"$(jot -b {delays[-1]} {len(delays) - len(head)})"])
+    return f"for d in {words}; do {condition} && break; sleep $d; done"
 
 
 def is_plist_synced(active_plist_path: str) -> bool:
@@ -73,114 +90,143 @@ def parse_service_status() -> Dict[str, Any]:
     return data
 
 
-def get_start_script(restart: bool = False) -> str:
+def is_plist_linked(active_plist_path: str) -> bool:
+    return islink(plist_path) and os.readlink(plist_path) == active_plist_path
+
+
+def _migrate_command(legacy_data_dir: str, data_dir: str) -> str:
+    # the helper renames or copies the entries in parallel, resuming an
+    # interrupted migration from its journal
+    command = " ".join(f"'{arg}'" for arg in helper_command())
+    return (
+        f"{command} --migrate-data '{legacy_data_dir}' '{data_dir}'"
+        " --migrate-exclude '*.sh' &&"
+        f" ln -s '{os.path.join(data_dir, 'cache')}'"
+        f" '{os.path.join(legacy_data_dir, 'cache')}'"
+    )
+
+
+def _dac_link() -> Optional[Tuple[str, str]]:
+    """
+    Return (link source, link path) of the dac model if the link is missing.
+    """
+    # link target should be resources path of gpustack_helper and name would be dac filename
+    # link source should be the dac filename in the gpustack_active.static_data_dir/root dir
+    target_home = os.path.join(
+        active_gpustack_config().static_data_dir, "root", '.cache', 'descript', 'dac'
+    )
+    dac_filename = get_dac_filename()
+    source_filename = os.path.join(resource_path, dac_filename)
+    target_filename = os.path.join(target_home, dac_filename)
+    if not exists(source_filename):
+        return None
+    if islink(target_filename) and os.readlink(target_filename) == source_filename:
+        return None
+    return source_filename, target_filename
+
+
+def _stop_commands(plan: SyncPlan, restart: bool) -> None:
+    wait_for_stopped = wait_script(
+        f"launchctl print {service_id} >/dev/null 2>&1; [ $? -eq 113 ]",
+        stop_timeout,
+    )
+    if restart:
+        plan.add("bootout", f"launchctl bootout {service_id}")
+        plan.add("wait", wait_for_stopped)
+    else:
+        # the service may be loaded but not running, check it when the script
+        # runs instead of querying launchctl while planning
+        plan.add(
+            "bootout",
+            f"if launchctl print {service_id} >/dev/null 2>&1; "
+            f"then launchctl bootout {service_id}; {wait_for_stopped}; fi",
+        )
+
+
+def plan_start(
+    restart: bool = False, sync_only: bool = False, reload: bool = True
+) -> SyncPlan:
+    """
+    Plan the start or restart of the service. It has no side effects besides
+    reloading the configs, which is skipped without reload, the local steps
+    run in get_start_script. A missing user config file is written by the
+    save step. With sync_only the configs are applied to the running service
+    without stopping it, launchd reads the plist again on the next boot.
+    """
     helper_user = user_helper_config()
-    helper_user.update_with_lock()
+    gpustack_user = user_gpustack_config(create=False)
     helper_active = active_helper_config()
-    active_helper_config().reload()
-
-    gpustack_user = user_gpustack_config()
-    gpustack_user.update_with_lock()
     gpustack_active = active_gpustack_config()
-    gpustack_active.reload()
+    if reload:
+        helper_active.reload()
+        gpustack_active.reload()
+    plan = SyncPlan()
+    unsaved = unsaved_configs(helper_user, gpustack_user, reload=reload)
+    if unsaved:
+        plan.add("save", action=partial(save_configs, unsaved))
+    if not sync_only:
+        _stop_commands(plan, restart)
 
+    data_dir = gpustack_active.static_data_dir
+    legacy_config = None if sync_only else legacy_gpustack_config()
+    if legacy_config:
+        plan.add("migrate", _migrate_command(legacy_config.data_dir, data_dir))
     files_copy: List[Tuple[str, str]] = [
         (user.config_path, active.config_path)
         for (user, active) in (
             (helper_user, helper_active),
             (gpustack_user, gpustack_active),
         )
+        if copy_needed(user, active, unsaved=any(user is c for c in unsaved))
     ]
-
-    # 过滤掉不存在的源文件
-    def files_different(pair: Tuple[str, str]) -> bool:
-        src, dst = pair
-        if src == dst:
-            return False
-        if not exists(src):
-            return False
-        if not exists(dst):
-            return True
-        with open(src, "rb") as fsrc, open(dst, "rb") as fdst:
-            return fsrc.read() != fdst.read()
-
-    files_copy = list(filter(files_different, files_copy))
-    # migrate the legacy data dir
-    old_gpustack_config = legacy_gpustack_config()
-    migrate = (
-        f"mkdir -p '{gpustack_active.static_data_dir}';"
-        f"for f in {bash_escape_spaces(old_gpustack_config.data_dir)}/*;"
-        "do case \\\"$f\\\" in *.sh) continue ;; esac;"
-        f"mv -f \\\"$f\\\" '{gpustack_active.static_data_dir}';done;"
-        f"ln -s '{os.path.join(gpustack_active.static_data_dir, 'cache')}' '{os.path.join(bash_escape_spaces(old_gpustack_config.data_dir), 'cache')}'"
-        if old_gpustack_config
-        else None
-    )
-    copy_files = ";".join(
-        f"cp -f '{src}' '{dst}'; chmod 0644 '{dst}'; chown root:wheel '{dst}'"
-        for src, dst in files_copy
-    )
-    copy_files = (
-        f"mkdir -p '{gpustack_active.static_data_dir}'; {copy_files}"
-        if len(files_copy) != 0
-        else None
-    )
-    link_plist = (
-        f"rm -f '{plist_path}'; ln -sf '{helper_active.config_path}' '{plist_path}'"
-        if not is_plist_synced(helper_active.config_path) or copy_files is not None
-        else None
-    )
-    # link target should be resources path of gpustack_helper and name would be dac filename
-    # link source should be the dac filename in the gpustack_active.static_data_dir/root dir
-    target_home = os.path.join(
-        gpustack_active.static_data_dir, "root", '.cache', 'descript', 'dac'
-    )
-    dac_filename = get_dac_filename()
-    source_filename = os.path.join(resource_path, dac_filename)
-    target_filename = os.path.join(target_home, dac_filename)
-    link_dac = (
-        f"rm -f '{target_filename}'; mkdir -p '{target_home}'; ln -s '{source_filename}' '{target_filename}'"
-        if exists(source_filename)
-        and (
-            not exists(target_filename)
-            or not islink(target_filename)
-            or os.readlink(target_filename) != source_filename
+    if files_copy:
+        plan.add("copy", f"mkdir -p '{data_dir}'")
+    for src, dst in files_copy:
+        plan.add(
+            "copy",
+            f"cp -f '{src}' '{dst}'; chmod 0644 '{dst}'; chown root:wheel '{dst}'",
         )
-        else None
-    )
-    service_exists = parse_service_status().get(service_id, None) is not None
-    restart = service_exists or restart
-    stop = f"launchctl bootout {service_id}" if restart else None
-    wait_for_stopped = (
-        f"while true; do launchctl print {service_id} >/dev/null 2>&1; [ $? -eq 113 ] && break; sleep 0.5; done"
-        if restart
-        else None
-    )
-    register_service = f"launchctl bootstrap system {plist_path}"
-    start = f"launchctl kickstart {service_id}"
-    joined_script = ";".join(
-        filter(
-            None,
-            [
-                stop,
-                wait_for_stopped,
-                migrate,
-                copy_files,
-                link_plist,
-                link_dac,
-                register_service,
-                start,
-            ],
+    if not is_plist_linked(helper_active.config_path):
+        plan.add(
+            "link",
+            f"rm -f '{plist_path}'; ln -sf '{helper_active.config_path}' '{plist_path}'",
         )
-    )
+    dac_link = _dac_link()
+    if dac_link is not None:
+        source, target = dac_link
+        plan.add(
+            "link_dac",
+            f"rm -f '{target}'; mkdir -p '{os.path.dirname(target)}'; ln -s '{source}' '{target}'",
+        )
+    if sync_only:
+        return plan
+    plan.add("bootstrap", f"launchctl bootstrap system {plist_path}")
+    plan.add("kickstart", f"launchctl kickstart {service_id}")
+    return plan
+
+
+def get_start_script(
+    restart: bool = False, dry_run: bool = False, sync_only: bool = False
+) -> str:
+    """
+    Return the AppleScript running the privileged steps of plan_start. In
+    dry-run mode the configs are planned as loaded and nothing is written,
+    the local steps, e.g. saving the user configs, are skipped.
+    """
+    plan = plan_start(restart, sync_only, reload=not dry_run)
+    logger.debug(f"Service sync plan:\n{plan.describe()}")
+    if not dry_run:
+        plan.run_local_steps()
+    joined_script = plan.script(markers=True)
     logger.debug(f"准备以admin权限运行该shell脚本 :\n{joined_script}")
-    text = QGuiApplication.translate(
+    text = QCoreApplication.translate(
         'DarwinService', "GPUStack requires starting launchd service"
     )
-    return f"""do shell script "{joined_script}" with prompt "{text}" with administrator privileges"""
+    # the output is split into lines by the reader, keep the \n line endings
+    return f"""do shell script "{joined_script}" with prompt "{text}" with administrator privileges without altering line endings"""
 
 
-def launch_service(restart: bool = False) -> QProcess:
+def launch_service(restart: bool = False, sync_only: bool = False) -> QProcess:
     """
     prompt sudo privileges to run following command
     1. remove /Library/LaunchDaemons/ai.gpustack.plist if not a symlink or not targetting the right path
@@ -188,7 +234,7 @@ def launch_service(restart: bool = False) -> QProcess:
     3. launch service with launchctl bootstrap system /Library/LaunchDaemons/ai.gpustack.plist
     the commands will be put into an AppleScript to run with administrator privileges
     """
-    applescript = get_start_script(restart=restart)
+    applescript = get_start_script(restart=restart, sync_only=sync_only)
     qprocess_launch = QProcess()
     qprocess_launch.setProgram("osascript")
     qprocess_launch.setArguments(["-e", applescript])
@@ -198,6 +244,10 @@ def launch_service(restart: bool = False) -> QProcess:
 
 
 class DarwinService(AbstractService):
+    @classmethod
+    def watch_paths(cls) -> List[str]:
+        return [plist_path]
+
     @classmethod
     def start(self) -> QProcess:
         return launch_service(restart=False)
@@ -206,7 +256,7 @@ class DarwinService(AbstractService):
     def stop(self) -> QProcess:
         # prompt sudo privileges to run following command
         # 1. run launchctl bootout system /Library/LaunchDaemons/ai.gpustack.plist
-        text = QGuiApplication.translate(
+        text = QCoreApplication.translate(
             'DarwinService', "GPUStack requires stopping launchd service"
         )
         script = f"""
@@ -224,9 +274,14 @@ class DarwinService(AbstractService):
     def restart(self) -> QProcess:
         return launch_service(restart=True)
 
+    @classmethod
+    def sync(self) -> QProcess:
+        return launch_service(sync_only=True)
+
     @classmethod
     def get_current_state(self) -> AbstractService.State:
         helper_active = active_helper_config()
+        self._pid = None
         if not is_plist_synced(helper_active.config_path):
             return AbstractService.State.TO_MIGRATE | AbstractService.State.STOPPED
 
@@ -235,6 +290,8 @@ class DarwinService(AbstractService):
         if output is not None:
             common: Dict[str, any] = output.get(service_id, {})
             is_running = common.get("state", "") == "running"
+            pid = common.get("pid", "")
+            self._pid = int(pid) if is_running and pid.isdigit() else None
         # if current_plist_path is None, it means the service is not registered.
         is_sync = not is_running or all_config_sync()
         state = (
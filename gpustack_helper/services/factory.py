@@ -15,6 +15,10 @@ def get_service_class() -> AbstractService:
         from gpustack_helper.services.darwin import DarwinService
 
         return DarwinService
+    elif sys.platform == "linux":
+        from gpustack_helper.services.linux import LinuxSystemdService
+
+        return LinuxSystemdService
     else:
         raise NotImplementedError(
             f"Service not implemented for platform: {sys.platform}"
@@ -0,0 +1,442 @@
+import os
+import shlex
+import shutil
+import logging
+import subprocess
+import threading
+from typing import Dict, List, Optional, Tuple
+from PySide6.QtCore import (
+    QCoreApplication,
+    QObject,
+    QProcess,
+    QThread,
+    Signal,
+    Slot,
+)
+from PySide6.QtDBus import (
+    QDBusConnection,
+    QDBusInterface,
+    QDBusMessage,
+    QDBusObjectPath,
+)
+from gpustack_helper.config import (
+    HelperConfig,
+    user_helper_config,
+    active_helper_config,
+    user_gpustack_config,
+    active_gpustack_config,
+    all_config_sync,
+)
+from gpustack_helper.config.backends import atomic_write
+from gpustack_helper.services.abstract_service import AbstractService
+from gpustack_helper.services.process_output import phase_marker
+from gpustack_helper.services.sync_plan import (
+    copy_needed,
+    save_configs,
+    unsaved_configs,
+)
+
+logger = logging.getLogger(__name__)
+
+unit_name = "gpustack.service"
+unit_path = f"/etc/systemd/system/{unit_name}"
+
+systemd_service = "org.freedesktop.systemd1"
+systemd_path = "/org/freedesktop/systemd1"
+unit_interface = "org.freedesktop.systemd1.Unit"
+service_interface = "org.freedesktop.systemd1.Service"
+properties_interface = "org.freedesktop.DBus.Properties"
+
+# unit properties read by get_current_state
+unit_properties = ("LoadState", "ActiveState", "SubState", "MainPID")
+running_states = ("active", "activating", "reloading")
+
+
+def _quote(value: str, exec_line: bool = False) -> str:
+    """
+    Quote a word of a unit file setting, see systemd.syntax(7).
+    """
+    value = value.replace("\\", "\\\\").replace('"', '\\"').replace("%", "%%")
+    if exec_line:
+        value = value.replace("$", "$$")
+    return f'"{value}"'
+
+
+def render_unit(cfg: HelperConfig) -> str:
+    """
+    Render the systemd unit of the service from the helper config, the
+    counterpart of the launchd plist on macOS.
+    """
+    lines = [
+        "[Unit]",
+        "Description=GPUStack",
+        "After=network-online.target",
+        "Wants=network-online.target",
+        "",
+        "[Service]",
+        "ExecStart=" + " ".join(_quote(arg, True) for arg in cfg.ProgramArguments),
+    ]
+    lines.extend(
+        f"Environment={_quote(f'{key}={value}')}"
+        for key, value in sorted(cfg.EnvironmentVariables.items())
+    )
+    if cfg.StandardOutPath:
+        lines.append(f"StandardOutput=append:{cfg.StandardOutPath}")
+    if cfg.StandardErrorPath:
+        lines.append(f"StandardError=append:{cfg.StandardErrorPath}")
+    lines.extend(
+        [
+            f"Restart={'always' if cfg.KeepAlive else 'no'}",
+            "RestartSec=3",
+            "",
+            "[Install]",
+            "WantedBy=multi-user.target",
+            "",
+        ]
+    )
+    return "\n".join(lines)
+
+
+class UnitManager(QObject):
+    """
+    Read the properties of the unit. changed is emitted when they may have
+    changed, implementations which can't notify never emit it.
+    """
+
+    changed = Signal()
+
+    unit: str
+
+    def __init__(self, unit: str, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.unit = unit
+
+    def properties(self) -> Dict[str, str]:
+        raise NotImplementedError
+
+
+class SystemctlUnitManager(UnitManager):
+    """
+    Query the unit with `systemctl show`, used when the system bus is not
+    reachable.
+    """
+
+    def properties(self) -> Dict[str, str]:
+        try:
+            result = subprocess.run(
+                [
+                    "systemctl",
+                    "show",
+                    self.unit,
+                    f"--property={','.join(unit_properties)}",
+                ],
+                capture_output=True,
+                text=True,
+                check=False,
+            )
+        except OSError as e:
+            logger.error(f"Failed to run systemctl: {e}")
+            return {}
+        if result.returncode != 0:
+            logger.error(f"Failed to query {self.unit}: {result.stderr}")
+            return {}
+        data = {}
+        for line in result.stdout.splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                data[key] = value
+        return data
+
+
+class DBusUnitManager(UnitManager):
+    """
+    Cache the unit properties and update them from the PropertiesChanged
+    signals of systemd, so reading the state doesn't spawn systemctl.
+    """
+
+    _bus: QDBusConnection
+    _unit_path: str
+    _cache: Optional[Dict[str, str]] = None
+    # increased by each signal, a load only stores its result if no signal
+    # arrived while it ran, the result may predate the signal
+    _generation: int = 0
+    _cache_lock: threading.Lock
+
+    def __init__(
+        self,
+        unit: str,
+        bus: Optional[QDBusConnection] = None,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(unit, parent)
+        self._bus = bus if bus is not None else QDBusConnection.systemBus()
+        if not self._bus.isConnected():
+            raise ConnectionError("The system bus is not available")
+        manager = self._interface(systemd_path, "org.freedesktop.systemd1.Manager")
+        # systemd only emits the unit signals to subscribed clients
+        self._call(manager, "Subscribe")
+        path = self._call(manager, "LoadUnit", unit)[0]
+        self._unit_path = path.path() if isinstance(path, QDBusObjectPath) else path
+        self._cache = None
+        self._generation = 0
+        self._cache_lock = threading.Lock()
+        if not self._bus.connect(
+            systemd_service,
+            self._unit_path,
+            properties_interface,
+            "PropertiesChanged",
+            self,
+            "on_properties_changed(QDBusMessage)",
+        ):
+            raise ConnectionError(f"Failed to subscribe to {self._unit_path}")
+
+    def _interface(self, path: str, interface: str) -> QDBusInterface:
+        return QDBusInterface(systemd_service, path, interface, self._bus)
+
+    @staticmethod
+    def _call(interface: QDBusInterface, method: str, *args) -> List:
+        reply = interface.call(method, *args)
+        if reply.type() == QDBusMessage.MessageType.ErrorMessage:
+            raise ConnectionError(f"{method} failed: {reply.errorMessage()}")
+        return reply.arguments()
+
+    def _load(self) -> Dict[str, str]:
+        properties = self._interface(self._unit_path, properties_interface)
+        data: Dict[str, str] = {}
+        for interface in (unit_interface, service_interface):
+            try:
+                values = self._call(properties, "GetAll", interface)[0]
+            except ConnectionError as e:
+                # the service interface is missing until the unit file exists
+                logger.debug(f"Failed to read {interface} of {self.unit}: {e}")
+                continue
+            data.update(
+                (key, str(value))
+                for key, value in dict(values).items()
+                if key in unit_properties
+            )
+        return data
+
+    def properties(self) -> Dict[str, str]:
+        # read from the status probe thread, the cache is replaced, not mutated
+        cache = self._cache
+        if cache is None:
+            generation = self._generation
+            cache = self._load()
+            with self._cache_lock:
+                if self._generation == generation:
+                    self._cache = cache
+        return dict(cache)
+
+    @Slot(QDBusMessage)
+    def on_properties_changed(self, message: QDBusMessage) -> None:
+        arguments = message.arguments()
+        if len(arguments) < 3:
+            return
+        _, changed, invalidated = arguments[:3]
+        with self._cache_lock:
+            self._generation += 1
+            cache = self._cache
+            if cache is not None and not invalidated:
+                self._cache = {
+                    **cache,
+                    **{
+                        key: str(value)
+                        for key, value in dict(changed).items()
+                        if key in unit_properties
+                    },
+                }
+            else:
+                # the values are not in the signal, read them again
+                self._cache = None
+        self.changed.emit()
+
+
+def create_unit_manager(unit: str = unit_name) -> UnitManager:
+    try:
+        return DBusUnitManager(unit)
+    except Exception as e:
+        logger.info(f"Falling back to systemctl to query {unit}: {e}")
+        return SystemctlUnitManager(unit)
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def get_start_script(restart: bool = False, sync_only: bool = False) -> str:
+    """
+    The script run as root to apply the user configs and start or restart
+    the service. With sync_only the running service is left alone, only the
+    configs and whether it's enabled at boot are updated.
+    """
+    helper_user = user_helper_config()
+    gpustack_user = user_gpustack_config()
+    unsaved = unsaved_configs(helper_user, gpustack_user)
+    if unsaved:
+        save_configs(unsaved)
+    helper_active = active_helper_config()
+    helper_active.reload()
+    gpustack_active = active_gpustack_config()
+    gpustack_active.reload()
+
+    files_copy: List[Tuple[str, str]] = [
+        (user.config_path, active.config_path)
+        for (user, active) in (
+            (helper_user, helper_active),
+            (gpustack_user, gpustack_active),
+        )
+        if copy_needed(user, active)
+    ]
+    commands: List[str] = [
+        phase_marker("copy"),
+        f"mkdir -p {shlex.quote(gpustack_active.static_data_dir)}",
+    ]
+    commands.extend(
+        f"cp -f {shlex.quote(src)} {shlex.quote(dst)} && chmod 0644 {shlex.quote(dst)}"
+        for src, dst in files_copy
+    )
+    for log_path in {helper_user.StandardOutPath, helper_user.StandardErrorPath}:
+        if log_path:
+            commands.append(f"mkdir -p {shlex.quote(os.path.dirname(log_path))}")
+
+    unit = render_unit(helper_user).encode("utf-8")
+    if _read(unit_path) != unit:
+        # rendered as the user, installed by the privileged script
+        rendered_path = os.path.join(gpustack_user.static_data_dir, unit_name)
+        os.makedirs(gpustack_user.static_data_dir, exist_ok=True)
+        atomic_write(rendered_path, unit)
+        commands.append(phase_marker("install"))
+        commands.append(
+            f"install -m 0644 {shlex.quote(rendered_path)} {shlex.quote(unit_path)}"
+        )
+        commands.append("systemctl daemon-reload")
+    enable = "enable" if helper_user.RunAtLoad else "disable"
+    commands.append(phase_marker(enable))
+    commands.append(f"systemctl {enable} --quiet {unit_name}")
+    if not sync_only:
+        action = "restart" if restart else "start"
+        commands.append(phase_marker(action))
+        commands.append(f"systemctl {action} {unit_name}")
+    script = " && ".join(commands)
+    logger.debug(f"Prepared script to run as root:\n{script}")
+    return script
+
+
+# pkexec exits with these when it couldn't run the command as root
+pkexec_dismissed = 126
+pkexec_not_authorized = 127
+
+
+def _use_pkexec() -> bool:
+    return os.geteuid() != 0
+
+
+def _privileged_process(arguments: List[str]) -> QProcess:
+    """
+    Run arguments as root, directly when the helper runs as root already,
+    e.g. headless, otherwise through pkexec.
+    """
+    process = QProcess()
+    if _use_pkexec():
+        pkexec = shutil.which("pkexec")
+        if pkexec is None:
+            raise RuntimeError(
+                QCoreApplication.translate(
+                    "LinuxSystemdService",
+                    "pkexec is not installed, install polkit or run the helper as root",
+                )
+            )
+        process.setProgram(pkexec)
+        process.setArguments(arguments)
+    else:
+        process.setProgram(arguments[0])
+        process.setArguments(arguments[1:])
+    process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
+    return process
+
+
+class LinuxSystemdService(AbstractService):
+    _manager: Optional[UnitManager] = None
+
+    @classmethod
+    def unit_manager(cls) -> UnitManager:
+        if cls._manager is None:
+            app = QCoreApplication.instance()
+            if app is not None and QThread.currentThread() != app.thread():
+                # the manager receives the signals in the thread creating it,
+                # state_notifier creates it on the main thread when the
+                # watcher starts. A probe before that queries systemctl
+                return SystemctlUnitManager(unit_name)
+            cls._manager = create_unit_manager()
+        return cls._manager
+
+    @classmethod
+    def set_unit_manager(cls, manager: Optional[UnitManager]) -> None:
+        """
+        Replace the unit manager, e.g. with a fake one without systemd.
+        """
+        cls._manager = manager
+
+    @classmethod
+    def state_notifier(cls) -> Optional[QObject]:
+        return cls.unit_manager()
+
+    @classmethod
+    def watch_paths(cls) -> List[str]:
+        return [unit_path]
+
+    @classmethod
+    def start(cls) -> QProcess:
+        return _privileged_process(["sh", "-c", get_start_script(restart=False)])
+
+    @classmethod
+    def stop(cls) -> QProcess:
+        return _privileged_process(["systemctl", "stop", unit_name])
+
+    @classmethod
+    def restart(cls) -> QProcess:
+        return _privileged_process(["sh", "-c", get_start_script(restart=True)])
+
+    @classmethod
+    def sync(cls) -> QProcess:
+        return _privileged_process(["sh", "-c", get_start_script(sync_only=True)])
+
+    @classmethod
+    def describe_exit(cls, code: int) -> Optional[str]:
+        if not _use_pkexec():
+            return None
+        if code == pkexec_dismissed:
+            return QCoreApplication.translate(
+                "LinuxSystemdService", "Authentication was dismissed"
+            )
+        if code == pkexec_not_authorized:
+            return QCoreApplication.translate(
+                "LinuxSystemdService",
+                "Authentication failed or the user isn't authorized",
+            )
+        return None
+
+    @classmethod
+    def get_current_state(cls) -> AbstractService.State:
+        cls._pid = None
+        properties = cls.unit_manager().properties()
+        is_running = (
+            properties.get("LoadState") == "loaded"
+            and properties.get("ActiveState") in running_states
+        )
+        pid = properties.get("MainPID", "")
+        if is_running and pid.isdigit() and int(pid) > 0:
+            cls._pid = int(pid)
+        state = (
+            AbstractService.State.STARTED
+            if is_running
+            else AbstractService.State.STOPPED
+        )
+        if is_running and not all_config_sync():
+            state |= AbstractService.State.TO_SYNC
+        return state
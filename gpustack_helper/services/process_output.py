@@ -0,0 +1,132 @@
+"""
+Read the output of the service control processes while they run. The lines
+are forwarded to the logger as they arrive and the last ones are kept in a
+ring buffer for the failure report. The scripts echo a phase marker before
+each step, e.g. bootout or bootstrap, to time the steps of a slow start.
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from PySide6.QtCore import QObject, QProcess, Slot
+
+logger = logging.getLogger(__name__)
+
+phase_prefix = "::phase::"
+# lines kept for the failure report
+max_lines = 200
+# a partial line longer than this is flushed as a line
+max_line_length = 4096
+
+
+def phase_marker(phase: str) -> str:
+    """
+    Shell command echoing the marker of phase with the wall clock time.
+    """
+    return f"echo {phase_prefix} {phase} $(date +%s)"
+
+
+class OutputReader(QObject):
+    """
+    Consume the readyRead chunks of a process. osascript only prints the
+    output of its shell script when it exits, the phase times then come from
+    the second-resolution stamps of the markers instead of their arrival.
+    """
+
+    name: str
+    _lines: Deque[str]
+    _partial: Dict[QProcess.ProcessChannel, bytes]
+    _phases: List[Tuple[str, float]]
+
+    def __init__(self, process: QProcess, name: str, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.name = name
+        self._process = process
+        self._lines = deque(maxlen=max_lines)
+        self._partial = {}
+        self._phases = []
+        process.readyReadStandardOutput.connect(self.on_stdout)
+        process.readyReadStandardError.connect(self.on_stderr)
+
+    @property
+    def lines(self) -> List[str]:
+        return list(self._lines)
+
+    @property
+    def phases(self) -> List[Tuple[str, float]]:
+        return list(self._phases)
+
+    @Slot()
+    def on_stdout(self) -> None:
+        self._feed(
+            QProcess.ProcessChannel.StandardOutput,
+            bytes(self._process.readAllStandardOutput()),
+        )
+
+    @Slot()
+    def on_stderr(self) -> None:
+        self._feed(
+            QProcess.ProcessChannel.StandardError,
+            bytes(self._process.readAllStandardError()),
+        )
+
+    def _feed(self, channel: QProcess.ProcessChannel, data: bytes) -> None:
+        if not data:
+            return
+        *lines, partial = (self._partial.get(channel, b"") + data).split(b"\n")
+        if len(partial) > max_line_length:
+            lines.append(partial)
+            partial = b""
+        self._partial[channel] = partial
+        for line in lines:
+            self._on_line(line.decode("utf-8", errors="replace").rstrip("\r"))
+
+    def _on_line(self, line: str) -> None:
+        if line.startswith(phase_prefix):
+            self._on_marker(line[len(phase_prefix) :].split())
+            return
+        self._lines.append(line)
+        logger.info(f"[{self.name}] {line}")
+
+    def _on_marker(self, words: List[str]) -> None:
+        if not words:
+            return
+        arrival = time.time()
+        try:
+            stamp = float(words[1])
+        except (IndexError, ValueError):
+            stamp = arrival
+        # the stamp is truncated to seconds, the arrival is precise unless
+        # the output was held back until the process exited
+        at = arrival if 0 <= arrival - stamp < 1 else stamp
+        self._phases.append((words[0], at))
+        logger.debug(f"[{self.name}] phase {words[0]}")
+
+    def flush(self) -> None:
+        """
+        Read what's left after the process exited, including a last line
+        without a newline.
+        """
+        self.on_stdout()
+        if (
+            self._process.processChannelMode()
+            != QProcess.ProcessChannelMode.MergedChannels
+        ):
+            self.on_stderr()
+        for partial in self._partial.values():
+            if partial:
+                self._on_line(partial.decode("utf-8", errors="replace"))
+        self._partial = {}
+
+    def durations(self, end: Optional[float] = None) -> Dict[str, float]:
+        """
+        Seconds spent in each phase, the last one ends at end or now.
+        """
+        end = time.time() if end is None else end
+        result: Dict[str, float] = {}
+        for (phase, at), (_, until) in zip(
+            self._phases, self._phases[1:] + [("", end)]
+        ):
+            result[phase] = round(result.get(phase, 0.0) + until - at, 3)
+        return result
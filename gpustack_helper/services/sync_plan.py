@@ -0,0 +1,109 @@
+"""
+Plan the steps which bring the installed service in line with the user
+configs. The plan is built from stat fingerprints and the cached config
+digests without side effects, so it can be inspected in dry-run mode before
+its local steps run and its commands are handed to the privileged script.
+"""
+
+import logging
+from typing import Callable, List, NamedTuple, Optional, Sequence, Union
+from gpustack_helper.config import (
+    HelperConfig,
+    GPUStackConfig,
+    config_transaction,
+)
+from gpustack_helper.config.backends import file_fingerprint
+from gpustack_helper.services.process_output import phase_marker
+
+logger = logging.getLogger(__name__)
+
+AnyConfig = Union[HelperConfig, GPUStackConfig]
+
+
+class SyncStep(NamedTuple):
+    # e.g. "save", "bootout", "copy", "link", "bootstrap"
+    kind: str
+    # shell command run with privileges, None for the steps run by the helper
+    command: Optional[str] = None
+    action: Optional[Callable[[], None]] = None
+
+
+class SyncPlan:
+    steps: List[SyncStep]
+
+    def __init__(self):
+        self.steps = []
+
+    def add(
+        self,
+        kind: str,
+        command: Optional[str] = None,
+        action: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.steps.append(SyncStep(kind, command, action))
+
+    @property
+    def kinds(self) -> List[str]:
+        return [step.kind for step in self.steps]
+
+    @property
+    def commands(self) -> List[str]:
+        return [step.command for step in self.steps if step.command is not None]
+
+    def script(self, separator: str = ";", markers: bool = False) -> str:
+        """
+        Join the commands, with markers a phase marker is echoed before the
+        first command of each kind to time the steps.
+        """
+        commands: List[str] = []
+        last_kind = None
+        for step in self.steps:
+            if step.command is None:
+                continue
+            if markers and step.kind != last_kind:
+                commands.append(phase_marker(step.kind))
+            last_kind = step.kind
+            commands.append(step.command)
+        return separator.join(commands)
+
+    def run_local_steps(self) -> None:
+        for step in self.steps:
+            if step.action is not None:
+                step.action()
+
+    def describe(self) -> str:
+        return "\n".join(
+            f"{step.kind}: {step.command or 'run by the helper'}" for step in self.steps
+        )
+
+
+def save_configs(configs: Sequence[AnyConfig]) -> None:
+    # saved together, none of them is written if one fails
+    with config_transaction(*configs):
+        pass
+
+
+def unsaved_configs(*configs: AnyConfig, reload: bool = True) -> List[AnyConfig]:
+    """
+    Reload the configs and return the ones whose files are missing or behind
+    the models. The configs must be saved before their files are copied.
+    """
+    if reload:
+        for config in configs:
+            config.reload()
+    return [config for config in configs if config.needs_save()]
+
+
+def copy_needed(user: AnyConfig, active: AnyConfig, unsaved: bool = False) -> bool:
+    """
+    Whether the user config file must be copied over the active one. Both
+    configs must be reloaded, the cached digests are compared instead of the
+    file contents. unsaved tells the user file is written before the copy.
+    """
+    if user.config_path == active.config_path:
+        return False
+    if not unsaved and file_fingerprint(user.config_path) is None:
+        return False
+    if file_fingerprint(active.config_path) is None:
+        return True
+    return user.digest() != active.digest()
@@ -1,16 +1,16 @@
+import time
 import logging
 import win32service
 import shutil
-import glob
 import os
 from typing import Callable
-from PySide6.QtCore import QThread
 
 from gpustack_helper.defaults import (
     nssm_binary_path,
     log_file_path,
 )
 from gpustack_helper.services.abstract_service import AbstractService
+from gpustack_helper.data_migration import migrate_data_dir
 from gpustack_helper.config import (
     active_helper_config,
     legacy_helper_config,
@@ -22,19 +22,18 @@ from gpustack_helper.config import (
 from gpustack_helper.config.windows_backend import (
     service_name,
     service_exists,
+    service_pid,
 )
 
 logger = logging.getLogger(__name__)
 
 
-class ThreadWrapper(QThread):
-    target: Callable[[], None]
+def _debuggable(func: Callable[[], None]) -> Callable[[], None]:
+    """
+    Attach the pool thread running func to debugpy in debug mode.
+    """
 
-    def __init__(self, func: Callable[[], None]) -> None:
-        super().__init__()
-        self.target = func
-
-    def run(self) -> None:
+    def run() -> None:
         if active_helper_config()._debug:
             try:
                 import debugpy
@@ -42,7 +41,9 @@ class ThreadWrapper(QThread):
                 debugpy.debug_this_thread()
             except ImportError:
                 logger.error("debugpy is not installed, skipping debug mode.")
-        return self.target()
+        return func()
+
+    return run
 
 
 def _relocate_legacy_files() -> None:
@@ -55,21 +56,11 @@ def _relocate_legacy_files() -> None:
                 f"Migrating legacy data files from {gpustack_legacy.data_dir} to {gpustack_active.static_data_dir}"
             )
             try:
-                for file in glob.glob(gpustack_legacy.data_dir + "/*"):
-                    if file.endswith(".ps1"):
-                        continue
-                    target_file = os.path.join(
-                        gpustack_active.static_data_dir, os.path.basename(file)
-                    )
-                    if os.path.exists(target_file):
-                        logger.warning(
-                            f"File {target_file} already exists, removing it before migration."
-                        )
-                        if os.path.isfile(target_file):
-                            os.remove(target_file)
-                        elif os.path.isdir(target_file):
-                            shutil.rmtree(target_file)
-                    shutil.move(file, gpustack_active.static_data_dir)
+                migrate_data_dir(
+                    gpustack_legacy.data_dir,
+                    gpustack_active.static_data_dir,
+                    exclude=["*.ps1"],
+                )
                 os.symlink(
                     os.path.join(gpustack_active.static_data_dir, "cache"),
                     os.path.join(gpustack_legacy.data_dir, "cache"),
@@ -120,28 +111,46 @@ def _ensure_log_dir() -> None:
                 raise
 
 
-def _wait_for_service_status_with_timeout(
-    service_handle, expected_status, timeout=10
-) -> None:
-    import time
+def _service_state(service_handle) -> AbstractService.State:
+    status = win32service.QueryServiceStatus(service_handle)[1]
+    # the pending states are transitional, a wait for stopped goes on
+    return {
+        win32service.SERVICE_RUNNING: AbstractService.State.STARTED,
+        win32service.SERVICE_STOPPED: AbstractService.State.STOPPED,
+        win32service.SERVICE_START_PENDING: AbstractService.State.STARTING,
+        win32service.SERVICE_STOP_PENDING: AbstractService.State.STOPPING,
+    }.get(status, AbstractService.State.UNKNOWN)
 
-    start_time = time.time()
-    while True:
-        status = win32service.QueryServiceStatus(service_handle)[1]
-        if status == expected_status:
-            break
-        if time.time() - start_time > timeout:
-            logger.warning(f"Timeout waiting for service {service_name} to stop.")
-            raise TimeoutError(f"Timeout waiting for service {service_name} to stop.")
-        time.sleep(0.5)
+
+def _wait_for_service_status(
+    service_handle, expected_state: AbstractService.State, timeout=10
+) -> None:
+    try:
+        elapsed = WindowsService.wait_for_state(
+            expected_state,
+            time.monotonic() + timeout,
+            probe=lambda: _service_state(service_handle),
+        )
+    except InterruptedError:
+        logger.warning(f"Stopped waiting for service {service_name}, quitting.")
+        raise
+    except TimeoutError:
+        message = f"Timeout waiting for service {service_name} to reach status {expected_state}."
+        logger.warning(message)
+        raise TimeoutError(message)
     logger.info(
-        f"Service {service_name} is now in the expected status: {expected_status}."
+        f"Service {service_name} is now in the expected status: {expected_state} after {elapsed:.2f}s."
     )
 
 
-def _start_windows_service() -> None:
+def _apply_configs() -> None:
     _sync_configs()
     _ensure_log_dir()
+
+
+def _start_windows_service() -> None:
+    _apply_configs()
+    scm = None
     try:
         scm = win32service.OpenSCManager(None, None, win32service.SC_MANAGER_ALL_ACCESS)
         service_handle = win32service.OpenService(
@@ -149,11 +158,16 @@ def _start_windows_service() -> None:
             service_name,
             win32service.SERVICE_START | win32service.SERVICE_QUERY_STATUS,
         )
+        status = win32service.QueryServiceStatus(service_handle)[1]
+        if status == win32service.SERVICE_RUNNING:
+            logger.info(f"Service {service_name} is already running.")
+            win32service.CloseServiceHandle(service_handle)
+            return
 
         # Start service
         win32service.StartService(service_handle, None)
-        _wait_for_service_status_with_timeout(
-            service_handle, win32service.SERVICE_RUNNING, timeout=10
+        _wait_for_service_status(
+            service_handle, AbstractService.State.STARTED, timeout=10
         )
         win32service.CloseServiceHandle(service_handle)
     except Exception as e:
@@ -180,9 +194,12 @@ def _stop_windows_service(timeout=10) -> None:
             return
         logger.info(f"Stopping service {service_name}...")
         win32service.ControlService(service_handle, win32service.SERVICE_CONTROL_STOP)
-        _wait_for_service_status_with_timeout(
-            service_handle, win32service.SERVICE_STOPPED, timeout=timeout
+        _wait_for_service_status(
+            service_handle, AbstractService.State.STOPPED, timeout=timeout
         )
+    except InterruptedError:
+        # don't go on with the start of a restart
+        raise
     except Exception as e:
         logger.error(f"Failed to stop service: {e}")
     finally:
@@ -203,19 +220,25 @@ def _restart_windows_service() -> None:
 
 class WindowsService(AbstractService):
     @classmethod
-    def start(self) -> QThread:
-        return ThreadWrapper(_restart_windows_service)
+    def start(self) -> Callable[[], None]:
+        return _debuggable(_start_windows_service)
+
+    @classmethod
+    def stop(self) -> Callable[[], None]:
+        return _debuggable(_stop_windows_service)
 
     @classmethod
-    def stop(self) -> QThread:
-        return ThreadWrapper(_stop_windows_service)
+    def restart(self) -> Callable[[], None]:
+        return _debuggable(_restart_windows_service)
 
     @classmethod
-    def restart(self) -> QThread:
-        return ThreadWrapper(_restart_windows_service)
+    def sync(self) -> Callable[[], None]:
+        # the start type is written with the helper config, no restart needed
+        return _debuggable(_apply_configs)
 
     @classmethod
     def get_current_state(self) -> AbstractService.State:
+        self._pid = None
         cfg = legacy_helper_config()
         if cfg is not None:
             return AbstractService.State.TO_MIGRATE | AbstractService.State.STOPPED
@@ -223,6 +246,7 @@ class WindowsService(AbstractService):
         exists, is_running = service_exists()
         if not exists or not is_running:
             return AbstractService.State.STOPPED
+        self._pid = service_pid()
 
         is_sync = not is_running or all_config_sync()
         state = (
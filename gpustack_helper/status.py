@@ -1,62 +1,73 @@
 import logging
 from PySide6.QtWidgets import QMenu
-from PySide6.QtGui import QAction, QActionGroup, QGuiApplication
-from PySide6.QtCore import Slot, Signal, QProcess, QThread, QCoreApplication
-from typing import Optional, Tuple, Union, Dict
-from gpustack_helper.config import (
-    user_gpustack_config,
-    active_gpustack_config,
-    active_helper_config,
+from PySide6.QtGui import QAction, QActionGroup
+from PySide6.QtCore import Slot, SignalInstance, QCoreApplication
+from typing import Optional, Type, Dict
+from gpustack_helper.config import unsynced_fields
+from gpustack_helper.common import (
+    create_menu_action,
+    show_warning,
+    update_enabled,
+    update_text,
 )
-from gpustack_helper.common import create_menu_action, show_warning
+from gpustack_helper.controller import ServiceController
 from gpustack_helper.services.abstract_service import AbstractService as service
-from gpustack_helper.services.factory import get_service_class
 
 logger = logging.getLogger(__name__)
 
 
 class Status(QMenu):
-    status_signal = Signal(service.State)
+    """
+    The status menu of the tray, a view of the ServiceController.
+    """
+
     start_or_stop: QAction
     restart: QAction
 
-    _status: service.State = None
+    controller: ServiceController
     translations: Dict[str, str] = None
 
+    @property
+    def status_signal(self) -> SignalInstance:
+        return self.controller.status_signal
+
     @property
     def status(self) -> service.State:
-        return self._status
+        return self.controller.status
 
     @status.setter
     def status(self, value: service.State) -> None:
-        self._status = value
-        self.status_signal.emit(value)
+        self.controller.status = value
+
+    @property
+    def service_class(self) -> Type[service]:
+        return self.controller.service_class
 
     group: QActionGroup
     manual: QAction
     foreground: QAction
     daemon: QAction
 
-    qprocess: Optional[Union[QProcess, QThread]] = None
-
-    service_class: service = get_service_class()
-
-    def __init__(self, parent: QMenu):
-        self._status = service.State.UNKNOWN
+    def __init__(self, parent: QMenu, controller: Optional[ServiceController] = None):
         # --- status
         super().__init__(parent)
+        self.controller = controller or ServiceController(self)
+        self.controller.error.connect(self.on_error)
         self.translations = {
             "Start": QCoreApplication.translate("Status", "Start"),
             "Stop": QCoreApplication.translate("Status", "Stop"),
             "Restart": QCoreApplication.translate("Status", "Restart"),
             "Status": QCoreApplication.translate("Status", "Status ({status})"),
+            "Changed": QCoreApplication.translate(
+                "Status", "Changed settings: {fields}"
+            ),
+            "Migrating": QCoreApplication.translate(
+                "Status", "Migrating Data {percent}%"
+            ),
         }
-        self.setTitle(
-            self.translations["Status"].format(
-                status=service.get_display_text(self._status)
-            )
-        )
+        self.update_title()
         parent.addMenu(self)
+        self.setToolTipsVisible(True)
 
         self.start_or_stop = create_menu_action(self.translations["Start"], self)
         self.start_or_stop.triggered.connect(self.start_or_stop_action)
@@ -68,95 +79,68 @@ class Status(QMenu):
         self.restart.triggered.connect(self.restart_action)
 
         self.update_menu_status()
-        self.update_title()
         # functions
         self.status_signal.connect(self.on_status_changed)
-        # QProcess 实例
-        self.qprocess = None
-
-    def start_process(
-        self,
-        process: Union[QProcess, QThread],
-        state_to_change: Tuple[service.State, service.State],
-    ):
-        """
-        Start process and connect its finished signal to handle the process completion.
-        state_to_change is a tuple of (failed_state, sueccess_state) to change the status.
-        """
-        if self.qprocess is not None:
-            self.qprocess.deleteLater()
-        process.setParent(self)
-        self.qprocess = process
-        if isinstance(self.qprocess, QThread):
-
-            def on_thread_finish():
-                logger.info("Service thread finished successfully")
-                self.status = state_to_change[1]
-                self.qprocess.deleteLater()
-                self.qprocess = None
-                active_gpustack_config().reload()
-                active_helper_config().reload()
-
-            self.qprocess.finished.connect(on_thread_finish)
-        elif isinstance(self.qprocess, QProcess):
-
-            def on_process_finish(code: int, status: QProcess.ExitStatus):
-                if code == 0:
-                    logger.info("Service process finished successfully")
-                    self.status = state_to_change[1]
-                else:
-                    stderr = bytes(self.qprocess.readAllStandardError()).decode()
-                    stdout = bytes(self.qprocess.readAllStandardOutput()).decode()
-                    logger.error(
-                        f"Service process failed: stdout: {stdout} stderr: {stderr}"
-                    )
-                    self.status = state_to_change[0]
-                self.qprocess.deleteLater()
-                self.qprocess = None
-                active_gpustack_config().reload()
-                active_helper_config().reload()
-
-            self.qprocess.finished.connect(on_process_finish)
-        self.qprocess.start()
+        self.aboutToShow.connect(self.update_restart_tooltip)
+        self.controller.migration_progress.connect(self.on_migration_progress)
 
     @Slot(service.State)
     def on_status_changed(self, status: service.State):
         self.update_title(status)
-        self.start_or_stop.setText(
-            self.translations["Start"]
-            if status & service.State.STOPPED
-            else self.translations["Stop"]
+        update_text(
+            self.start_or_stop,
+            (
+                self.translations["Start"]
+                if status & service.State.STOPPED
+                else self.translations["Stop"]
+            ),
         )
-        # need to use launchctl to create service
-        if status == service.State.STARTING:
-            self.start_process(
-                self.service_class.start(),
-                (service.State.STOPPED, service.State.STARTED),
-            )
-        elif status == service.State.RESTARTING:
-            self.start_process(
-                self.service_class.restart(),
-                (service.State.STOPPED, service.State.STARTED),
-            )
-        elif status == service.State.STOPPING:
-            self.start_process(
-                self.service_class.stop(),
-                (service.State.UNKNOWN, service.State.STOPPED),
-            )
-
         if status & service.State.STARTED:
-            self.restart.setEnabled(True)
+            update_enabled(self.restart, True)
         else:
-            self.start_or_stop.setDisabled(False)
-            self.restart.setEnabled(False)
+            update_enabled(self.start_or_stop, True)
+            update_enabled(self.restart, False)
+        self.update_restart_tooltip()
 
-    def update_title(self, status: Optional[service.State] = None):
+    @Slot()
+    def update_restart_tooltip(self):
+        """
+        The changed fields may differ without a state change, so it's updated
+        when the menu is shown too.
+        """
+        tooltip = (
+            self.translations["Changed"].format(
+                fields=", ".join(unsynced_fields().keys())
+            )
+            if self.status & service.State.TO_SYNC
+            else ""
+        )
+        if self.restart.toolTip() != tooltip:
+            self.restart.setToolTip(tooltip)
+
+    @Slot(str, str)
+    def on_error(self, title: str, message: str):
+        show_warning(self, title, message)
+
+    @Slot(int, int)
+    def on_migration_progress(self, done: int, total: int):
+        if total <= 0:
+            self.update_title()
+            return
+        self.update_title(
+            text=self.translations["Migrating"].format(percent=done * 100 // total)
+        )
+
+    def update_title(
+        self, status: Optional[service.State] = None, text: Optional[str] = None
+    ):
         if status is None:
             status = self.status
-        title = QCoreApplication.translate("Status", "Status ({status})").format(
-            status=service.get_display_text(status)
+        title = self.translations["Status"].format(
+            status=text or service.get_display_text(status)
         )
-        self.setTitle(title)
+        if self.title() != title:
+            self.setTitle(title)
 
     @Slot()
     def start_or_stop_action(self):
@@ -172,50 +156,19 @@ class Status(QMenu):
     @Slot()
     def restart_action(self):
         self.restart.setDisabled(True)
-        self.status = service.State.RESTARTING
+        self.controller.restart_action()
 
     def stop_action(self):
-        self.status = service.State.STOPPING
+        self.controller.stop_action()
 
     def start_action(self, skip_config_check: bool = False):
-        if not skip_config_check:
-            try:
-                user_gpustack_config().validate_updates()
-            except Exception as e:
-                show_warning(
-                    self,
-                    QGuiApplication.translate("GPUStackConfig", "Configuration Error"),
-                    QGuiApplication.translate("GPUStackConfig", "{error}").format(
-                        error=str(e)
-                    ),
-                )
-                return
-        self.status = service.State.STARTING
+        self.controller.start_action(skip_config_check)
 
     @Slot()
     def update_menu_status(self):
-        logger.debug("Query service status")
-        if not self.start_or_stop.isEnabled():
-            self.start_or_stop.setEnabled(True)
-        if self.qprocess is not None:
-            if (
-                isinstance(self.qprocess, QProcess)
-                and self.qprocess.state() == QProcess.ProcessState.Running
-            ):
-                logger.debug("Process is running, skipping status update")
-                return
-            elif isinstance(self.qprocess, QThread) and self.qprocess.isRunning():
-                logger.debug("Thread is running, skipping status update")
-                return
-        user_gpustack_config().reload()
-        active_gpustack_config().reload()
-        active_helper_config().reload()
-        self.status = self.service_class.get_current_state()
+        update_enabled(self.start_or_stop, True)
+        self.controller.update_status()
 
     @Slot()
     def wait_for_process_finish(self):
-        if self.qprocess is not None:
-            if isinstance(self.qprocess, QProcess):
-                self.qprocess.waitForFinished()
-            elif isinstance(self.qprocess, QThread):
-                self.qprocess.wait()
+        self.controller.wait_for_process_finish()
@@ -0,0 +1,306 @@
+import os
+import sys
+import select
+import logging
+from typing import Dict, List, Optional, Set, Type
+from PySide6.QtCore import (
+    QObject,
+    QTimer,
+    QFileSystemWatcher,
+    QSocketNotifier,
+    Signal,
+    Slot,
+)
+from gpustack_helper.config import (
+    user_helper_config,
+    active_helper_config,
+    user_gpustack_config,
+    active_gpustack_config,
+)
+from gpustack_helper.config.backends import Fingerprint, file_fingerprint
+from gpustack_helper.services.abstract_service import (
+    AbstractService as service,
+    transitional_states,
+)
+
+logger = logging.getLogger(__name__)
+
+# multiple events are usually fired for one change, e.g. write + rename
+debounce_interval_ms = 200
+
+
+class ProcessExitNotifier(QObject):
+    """
+    Notify when the watched process exits without polling it.
+    It relies on kqueue on macOS, pidfd on Linux and process handle on Windows.
+    """
+
+    exited = Signal(int)
+
+    _pid: Optional[int] = None
+    _handle = None
+    _notifier: Optional[QObject] = None
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._pid = None
+        self._handle = None
+        self._notifier = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._pid
+
+    def watch(self, pid: Optional[int]) -> None:
+        if pid == self._pid:
+            return
+        self.unwatch()
+        if pid is None:
+            return
+        try:
+            self._notifier = self._create_notifier(pid)
+            self._pid = pid
+            logger.debug(f"Watching service process {pid} for exit")
+        except Exception as e:
+            logger.debug(f"Unable to watch service process {pid}: {e}")
+            self.unwatch()
+
+    def unwatch(self) -> None:
+        if self._notifier is not None:
+            self._notifier.setEnabled(False)
+            self._notifier.deleteLater()
+            self._notifier = None
+        if self._handle is not None:
+            if isinstance(self._handle, int):
+                os.close(self._handle)
+            elif sys.platform == "win32":
+                self._handle.Close()
+            else:
+                self._handle.close()
+            self._handle = None
+        self._pid = None
+
+    def _create_notifier(self, pid: int) -> QObject:
+        if sys.platform == "win32":
+            import win32api
+            import win32con
+            from PySide6.QtCore import QWinEventNotifier
+
+            self._handle = win32api.OpenProcess(win32con.SYNCHRONIZE, False, pid)
+            notifier = QWinEventNotifier(int(self._handle), self)
+            notifier.activated.connect(self._on_exited)
+            return notifier
+        if sys.platform == "darwin":
+            self._handle = select.kqueue()
+            event = select.kevent(
+                pid,
+                filter=select.KQ_FILTER_PROC,
+                flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT,
+                fflags=select.KQ_NOTE_EXIT,
+            )
+            self._handle.control([event], 0, 0)
+            fd = self._handle.fileno()
+        else:
+            self._handle = os.pidfd_open(pid)
+            fd = self._handle
+        notifier = QSocketNotifier(fd, QSocketNotifier.Type.Read, self)
+        notifier.activated.connect(self._on_exited)
+        return notifier
+
+    @Slot()
+    def _on_exited(self) -> None:
+        pid = self._pid
+        self.unwatch()
+        if pid is not None:
+            logger.debug(f"Service process {pid} exited")
+            self.exited.emit(pid)
+
+
+class PollScheduler(QObject):
+    """
+    Poll fast while the service is changing state, and back off exponentially
+    while it is stable. The backoff is capped lower when the menu is visible.
+    """
+
+    timeout = Signal()
+
+    _timer: QTimer
+    _fast_ms: int
+    _visible_ms: int
+    _max_ms: int
+    _interval: int
+    _visible: bool = False
+    _state: Optional[service.State] = None
+
+    def __init__(
+        self,
+        fast_ms: int,
+        visible_ms: int,
+        max_ms: int,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self._fast_ms = fast_ms
+        self._visible_ms = max(visible_ms, fast_ms)
+        self._max_ms = max(max_ms, fast_ms)
+        self._interval = fast_ms
+        self._visible = False
+        self._state = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timeout)
+
+    @property
+    def interval(self) -> int:
+        return self._interval
+
+    def start(self) -> None:
+        self._timer.start(self._interval)
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def _next_interval(self) -> int:
+        if self._state is not None and self._state & transitional_states:
+            return self._fast_ms
+        cap = self._visible_ms if self._visible else self._max_ms
+        return min(self._interval * 2, cap)
+
+    @Slot()
+    def _on_timeout(self) -> None:
+        self.timeout.emit()
+        self._interval = self._next_interval()
+        self._timer.start(self._interval)
+
+    def reset(self) -> None:
+        self._interval = self._fast_ms
+        if not self._timer.isActive() or self._timer.remainingTime() > self._interval:
+            self._timer.start(self._interval)
+
+    def set_state(self, state: service.State) -> None:
+        if state == self._state:
+            return
+        self._state = state
+        self.reset()
+
+    def set_visible(self, visible: bool) -> None:
+        self._visible = visible
+        if visible:
+            self.reset()
+
+
+class StatusWatcher(QObject):
+    """
+    Refresh the status when the config files or the service process change.
+    The adaptive poll is only a fallback for changes that are not notified,
+    e.g. the service being started outside of the helper.
+    """
+
+    refresh = Signal()
+
+    _service_class: Type[service]
+    _watcher: QFileSystemWatcher
+    _debounce: QTimer
+    _scheduler: PollScheduler
+    _process: ProcessExitNotifier
+    _stats: Dict[str, Optional[Fingerprint]]
+
+    def __init__(self, service_class: Type[service], parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._service_class = service_class
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self.on_path_changed)
+        self._watcher.directoryChanged.connect(self.on_path_changed)
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(debounce_interval_ms)
+        self._debounce.timeout.connect(self.refresh)
+
+        cfg = user_helper_config()
+        self._scheduler = PollScheduler(
+            cfg.poll_fast_interval,
+            cfg.poll_visible_interval,
+            cfg.poll_max_interval,
+            self,
+        )
+        self._scheduler.timeout.connect(self.refresh)
+
+        self._process = ProcessExitNotifier(self)
+        self._process.exited.connect(self.schedule_refresh)
+        notifier = service_class.state_notifier()
+        if notifier is not None:
+            notifier.changed.connect(self.schedule_refresh)
+        self._stats = {}
+
+    def watched_paths(self) -> List[str]:
+        paths: List[Optional[str]] = [
+            user_gpustack_config().config_path,
+            active_gpustack_config().config_path,
+            user_helper_config().config_path,
+            active_helper_config().config_path,
+            *self._service_class.watch_paths(),
+        ]
+        return [path for path in paths if path]
+
+    def sync_watched_paths(self) -> bool:
+        """
+        Files replaced by rename are dropped by QFileSystemWatcher, so the parent
+        directories are watched as well and the files are re-added on change.
+        Returns whether any of the watched files changed since the last sync.
+        """
+        wanted: Set[str] = set()
+        stats: Dict[str, Optional[Fingerprint]] = {}
+        for path in self.watched_paths():
+            stats[path] = file_fingerprint(path)
+            if stats[path] is not None:
+                wanted.add(path)
+            parent = os.path.dirname(path)
+            if os.path.isdir(parent):
+                wanted.add(parent)
+        current = set(self._watcher.files()) | set(self._watcher.directories())
+        to_add = wanted - current
+        if to_add:
+            self._watcher.addPaths(list(to_add))
+        to_remove = current - wanted
+        if to_remove:
+            self._watcher.removePaths(list(to_remove))
+        changed = stats != self._stats
+        self._stats = stats
+        return changed
+
+    def start(self) -> None:
+        self.sync_watched_paths()
+        self._scheduler.start()
+        self.refresh.emit()
+
+    def stop(self) -> None:
+        self._scheduler.stop()
+        self._debounce.stop()
+        self._process.unwatch()
+
+    @Slot(str)
+    def on_path_changed(self, path: str) -> None:
+        # the data dirs are shared with the service, ignore unrelated entries
+        if not self.sync_watched_paths():
+            return
+        logger.debug(f"Watched path changed: {path}")
+        self.schedule_refresh()
+
+    @Slot()
+    def schedule_refresh(self) -> None:
+        self._debounce.start()
+
+    @Slot(service.State)
+    def on_status_changed(self, state: service.State) -> None:
+        self._scheduler.set_state(state)
+        self._process.watch(self._service_class.get_service_pid())
+
+    @Slot()
+    def on_menu_shown(self) -> None:
+        self._scheduler.set_visible(True)
+        self.refresh.emit()
+
+    @Slot()
+    def on_menu_hidden(self) -> None:
+        self._scheduler.set_visible(False)
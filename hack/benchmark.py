@@ -0,0 +1,204 @@
+"""
+Micro benchmarks for the hot paths of the helper.
+
+    python hack/benchmark.py status-probe
+    python hack/benchmark.py yaml --rounds 1000
+    python hack/benchmark.py reload --rounds 1000
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _gui_stall(trigger: Callable[[], None], rounds: int) -> float:
+    """
+    Run a 5ms heartbeat on the main thread and return the worst gap between two
+    beats while trigger is called once per round.
+    """
+    from PySide6.QtCore import QCoreApplication, QTimer, QElapsedTimer
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    clock = QElapsedTimer()
+    clock.start()
+    gaps: List[int] = []
+    last = [clock.elapsed()]
+
+    def beat():
+        now = clock.elapsed()
+        gaps.append(now - last[0])
+        last[0] = now
+
+    heartbeat = QTimer()
+    heartbeat.timeout.connect(beat)
+    heartbeat.start(5)
+    ticker = QTimer()
+    ticker.timeout.connect(trigger)
+    ticker.start(100)
+    QTimer.singleShot(100 * rounds + 50, app.quit)
+    app.exec()
+    heartbeat.stop()
+    ticker.stop()
+    return max(gaps) if gaps else 0.0
+
+
+def bench_status_probe(args: argparse.Namespace) -> Dict[str, float]:
+    from PySide6.QtCore import QThreadPool
+    from gpustack_helper.controller import StatusProbe
+    from gpustack_helper.services.abstract_service import AbstractService as service
+
+    def slow_probe() -> service.State:
+        # simulate a slow `launchctl print` or SCM query
+        time.sleep(args.probe_ms / 1000)
+        return service.State.STARTED
+
+    before = _gui_stall(slow_probe, args.rounds)
+    probe = StatusProbe(slow_probe)
+    after = _gui_stall(probe.request, args.rounds)
+    QThreadPool.globalInstance().waitForDone()
+    return {
+        "sync worst stall (ms)": before,
+        "async worst stall (ms)": after,
+    }
+
+
+def _timeit(func: Callable[[], object], rounds: int) -> float:
+    """
+    Return the average time of one call in microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def _populated_gpustack_config():
+    from gpustack_helper.config.config import GPUStackConfig
+
+    config = GPUStackConfig(gpustack_config_path="", static_data_dir="")
+    for name, field in GPUStackConfig.model_fields.items():
+        if field.exclude:
+            continue
+        value = getattr(config, name)
+        if isinstance(value, bool):
+            value = not value
+        elif isinstance(value, int):
+            value = value + 1
+        elif isinstance(value, list):
+            value = [*value, "extra"]
+        elif value is None:
+            annotation = str(field.annotation)
+            if "dict" in annotation:
+                value = {"key": "value"}
+            elif "List" in annotation or "list" in annotation:
+                value = [name]
+            elif "int" in annotation:
+                value = 12345
+            else:
+                value = name
+        setattr(config, name, value)
+    return config
+
+
+def bench_yaml(args: argparse.Namespace) -> Dict[str, float]:
+    import io
+    import yaml
+    from gpustack_helper.config import backends
+
+    config = _populated_gpustack_config()
+    data = backends.YamlEncoder.encode_to_data(config)
+    dumped = config.model_dump(exclude_defaults=True)
+    result = {}
+    for label, loader, dumper in (
+        ("python", yaml.SafeLoader, yaml.SafeDumper),
+        ("libyaml", backends.YamlLoader, backends.YamlDumper),
+    ):
+        if yaml.dump(dumped, Dumper=dumper).encode("utf-8") != data:
+            raise RuntimeError(f"{label} output differs from YamlEncoder")
+        result[f"{label} encode (us)"] = _timeit(
+            lambda: yaml.dump(dumped, Dumper=dumper), args.rounds
+        )
+        result[f"{label} decode (us)"] = _timeit(
+            lambda: yaml.load(io.BytesIO(data).read().decode(), Loader=loader),
+            args.rounds,
+        )
+    return result
+
+
+def _reflective_set(model, data, reset_default=False) -> None:
+    """
+    The former set_nested_data, kept as the baseline of the reload benchmark.
+    """
+    from pydantic import BaseModel
+
+    if reset_default:
+        for name, field in model.__class__.model_fields.items():
+            if field.default_factory is not None:
+                value = field.default_factory()
+            else:
+                value = field.default
+            setattr(model, name, value)
+    for key, value in data.items():
+        if not hasattr(model, key):
+            continue
+        attr = getattr(model, key)
+        if isinstance(value, dict) and isinstance(attr, BaseModel):
+            _reflective_set(attr, value)
+        else:
+            setattr(model, key, value)
+
+
+def bench_reload(args: argparse.Namespace) -> Dict[str, float]:
+    from gpustack_helper.config.config import GPUStackConfig
+    from gpustack_helper.config.model_plan import model_plan
+
+    populated = _populated_gpustack_config()
+    content = populated.model_dump(exclude_defaults=True)
+    changed = {**content, "port": content.get("port", 0) + 1}
+    plan = model_plan(GPUStackConfig)
+    result = {}
+    for label, apply in (
+        ("reflective", _reflective_set),
+        ("plan", plan.apply),
+    ):
+        config = GPUStackConfig(gpustack_config_path="", static_data_dir="")
+        apply(config, content, True)
+        if config.model_dump() != populated.model_dump():
+            raise RuntimeError(f"{label} result differs from the loaded content")
+        result[f"{label} unchanged (us)"] = _timeit(
+            lambda: apply(config, content, True), args.rounds
+        )
+        # every round flips the port, like a poll after each save
+        documents = itertools.cycle([changed, content])
+        result[f"{label} changed (us)"] = _timeit(
+            lambda: apply(config, next(documents), True), args.rounds
+        )
+    return result
+
+
+benchmarks = {
+    "status-probe": bench_status_probe,
+    "yaml": bench_yaml,
+    "reload": bench_reload,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GPUStack Helper benchmarks")
+    parser.add_argument("name", choices=sorted(benchmarks.keys()))
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument(
+        "--probe-ms", type=int, default=300, help="Simulated probe latency"
+    )
+    args = parser.parse_args()
+    for key, value in benchmarks[args.name](args).items():
+        print(f"{key}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ from importlib.resources import files
 from PyInstaller.utils.hooks import collect_all, collect_data_files
 
 from gpustack_helper.defaults import get_dac_filename, dac_download_link
+from gpustack_helper.config.schema import save_schema_index
 from packaging.version import parse
 from gpustack.worker.tools_manager import ToolsManager, BUILTIN_LLAMA_BOX_VERSION
 from gpustack.utils.platform import system, arch, DeviceTypeEnum
@@ -260,10 +261,13 @@ def download_nssm(target_dir: str) -> None:
 def build_helper():
     os.makedirs('./build/cache', exist_ok=True)
     dac_path = download_dac('./build/cache')
+    schema_path = './build/cache/config_schema.json'
+    save_schema_index(schema_path)
 
     datas = [
         ('./tray_icon.png', './'),
         (dac_path, "./"),
+        (schema_path, "./"),
         ("./translations/*.qm", "./translations"),
     ]
 
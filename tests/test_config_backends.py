@@ -0,0 +1,176 @@
+import os
+import pytest
+from functools import partial
+from typing import Any, BinaryIO, Dict
+from gpustack_helper.config import GPUStackConfig
+from gpustack_helper.config import backends
+from gpustack_helper.config.backends import (
+    DocumentCache,
+    FileConfigModel,
+    YamlEncoder,
+    atomic_write,
+)
+from gpustack_helper.config.model_plan import model_plan
+
+
+class CountingEncoder(YamlEncoder):
+    decoded = 0
+
+    @classmethod
+    def decode_from_data(cls, f: BinaryIO) -> Dict[str, Any]:
+        CountingEncoder.decoded += 1
+        return super().decode_from_data(f)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(backends, "document_cache", DocumentCache())
+    CountingEncoder.decoded = 0
+
+
+def make_config(path: str) -> GPUStackConfig:
+    return GPUStackConfig(
+        backend=partial(FileConfigModel, filepath=path, encoder=CountingEncoder),
+        gpustack_config_path=path,
+        static_data_dir=os.path.dirname(path),
+    )
+
+
+@pytest.fixture
+def config(tmp_path) -> GPUStackConfig:
+    config = make_config(str(tmp_path / "config.yaml"))
+    config.port = 80
+    config.save()
+    return config
+
+
+def test_atomic_write_keeps_the_mode(tmp_path):
+    path = str(tmp_path / "config.yaml")
+    atomic_write(path, b"port: 80\n")
+    assert os.stat(path).st_mode & 0o777 == 0o644
+    os.chmod(path, 0o600)
+    atomic_write(path, b"port: 8080\n")
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    with open(path, "rb") as f:
+        assert f.read() == b"port: 8080\n"
+    assert os.listdir(tmp_path) == ["config.yaml"]
+
+
+def test_failed_atomic_write_keeps_the_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "config.yaml")
+    atomic_write(path, b"port: 80\n")
+
+    def fail(src, dst):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(backends.os, "replace", fail)
+    with pytest.raises(OSError):
+        atomic_write(path, b"port: 8080\n")
+    with open(path, "rb") as f:
+        assert f.read() == b"port: 80\n"
+    assert os.listdir(tmp_path) == ["config.yaml"]
+
+
+def test_unchanged_content_is_not_rewritten(config):
+    path = config._backend.filepath
+    before = os.stat(path)
+    assert not config._backend.needs_save()
+    config.save()
+    after = os.stat(path)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    config.port = 8080
+    assert config._backend.needs_save()
+    config.save()
+    assert os.stat(path).st_ino != before.st_ino
+
+
+def test_same_fingerprint_skips_the_parse(config):
+    assert config._backend.reload() is False
+    assert CountingEncoder.decoded == 0
+
+
+def test_changed_size_triggers_a_reload(config):
+    path = config._backend.filepath
+    st = os.stat(path)
+    with open(path, "w") as f:
+        f.write("port: 8080\n")
+    # same mtime, only the size tells the change
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert config._backend.reload() is True
+    assert config.port == 8080
+
+
+def test_changed_inode_triggers_a_reload(config, tmp_path):
+    path = config._backend.filepath
+    st = os.stat(path)
+    other = str(tmp_path / "other.yaml")
+    # same size and mtime, only the inode tells the change
+    with open(other, "w") as f:
+        f.write("port: 90\n")
+    os.utime(other, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert os.stat(other).st_size == st.st_size
+    os.replace(other, path)
+    assert config._backend.reload() is True
+    assert config.port == 90
+
+
+def test_rewrite_with_the_same_content_keeps_the_digest(config):
+    digest, version = config.digest(), config.version
+    path = config._backend.filepath
+    with open(path, "rb") as f:
+        data = f.read()
+    os.remove(path)
+    with open(path, "wb") as f:
+        f.write(data)
+    assert config._backend.reload() is False
+    assert CountingEncoder.decoded == 1
+    assert config.version == version
+    assert config.digest() == digest
+
+
+def test_document_cache_is_shared_and_evicted(tmp_path):
+    cache = DocumentCache(maxsize=2)
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"config{i}.yaml")
+        atomic_write(path, f"port: {i}\n".encode())
+        paths.append(path)
+    first = cache.load(paths[0], CountingEncoder)
+    first.content["port"] = 100
+    # served from the cache, the copy of the caller doesn't leak into it
+    assert cache.load(paths[0], CountingEncoder).content == {"port": 0}
+    assert CountingEncoder.decoded == 1
+    cache.load(paths[1], CountingEncoder)
+    # the least recently used one is evicted
+    cache.load(paths[0], CountingEncoder)
+    cache.load(paths[2], CountingEncoder)
+    assert CountingEncoder.decoded == 3
+    cache.load(paths[0], CountingEncoder)
+    assert CountingEncoder.decoded == 3
+    cache.load(paths[1], CountingEncoder)
+    assert CountingEncoder.decoded == 4
+
+
+def test_document_cache_checks_the_fingerprint(tmp_path):
+    cache = DocumentCache()
+    path = str(tmp_path / "config.yaml")
+    atomic_write(path, b"port: 80\n")
+    assert cache.load(path, CountingEncoder).content == {"port": 80}
+    atomic_write(path, b"port: 8080\n")
+    assert cache.load(path, CountingEncoder).content == {"port": 8080}
+    assert CountingEncoder.decoded == 2
+
+
+def test_apply_unchanged_document(config):
+    digest = config.digest()
+    plan = model_plan(GPUStackConfig)
+    assert not plan.apply(config, {"port": 80}, reset_default=True)
+    assert config._digest == digest
+
+
+def test_apply_changed_document_invalidates_the_digest(config):
+    digest = config.digest()
+    plan = model_plan(GPUStackConfig)
+    assert plan.apply(config, {"port": 8080}, reset_default=True) == ["port"]
+    assert config._digest is None
+    assert config.digest() != digest
@@ -0,0 +1,124 @@
+import os
+import pytest
+from functools import partial
+from typing import Any, Dict
+from gpustack_helper.config import GPUStackConfig, HelperConfig, config_transaction
+from gpustack_helper.config.backends import FileConfigModel, PlistEncoder
+from gpustack_helper.config.filelock import LockFileError
+
+
+class ServiceBackend(FileConfigModel):
+    """
+    Takes data_dir out of the update like the registry backend, which writes
+    it to the service instead of the model.
+    """
+
+    prepared: Dict[str, Any]
+
+    def prepare_update(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = dict(kwargs)
+        self.prepared = {"data_dir": kwargs.pop("data_dir", None)}
+        return kwargs
+
+
+@pytest.fixture
+def helper(tmp_path) -> HelperConfig:
+    path = str(tmp_path / "ai.gpustack.plist")
+    config = HelperConfig(
+        backend=partial(ServiceBackend, filepath=path, encoder=PlistEncoder),
+        data_dir=str(tmp_path),
+        config_path=path,
+        gpustack_config_path=str(tmp_path / "config.yaml"),
+    )
+    config.save()
+    return config
+
+
+@pytest.fixture
+def gpustack(tmp_path) -> GPUStackConfig:
+    path = str(tmp_path / "config.yaml")
+    config = GPUStackConfig(
+        backend=partial(FileConfigModel, filepath=path),
+        gpustack_config_path=path,
+        static_data_dir=str(tmp_path),
+    )
+    config.port = 80
+    config.save()
+    return config
+
+
+def read(config) -> bytes:
+    with open(config._backend.filepath, "rb") as f:
+        return f.read()
+
+
+def test_saves_both(helper, gpustack):
+    with config_transaction(helper, gpustack) as transaction:
+        transaction.update(helper, RunAtLoad=True)
+        transaction.update(gpustack, port=8080)
+    helper.RunAtLoad = False
+    gpustack.port = None
+    helper._backend.reload(force=True)
+    gpustack._backend.reload(force=True)
+    assert helper.RunAtLoad is True
+    assert gpustack.port == 8080
+
+
+def test_backend_prepares_the_update(helper, gpustack):
+    with config_transaction(helper, gpustack) as transaction:
+        transaction.update(helper, data_dir="/srv/gpustack", RunAtLoad=True)
+    assert helper._backend.prepared == {"data_dir": "/srv/gpustack"}
+    assert helper.RunAtLoad is True
+
+
+def test_failed_save_restores_the_first_file(helper, gpustack, monkeypatch):
+    helper_before, gpustack_before = read(helper), read(gpustack)
+
+    def fail(strict: bool = False):
+        raise OSError("No space left on device")
+
+    # the helper file sorts first and is saved before the gpustack one
+    monkeypatch.setattr(gpustack._backend, "save", fail)
+    with pytest.raises(OSError):
+        with config_transaction(helper, gpustack) as transaction:
+            transaction.update(helper, RunAtLoad=True)
+            transaction.update(gpustack, port=8080)
+    assert read(helper) == helper_before
+    assert read(gpustack) == gpustack_before
+    assert helper.RunAtLoad is False
+    assert gpustack.port == 80
+
+
+def test_validation_error_writes_nothing(helper, gpustack):
+    helper_before, gpustack_before = read(helper), read(gpustack)
+    stats = [os.stat(c._backend.filepath).st_mtime_ns for c in (helper, gpustack)]
+    with pytest.raises(ValueError):
+        with config_transaction(helper, gpustack) as transaction:
+            transaction.update(helper, RunAtLoad=True)
+            transaction.update(gpustack, port="not a port")
+    assert read(helper) == helper_before
+    assert read(gpustack) == gpustack_before
+    assert [
+        os.stat(c._backend.filepath).st_mtime_ns for c in (helper, gpustack)
+    ] == stats
+    assert gpustack.port == 80
+
+
+def test_config_outside_the_transaction(helper, gpustack):
+    with pytest.raises(ValueError):
+        with config_transaction(helper) as transaction:
+            transaction.update(gpustack, port=8080)
+
+
+def test_unlockable_config_is_not_touched(helper, gpustack, tmp_path, monkeypatch):
+    helper_before = read(helper)
+    monkeypatch.setattr(
+        ServiceBackend,
+        "lock_path",
+        property(lambda self: str(tmp_path / "missing" / ".lock")),
+    )
+    with pytest.raises(LockFileError):
+        with config_transaction(helper, gpustack) as transaction:
+            transaction.update(helper, RunAtLoad=True)
+    assert read(helper) == helper_before
+    assert helper.RunAtLoad is False
@@ -0,0 +1,94 @@
+import os
+import socket
+import threading
+import time
+import pytest
+from gpustack_helper.control import protocol
+from gpustack_helper.control.protocol import (
+    call_with_timeout,
+    control_dir,
+    ensure_private_dir,
+    send_request,
+)
+
+
+@pytest.fixture
+def helper_socket(tmp_path):
+    """
+    A helper answering one request on a socket in a private dir.
+    """
+    directory = str(tmp_path / "run")
+    ensure_private_dir(directory)
+    name = os.path.join(directory, "gpustack-helper.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(name)
+    server.listen(1)
+    server.settimeout(0.5)
+
+    def serve() -> None:
+        try:
+            conn, _ = server.accept()
+        except OSError:
+            return
+        with conn:
+            conn.recv(4096)
+            conn.sendall(b'{"ok":true,"pid":1}\n')
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield name
+    server.close()
+    thread.join()
+
+
+def test_control_dir_prefers_the_runtime_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert control_dir() == str(tmp_path / "gpustack-helper")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "missing"))
+    monkeypatch.setattr(protocol, "user_data_dir", str(tmp_path / "data"))
+    assert control_dir() == str(tmp_path / "data" / "run")
+
+
+def test_private_dir(tmp_path):
+    path = str(tmp_path / "run")
+    ensure_private_dir(path)
+    assert os.stat(path).st_mode & 0o777 == 0o700
+    os.chmod(path, 0o777)
+    ensure_private_dir(path)
+    assert os.stat(path).st_mode & 0o777 == 0o700
+    (tmp_path / "file").write_text("")
+    with pytest.raises(OSError):
+        ensure_private_dir(str(tmp_path / "file"))
+
+
+def test_request_to_own_helper(helper_socket):
+    assert send_request({"command": "status"}, helper_socket) == {"ok": True, "pid": 1}
+
+
+def test_socket_of_another_user_is_ignored(helper_socket, monkeypatch):
+    uid = os.getuid()
+    monkeypatch.setattr(protocol.os, "getuid", lambda: uid + 1)
+    assert send_request({"command": "status"}, helper_socket) is None
+
+
+def test_socket_in_a_shared_dir_is_ignored(helper_socket):
+    os.chmod(os.path.dirname(helper_socket), 0o777)
+    assert send_request({"command": "status"}, helper_socket) is None
+
+
+def test_no_helper(tmp_path):
+    name = str(tmp_path / "gpustack-helper.sock")
+    assert send_request({"command": "status"}, name) is None
+
+
+def test_call_with_timeout():
+    assert call_with_timeout(lambda: b"line\n", 1) == b"line\n"
+    started = time.monotonic()
+    assert call_with_timeout(lambda: time.sleep(5) or b"late", 0.1) == b""
+    assert time.monotonic() - started < 1
+
+    def fail() -> bytes:
+        raise FileNotFoundError("no pipe")
+
+    with pytest.raises(FileNotFoundError):
+        call_with_timeout(fail, 1)
@@ -0,0 +1,44 @@
+import pytest
+from types import SimpleNamespace
+from gpustack_helper.control.server import ControlServer
+from gpustack_helper.services.abstract_service import AbstractService
+
+State = AbstractService.State
+
+
+class FakeController:
+    def __init__(self, status: State):
+        self.status = status
+        self.stops = 0
+
+    def stop_action(self) -> None:
+        self.stops += 1
+
+
+def handle_stop(status: State) -> FakeController:
+    controller = FakeController(status)
+    server = SimpleNamespace(controller=controller)
+    server._expect = lambda state, command: ControlServer._expect(
+        server, state, command
+    )
+    ControlServer.handle_stop(server, {})
+    return controller
+
+
+@pytest.mark.parametrize(
+    "status",
+    [
+        State.STARTED,
+        State.STARTING,
+        State.RESTARTING,
+        State.SYNCING,
+        State.STOPPING,
+    ],
+)
+def test_stop_is_dispatched(status):
+    assert handle_stop(status).stops == 1
+
+
+def test_stop_rejected_when_stopped():
+    with pytest.raises(RuntimeError, match="cannot stop"):
+        handle_stop(State.STOPPED)
@@ -0,0 +1,144 @@
+import os
+import errno
+import pytest
+from gpustack_helper import data_migration
+from gpustack_helper.data_migration import (
+    journal_name,
+    migrate_data_dir,
+    progress_name,
+    read_progress,
+)
+
+
+def make_tree(root: str, files: int = 10) -> None:
+    os.makedirs(os.path.join(root, "cache", "models"))
+    for i in range(files):
+        with open(os.path.join(root, "cache", "models", f"f{i}.bin"), "wb") as f:
+            f.write(os.urandom(1024 * (i + 1)))
+    os.symlink("models/f0.bin", os.path.join(root, "cache", "link"))
+    os.makedirs(os.path.join(root, "empty"))
+    with open(os.path.join(root, "config.yaml"), "w") as f:
+        f.write("port: 80\n")
+    with open(os.path.join(root, "run.ps1"), "w") as f:
+        f.write("echo")
+
+
+def snapshot(root: str) -> dict:
+    result = {}
+    for current, dirs, files in os.walk(root):
+        for name in files + dirs:
+            path = os.path.join(current, name)
+            rel = os.path.relpath(path, root)
+            if os.path.islink(path):
+                result[rel] = ("link", os.readlink(path))
+            elif os.path.isdir(path):
+                result[rel] = "dir"
+            else:
+                with open(path, "rb") as f:
+                    result[rel] = f.read()
+    return result
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    source = str(tmp_path / "legacy")
+    target = str(tmp_path / "data")
+    make_tree(source)
+    expected = snapshot(source)
+    expected.pop("run.ps1")
+    return source, target, expected
+
+
+@pytest.fixture
+def cross_device(monkeypatch):
+    def rename(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "rename", rename)
+
+
+def test_rename_on_same_filesystem(dirs):
+    source, target, expected = dirs
+    migrate_data_dir(source, target, exclude=["*.ps1"])
+    assert snapshot(target) == expected
+    assert os.listdir(source) == ["run.ps1"]
+
+
+def test_copy_across_devices(dirs, cross_device):
+    source, target, expected = dirs
+    progress = []
+    migrate_data_dir(
+        source,
+        target,
+        exclude=["*.ps1"],
+        workers=4,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+    assert snapshot(target) == expected
+    assert os.listdir(source) == ["run.ps1"]
+    done, total = progress[-1]
+    assert done == total > 0
+    assert not os.path.exists(os.path.join(target, journal_name))
+    assert not os.path.exists(os.path.join(target, progress_name))
+
+
+def test_stops_on_first_failure(dirs, cross_device, monkeypatch):
+    source, target, _ = dirs
+    copy_file = data_migration.copy_file
+    calls = []
+
+    def failing_copy(src, dst):
+        calls.append(src)
+        if len(calls) == 3:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return copy_file(src, dst)
+
+    monkeypatch.setattr(data_migration, "copy_file", failing_copy)
+    with pytest.raises(OSError) as e:
+        migrate_data_dir(source, target, exclude=["*.ps1"], workers=1)
+    assert e.value.errno == errno.ENOSPC
+    # the queued copies are cancelled instead of running to the end
+    assert len(calls) == 3
+    # nothing is removed from the source until its entry is copied
+    assert os.path.exists(os.path.join(source, "cache", "models", "f9.bin"))
+    done, total = read_progress(target)
+    assert 0 < done < total
+
+
+def test_resume_after_failure(dirs, cross_device, monkeypatch):
+    source, target, expected = dirs
+    copy_file = data_migration.copy_file
+    calls = []
+
+    def failing_copy(src, dst):
+        calls.append(src)
+        if len(calls) == 5:
+            raise OSError(errno.EIO, "Input/output error")
+        return copy_file(src, dst)
+
+    monkeypatch.setattr(data_migration, "copy_file", failing_copy)
+    with pytest.raises(OSError):
+        migrate_data_dir(source, target, exclude=["*.ps1"], workers=1)
+    copied_before = set(calls[:4])
+
+    calls.clear()
+    monkeypatch.setattr(
+        data_migration,
+        "copy_file",
+        lambda src, dst: calls.append(src) or copy_file(src, dst),
+    )
+    migrate_data_dir(source, target, exclude=["*.ps1"], workers=1)
+    # the files journaled by the first run are not copied again
+    assert not copied_before & set(calls)
+    assert snapshot(target) == expected
+    assert os.listdir(source) == ["run.ps1"]
+    assert not os.path.exists(os.path.join(target, journal_name))
+
+
+def test_replaces_existing_target_entries(dirs):
+    source, target, expected = dirs
+    os.makedirs(os.path.join(target, "cache"))
+    with open(os.path.join(target, "cache", "stale"), "w") as f:
+        f.write("stale")
+    migrate_data_dir(source, target, exclude=["*.ps1"])
+    assert snapshot(target) == expected
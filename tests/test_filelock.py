@@ -0,0 +1,33 @@
+import pytest
+from gpustack_helper.config.filelock import FileLock, LockFileError
+
+
+def test_exclusive_lock_excludes(tmp_path):
+    path = str(tmp_path / ".config.yaml.lock")
+    with FileLock(path):
+        with pytest.raises(TimeoutError):
+            FileLock(path, timeout=0).acquire()
+        with pytest.raises(TimeoutError):
+            FileLock(path, shared=True, timeout=0).acquire()
+    with FileLock(path, timeout=0):
+        pass
+
+
+def test_shared_locks_dont_block_each_other(tmp_path):
+    path = str(tmp_path / ".config.yaml.lock")
+    with FileLock(path, shared=True), FileLock(path, shared=True, timeout=0):
+        with pytest.raises(TimeoutError):
+            FileLock(path, timeout=0).acquire()
+
+
+def test_unopenable_exclusive_lock_raises(tmp_path):
+    path = str(tmp_path / "missing" / ".config.yaml.lock")
+    with pytest.raises(LockFileError):
+        FileLock(path).acquire()
+
+
+def test_unopenable_shared_lock_degrades(tmp_path, caplog):
+    path = str(tmp_path / "missing" / ".config.yaml.lock")
+    with FileLock(path, shared=True):
+        pass
+    assert "reading unlocked" in caplog.text
@@ -0,0 +1,276 @@
+import os
+import threading
+import pytest
+from functools import partial
+from typing import Dict, List
+from PySide6.QtCore import QCoreApplication
+from gpustack_helper.config import GPUStackConfig, HelperConfig
+from gpustack_helper.config.backends import FileConfigModel, PlistEncoder
+from gpustack_helper.services import linux
+from gpustack_helper.services.linux import (
+    DBusUnitManager,
+    LinuxSystemdService,
+    UnitManager,
+    render_unit,
+)
+
+State = LinuxSystemdService.State
+
+
+class FakeUnitManager(UnitManager):
+    def __init__(self, properties: Dict[str, str]):
+        super().__init__(linux.unit_name)
+        self.data = properties
+
+    def properties(self) -> Dict[str, str]:
+        return dict(self.data)
+
+
+@pytest.fixture
+def unit(monkeypatch):
+    manager = FakeUnitManager({})
+    monkeypatch.setattr(linux, "all_config_sync", lambda: True)
+    LinuxSystemdService.set_unit_manager(manager)
+    yield manager
+    LinuxSystemdService.set_unit_manager(None)
+
+
+@pytest.mark.parametrize(
+    "properties, state, pid",
+    [
+        (
+            {"LoadState": "loaded", "ActiveState": "active", "MainPID": "42"},
+            State.STARTED,
+            42,
+        ),
+        (
+            {"LoadState": "loaded", "ActiveState": "activating", "MainPID": "0"},
+            State.STARTED,
+            None,
+        ),
+        (
+            {"LoadState": "loaded", "ActiveState": "reloading", "MainPID": "42"},
+            State.STARTED,
+            42,
+        ),
+        (
+            {"LoadState": "loaded", "ActiveState": "inactive", "MainPID": "0"},
+            State.STOPPED,
+            None,
+        ),
+        (
+            {"LoadState": "loaded", "ActiveState": "failed", "MainPID": "0"},
+            State.STOPPED,
+            None,
+        ),
+        (
+            {"LoadState": "loaded", "ActiveState": "deactivating", "MainPID": "42"},
+            State.STOPPED,
+            None,
+        ),
+        (
+            {"LoadState": "not-found", "ActiveState": "active", "MainPID": "42"},
+            State.STOPPED,
+            None,
+        ),
+        ({}, State.STOPPED, None),
+    ],
+)
+def test_current_state(unit, properties, state, pid):
+    unit.data = properties
+    assert LinuxSystemdService.get_current_state() == state
+    assert LinuxSystemdService.get_service_pid() == pid
+
+
+def test_unsynced_configs(unit, monkeypatch):
+    unit.data = {"LoadState": "loaded", "ActiveState": "active", "MainPID": "42"}
+    monkeypatch.setattr(linux, "all_config_sync", lambda: False)
+    assert LinuxSystemdService.get_current_state() == State.STARTED | State.TO_SYNC
+
+
+def test_state_notifier_is_the_unit_manager(unit):
+    assert LinuxSystemdService.state_notifier() is unit
+
+
+class Message:
+    def __init__(self, changed: Dict[str, str], invalidated: List[str] = ()):
+        self._arguments = [linux.unit_interface, changed, list(invalidated)]
+
+    def arguments(self) -> list:
+        return self._arguments
+
+
+class LoadingUnitManager(DBusUnitManager):
+    """
+    The cache logic of DBusUnitManager with GetAll replaced, without a bus.
+    """
+
+    def __init__(self, loads: List[Dict[str, str]]):
+        UnitManager.__init__(self, linux.unit_name)
+        self._cache = None
+        self._generation = 0
+        self._cache_lock = threading.Lock()
+        self.loads = loads
+        self.during_load = None
+        self.load_count = 0
+
+    def _load(self) -> Dict[str, str]:
+        self.load_count += 1
+        result = self.loads.pop(0)
+        if self.during_load is not None:
+            during, self.during_load = self.during_load, None
+            during()
+        return result
+
+
+def test_cached_properties_follow_the_signals():
+    manager = LoadingUnitManager([{"ActiveState": "activating"}])
+    assert manager.properties() == {"ActiveState": "activating"}
+    manager.on_properties_changed(Message({"ActiveState": "active"}))
+    assert manager.properties() == {"ActiveState": "active"}
+    assert manager.load_count == 1
+
+
+def test_invalidated_properties_are_loaded_again():
+    manager = LoadingUnitManager([{"ActiveState": "active"}, {"ActiveState": "failed"}])
+    manager.properties()
+    manager.on_properties_changed(Message({}, ["ActiveState"]))
+    assert manager.properties() == {"ActiveState": "failed"}
+
+
+def test_signal_during_load_discards_the_result():
+    manager = LoadingUnitManager(
+        [{"ActiveState": "activating"}, {"ActiveState": "failed"}]
+    )
+    changes = []
+    manager.changed.connect(lambda: changes.append(True))
+    # the start fails while the first GetAll is answered
+    manager.during_load = lambda: manager.on_properties_changed(
+        Message({"ActiveState": "failed"})
+    )
+    manager.properties()
+    assert changes
+    # the probe triggered by changed doesn't see the stale result
+    assert manager.properties() == {"ActiveState": "failed"}
+    assert manager.load_count == 2
+
+
+def test_render_unit(tmp_path):
+    cfg = HelperConfig(
+        backend=None,
+        data_dir=str(tmp_path),
+        config_path=str(tmp_path / "ai.gpustack.plist"),
+        gpustack_config_path=str(tmp_path / "config.yaml"),
+    )
+    cfg.ProgramArguments = ["/opt/gpustack/bin/gpustack", "start", "--token", "a$b%c"]
+    cfg.EnvironmentVariables = {"Z": "1", "HOME": "/root dir"}
+    cfg.StandardOutPath = "/var/log/gpustack.log"
+    cfg.StandardErrorPath = None
+    cfg.KeepAlive = False
+    lines = render_unit(cfg).splitlines()
+    assert 'ExecStart="/opt/gpustack/bin/gpustack" "start" "--token" "a$$b%%c"' in lines
+    assert lines.index('Environment="HOME=/root dir"') < lines.index(
+        'Environment="Z=1"'
+    )
+    assert "StandardOutput=append:/var/log/gpustack.log" in lines
+    assert not any(line.startswith("StandardError=") for line in lines)
+    assert "Restart=no" in lines
+    assert "WantedBy=multi-user.target" in lines
+
+
+@pytest.fixture
+def configs(tmp_path, monkeypatch):
+    user_dir, active_dir = tmp_path / "user", tmp_path / "active"
+    active_gpustack_path = str(active_dir / "config.yaml")
+
+    def helper(directory) -> HelperConfig:
+        path = str(directory / "ai.gpustack.plist")
+        return HelperConfig(
+            backend=partial(FileConfigModel, filepath=path, encoder=PlistEncoder),
+            data_dir=str(active_dir),
+            config_path=path,
+            gpustack_config_path=active_gpustack_path,
+        )
+
+    def gpustack(directory) -> GPUStackConfig:
+        path = str(directory / "config.yaml")
+        return GPUStackConfig(
+            backend=partial(FileConfigModel, filepath=path),
+            gpustack_config_path=path,
+            static_data_dir=str(directory),
+        )
+
+    helper_user, helper_active = helper(user_dir), helper(active_dir)
+    gpustack_user, gpustack_active = gpustack(user_dir), gpustack(active_dir)
+    for config in (helper_user, helper_active, gpustack_user, gpustack_active):
+        config.save()
+    monkeypatch.setattr(linux, "user_helper_config", lambda: helper_user)
+    monkeypatch.setattr(linux, "user_gpustack_config", lambda: gpustack_user)
+    monkeypatch.setattr(linux, "active_helper_config", lambda: helper_active)
+    monkeypatch.setattr(linux, "active_gpustack_config", lambda: gpustack_active)
+    monkeypatch.setattr(linux, "unit_path", str(tmp_path / linux.unit_name))
+    return helper_user, gpustack_user
+
+
+def install_unit(helper_user: HelperConfig) -> None:
+    with open(linux.unit_path, "w") as f:
+        f.write(render_unit(helper_user))
+
+
+def test_start_script_installs_a_changed_unit(configs):
+    helper_user, gpustack_user = configs
+    script = linux.get_start_script()
+    rendered_path = os.path.join(gpustack_user.static_data_dir, linux.unit_name)
+    with open(rendered_path) as f:
+        assert f.read() == render_unit(helper_user)
+    assert f"install -m 0644 {rendered_path} {linux.unit_path}" in script
+    assert "systemctl daemon-reload" in script
+    assert script.endswith(f"systemctl start {linux.unit_name}")
+
+
+def test_start_script_with_an_unchanged_unit(configs):
+    helper_user, _ = configs
+    install_unit(helper_user)
+    script = linux.get_start_script()
+    assert "install -m" not in script
+    assert "daemon-reload" not in script
+    assert "cp -f" not in script
+
+
+def test_restart_script(configs):
+    helper_user, _ = configs
+    install_unit(helper_user)
+    script = linux.get_start_script(restart=True)
+    assert script.endswith(f"systemctl restart {linux.unit_name}")
+    assert f"systemctl start {linux.unit_name}" not in script
+
+
+def test_sync_only_script(configs):
+    helper_user, gpustack_user = configs
+    install_unit(helper_user)
+    gpustack_user.port = 8080
+    script = linux.get_start_script(sync_only=True)
+    assert f"cp -f {gpustack_user.config_path}" in script
+    assert script.endswith(f"systemctl disable --quiet {linux.unit_name}")
+    assert "systemctl start" not in script
+    assert "systemctl restart" not in script
+
+
+def test_manager_is_not_created_off_the_main_thread(monkeypatch):
+    QCoreApplication.instance() or QCoreApplication([])
+    created = []
+    monkeypatch.setattr(
+        linux, "create_unit_manager", lambda: created.append(1) or FakeUnitManager({})
+    )
+    LinuxSystemdService.set_unit_manager(None)
+    result = []
+    thread = threading.Thread(
+        target=lambda: result.append(LinuxSystemdService.unit_manager())
+    )
+    thread.start()
+    thread.join()
+    assert isinstance(result[0], linux.SystemctlUnitManager)
+    assert not created
+    manager = LinuxSystemdService.state_notifier()
+    assert created and LinuxSystemdService.unit_manager() is manager
+    LinuxSystemdService.set_unit_manager(None)
@@ -0,0 +1,78 @@
+import pytest
+from PySide6.QtCore import QCoreApplication, QEventLoop, QProcess
+from gpustack_helper.controller import Operation, OperationQueue
+from gpustack_helper.services import linux
+from gpustack_helper.services.abstract_service import AbstractService
+
+State = AbstractService.State
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_runs_directly_as_root(monkeypatch):
+    monkeypatch.setattr(linux.os, "geteuid", lambda: 0)
+    process = linux._privileged_process(["systemctl", "stop", linux.unit_name])
+    assert process.program() == "systemctl"
+    assert process.arguments() == ["stop", linux.unit_name]
+    assert linux.LinuxSystemdService.describe_exit(linux.pkexec_dismissed) is None
+
+
+def test_runs_through_pkexec(monkeypatch):
+    monkeypatch.setattr(linux.os, "geteuid", lambda: 1000)
+    monkeypatch.setattr(linux.shutil, "which", lambda name: f"/usr/bin/{name}")
+    process = linux._privileged_process(["sh", "-c", "true"])
+    assert process.program() == "/usr/bin/pkexec"
+    assert process.arguments() == ["sh", "-c", "true"]
+
+
+def test_missing_pkexec(monkeypatch):
+    monkeypatch.setattr(linux.os, "geteuid", lambda: 1000)
+    monkeypatch.setattr(linux.shutil, "which", lambda name: None)
+    with pytest.raises(RuntimeError, match="pkexec"):
+        linux._privileged_process(["sh", "-c", "true"])
+
+
+def test_describe_pkexec_exit(monkeypatch):
+    monkeypatch.setattr(linux.os, "geteuid", lambda: 1000)
+    describe = linux.LinuxSystemdService.describe_exit
+    assert "dismissed" in describe(linux.pkexec_dismissed)
+    assert "failed" in describe(linux.pkexec_not_authorized)
+    assert describe(1) is None
+
+
+def run(queue: OperationQueue, create) -> list:
+    failures = []
+    loop = QEventLoop()
+    queue.failed.connect(failures.append)
+    queue.finished.connect(lambda operation, ok: loop.quit())
+    queue.submit(Operation(State.STOPPING, create, (State.STARTED, State.STOPPED), 0))
+    if queue.busy:
+        loop.exec()
+    return failures
+
+
+def exit_with(code: int) -> QProcess:
+    process = QProcess()
+    process.setProgram("sh")
+    process.setArguments(["-c", f"exit {code}"])
+    return process
+
+
+def test_queue_reports_described_exit(app):
+    queue = OperationQueue(
+        describe_exit=lambda code: "Authentication was dismissed" if code else None
+    )
+    assert run(queue, lambda: exit_with(126)) == ["Authentication was dismissed"]
+    assert queue.stats()["failed"] == 1
+
+
+def test_queue_reports_failed_preparation(app):
+    def create():
+        raise RuntimeError("pkexec is not installed")
+
+    queue = OperationQueue()
+    assert run(queue, create) == ["pkexec is not installed"]
+    assert not queue.busy
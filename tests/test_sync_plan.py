@@ -0,0 +1,148 @@
+import os
+import shutil
+import pytest
+from functools import partial
+from gpustack_helper.config import GPUStackConfig, HelperConfig
+from gpustack_helper.config.backends import FileConfigModel, PlistEncoder
+from gpustack_helper.services import darwin
+
+
+class Configs:
+    def __init__(self, root: str):
+        user_dir = os.path.join(root, "user")
+        active_dir = os.path.join(root, "active")
+        active_gpustack_path = os.path.join(active_dir, "config.yaml")
+        self.helper_user = self._helper(user_dir, active_dir, active_gpustack_path)
+        self.helper_active = self._helper(active_dir, active_dir, active_gpustack_path)
+        self.gpustack_user = self._gpustack(user_dir)
+        self.gpustack_active = self._gpustack(active_dir)
+
+    @staticmethod
+    def _helper(config_dir: str, data_dir: str, gpustack_path: str) -> HelperConfig:
+        path = os.path.join(config_dir, "ai.gpustack.plist")
+        return HelperConfig(
+            backend=partial(FileConfigModel, filepath=path, encoder=PlistEncoder),
+            data_dir=data_dir,
+            config_path=path,
+            gpustack_config_path=gpustack_path,
+        )
+
+    @staticmethod
+    def _gpustack(data_dir: str) -> GPUStackConfig:
+        path = os.path.join(data_dir, "config.yaml")
+        return GPUStackConfig(
+            backend=partial(FileConfigModel, filepath=path),
+            gpustack_config_path=path,
+            static_data_dir=data_dir,
+        )
+
+    def save_all(self) -> None:
+        for config in (
+            self.helper_user,
+            self.helper_active,
+            self.gpustack_user,
+            self.gpustack_active,
+        ):
+            config.save()
+
+    def files(self) -> set:
+        return {
+            os.path.join(root, name)
+            for config in (self.helper_user, self.helper_active)
+            for root, _, names in os.walk(os.path.dirname(config.config_path))
+            for name in names
+        }
+
+
+@pytest.fixture
+def configs(tmp_path, monkeypatch):
+    configs = Configs(str(tmp_path))
+    monkeypatch.setattr(darwin, "user_helper_config", lambda: configs.helper_user)
+    monkeypatch.setattr(
+        darwin, "user_gpustack_config", lambda create=True: configs.gpustack_user
+    )
+    monkeypatch.setattr(darwin, "active_helper_config", lambda: configs.helper_active)
+    monkeypatch.setattr(
+        darwin, "active_gpustack_config", lambda: configs.gpustack_active
+    )
+    monkeypatch.setattr(darwin, "plist_path", str(tmp_path / "ai.gpustack.plist"))
+    monkeypatch.setattr(darwin, "legacy_gpustack_config", lambda: None)
+    monkeypatch.setattr(darwin, "_dac_link", lambda: None)
+    monkeypatch.setattr(darwin, "is_plist_linked", lambda path: True)
+    return configs
+
+
+def test_synced_start(configs):
+    configs.save_all()
+    assert darwin.plan_start().kinds == ["bootout", "bootstrap", "kickstart"]
+
+
+def test_synced_restart(configs):
+    configs.save_all()
+    plan = darwin.plan_start(restart=True)
+    assert plan.kinds == ["bootout", "wait", "bootstrap", "kickstart"]
+
+
+def test_sync_only(configs):
+    configs.save_all()
+    assert darwin.plan_start(sync_only=True).kinds == []
+
+
+def test_missing_active_files_are_copied(configs):
+    configs.helper_user.save()
+    configs.gpustack_user.save()
+    plan = darwin.plan_start(sync_only=True)
+    assert plan.kinds == ["copy", "copy", "copy"]
+    assert f"cp -f '{configs.gpustack_user.config_path}'" in plan.commands[-1]
+
+
+def test_changed_user_file_is_copied(configs):
+    configs.save_all()
+    configs.gpustack_user.port = 8080
+    configs.gpustack_user.save()
+    plan = darwin.plan_start(sync_only=True)
+    assert plan.kinds == ["copy", "copy"]
+    assert configs.gpustack_active.config_path in plan.commands[-1]
+
+
+def test_same_content_is_not_copied(configs):
+    configs.save_all()
+    # rewritten with the same content, only the fingerprint changed
+    shutil.copyfile(
+        configs.gpustack_user.config_path, configs.gpustack_user.config_path + ".new"
+    )
+    os.replace(
+        configs.gpustack_user.config_path + ".new", configs.gpustack_user.config_path
+    )
+    assert darwin.plan_start(sync_only=True).kinds == []
+
+
+def test_unsaved_model_is_saved_then_copied(configs):
+    configs.save_all()
+    configs.gpustack_user.port = 8080
+    plan = darwin.plan_start(sync_only=True, reload=False)
+    assert plan.kinds == ["save", "copy", "copy"]
+
+
+def test_unlinked_plist(configs, monkeypatch):
+    configs.save_all()
+    monkeypatch.setattr(darwin, "is_plist_linked", lambda path: False)
+    assert darwin.plan_start().kinds == ["bootout", "link", "bootstrap", "kickstart"]
+
+
+def test_dry_run_writes_nothing(configs):
+    # nothing saved yet, a real run would save the user configs first
+    script = darwin.get_start_script(dry_run=True)
+    assert configs.files() == set()
+    assert "bootstrap" in script
+    plan = darwin.plan_start(reload=False)
+    assert plan.kinds[0] == "save"
+    assert configs.files() == set()
+
+
+def test_dry_run_keeps_the_loaded_models(configs):
+    configs.save_all()
+    configs.gpustack_user.port = 8080
+    # a reload would reset the unsaved port to the file content
+    darwin.get_start_script(dry_run=True)
+    assert configs.gpustack_user.port == 8080
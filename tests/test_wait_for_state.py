@@ -0,0 +1,99 @@
+import time
+import threading
+import pytest
+from gpustack_helper.services.abstract_service import AbstractService
+
+
+class FakeService(AbstractService):
+    """
+    Reports STARTING until it was polled flip_after times, STARTED after.
+    """
+
+    flip_after = 3
+    polls = 0
+
+    @classmethod
+    def start(cls):
+        return lambda: None
+
+    @classmethod
+    def stop(cls):
+        return lambda: None
+
+    @classmethod
+    def restart(cls):
+        return lambda: None
+
+    @classmethod
+    def get_current_state(cls) -> AbstractService.State:
+        cls.polls += 1
+        if cls.polls > cls.flip_after:
+            return AbstractService.State.STARTED
+        return AbstractService.State.STARTING
+
+
+@pytest.fixture(autouse=True)
+def fake_service():
+    FakeService.polls = 0
+    FakeService.flip_after = 3
+    yield
+    AbstractService._cancel_waits.clear()
+
+
+def test_reaches_state_after_polls():
+    elapsed = FakeService.wait_for_state(
+        AbstractService.State.STARTED, time.monotonic() + 5
+    )
+    assert FakeService.polls == FakeService.flip_after + 1
+    # the first polls are fast, backing off from 10ms
+    assert elapsed < 1
+
+
+def test_any_of_the_target_states():
+    FakeService.flip_after = 100
+    FakeService.wait_for_state(
+        AbstractService.State.STARTING | AbstractService.State.STARTED,
+        time.monotonic() + 5,
+    )
+    assert FakeService.polls == 1
+
+
+def test_timeout():
+    FakeService.flip_after = 10**6
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        FakeService.wait_for_state(
+            AbstractService.State.STARTED, time.monotonic() + 0.3
+        )
+    assert 0.3 <= time.monotonic() - start < 1
+
+
+def test_cancel_event():
+    FakeService.flip_after = 10**6
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    start = time.monotonic()
+    with pytest.raises(InterruptedError):
+        FakeService.wait_for_state(
+            AbstractService.State.STARTED, time.monotonic() + 30, cancel
+        )
+    assert time.monotonic() - start < 1
+
+
+def test_cancel_waits():
+    FakeService.flip_after = 10**6
+    threading.Timer(0.1, FakeService.cancel_waits).start()
+    start = time.monotonic()
+    with pytest.raises(InterruptedError):
+        FakeService.wait_for_state(AbstractService.State.STARTED, time.monotonic() + 30)
+    assert time.monotonic() - start < 1
+
+
+def test_probe_replaces_the_state_query():
+    states = iter([AbstractService.State.STOPPING, AbstractService.State.STOPPED])
+    FakeService.wait_for_state(
+        AbstractService.State.STOPPED,
+        time.monotonic() + 5,
+        probe=lambda: next(states),
+    )
+    assert FakeService.polls == 0